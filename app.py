@@ -19,9 +19,25 @@ def create_app():
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///pine_assistant.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Larger uploads get 413 before their body is read; 0 lifts the limit
+    app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 256 * 1024 * 1024)) or None
+    
+    # Engine tuning: SQLite pragmas, connection pools and read replica
+    from app.utils.database import configure_database, init_engines
+    
+    configure_database(app)
+    
+    # Integration history retention (days per status) and archive location
+    from app.services.integration_archive import parse_retention
+    
+    app.config['INTEGRATION_RETENTION_DAYS'] = parse_retention(
+        os.getenv('INTEGRATION_RETENTION_DAYS', 'success=30,failed=90,pending=14'))
+    app.config['INTEGRATION_ARCHIVE_DIR'] = os.getenv('INTEGRATION_ARCHIVE_DIR', 'archive/integrations')
+    app.config['INTEGRATION_ARCHIVE_FORMAT'] = os.getenv('INTEGRATION_ARCHIVE_FORMAT', 'ndjson')
     
     # Initialize extensions
     db.init_app(app)
+    init_engines(app)
     migrate.init_app(app, db)
     CORS(app)
     
@@ -30,11 +46,30 @@ def create_app():
     from app.routes.api import api_bp
     from app.routes.dashboard import dashboard_bp
     from app.routes.react_assistant import react_bp
+    from app.routes.ai_assistant import ai_bp
     
     app.register_blueprint(main_bp)
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(dashboard_bp, url_prefix='/dashboard')
     app.register_blueprint(react_bp, url_prefix='/react_assistant')
+    app.register_blueprint(ai_bp, url_prefix='/ai')
+    
+    # Publish integration writes to live dashboards
+    from app.services.live_stats import install_integration_events
+    
+    install_integration_events()
+    
+    # Watch integration and webhook events for failure-rate spikes
+    from app.services.anomaly_detector import install_anomaly_detector
+    
+    install_anomaly_detector()
+    
+    # Register CLI commands
+    from app.cli import integrations_cli, docs_cli, jobs_cli
+    
+    app.cli.add_command(integrations_cli)
+    app.cli.add_command(docs_cli)
+    app.cli.add_command(jobs_cli)
     
     # Create database tables
     with app.app_context():
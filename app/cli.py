@@ -0,0 +1,324 @@
+import click
+import gzip
+import time
+from flask import current_app
+from flask.cli import AppGroup
+from app.models import Integration, db
+from app.services.integration_archive import IntegrationArchive
+from app.services.reconciliation import Reconciler, open_text
+from app.services.payouts import BulkPayoutValidator
+from app.services.replay import ReplayEngine, REPLAY_TARGETS
+from app.services.status_poller import StatusPoller
+from app.services.answer_cache import DOCS_DIR
+from app.services.error_catalog import CATALOG_PATH, write_error_catalog
+from app.services.docs_corpus import CORPUS_PATH, write_corpus, manifest_path
+from app.services.job_queue import JobQueue
+from app.services.integration_transfer import IntegrationExporter, gzip_stream, import_ndjson, parse_timestamp
+from app.utils.payload_storage import reencode_payload
+from app.utils.redaction import redact_ndjson
+
+integrations_cli = AppGroup('integrations', help='Maintenance commands for integration history')
+docs_cli = AppGroup('docs', help='Build artifacts from the Pine Labs documentation')
+jobs_cli = AppGroup('jobs', help='Background job workers')
+
+@integrations_cli.command('compact-payloads')
+@click.option('--batch-size', default=500, show_default=True, help='Rows rewritten per transaction')
+def compact_payloads(batch_size):
+    """Rewrite stored payloads with the compact encoding"""
+    table = Integration.__table__
+    last_id = 0
+    scanned = 0
+    rewritten = 0
+
+    while True:
+        # Keyset pagination keeps every batch an index range scan
+        rows = db.session.execute(
+            db.select(
+                table.c.id,
+                table.c.request_payload, table.c.request_codec,
+                table.c.response_data, table.c.response_codec
+            ).where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        updates = []
+        for row in rows:
+            request_payload, request_codec = reencode_payload(row.request_payload, row.request_codec)
+            response_data, response_codec = reencode_payload(row.response_data, row.response_codec)
+            if (request_payload, request_codec, response_data, response_codec) != (
+                    row.request_payload, row.request_codec, row.response_data, row.response_codec):
+                updates.append({
+                    'id': row.id,
+                    'request_payload': request_payload,
+                    'request_codec': request_codec,
+                    'response_data': response_data,
+                    'response_codec': response_codec
+                })
+
+        if updates:
+            db.session.bulk_update_mappings(Integration, updates)
+        db.session.commit()
+
+        scanned += len(rows)
+        rewritten += len(updates)
+        last_id = rows[-1].id
+        click.echo(f"Processed {scanned} rows, rewrote {rewritten}")
+
+    click.echo(f"✅ Payload compaction complete: {rewritten}/{scanned} rows rewritten")
+
+@integrations_cli.command('archive')
+@click.option('--batch-size', default=500, show_default=True, help='Rows archived per transaction')
+@click.option('--dry-run', is_flag=True, help='Only report how many rows are eligible')
+def archive(batch_size, dry_run):
+    """Move integrations past their retention window into archive files"""
+    integration_archive = IntegrationArchive.from_config(current_app.config)
+
+    if dry_run:
+        for status, count in integration_archive.eligible_counts().items():
+            click.echo(f"{status}: {count} rows eligible")
+        return
+
+    archived = integration_archive.archive(batch_size=batch_size)
+    for status, count in archived.items():
+        click.echo(f"{status}: archived {count} rows")
+    click.echo(f"✅ Archived {sum(archived.values())} rows to {integration_archive.archive_dir}")
+
+@integrations_cli.command('reconcile')
+@click.argument('order_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--output', '-o', default='reconciliation.csv', show_default=True,
+              help='Report path (.csv or .ndjson, add .gz to compress)')
+@click.option('--merchant-id', help='Only reconcile integrations of this merchant')
+@click.option('--amount-unit', type=click.Choice(['paisa', 'rupees']), default='paisa', show_default=True,
+              help='Unit of the amounts in the order file')
+@click.option('--order-column', help='Order id column (default: merchant_order_id, merchant_order_reference, order_id)')
+@click.option('--amount-column', help='Amount column (default: amount, order_amount)')
+@click.option('--status-column', help='Status column (default: status, order_status, payment_status)')
+@click.option('--partitions', type=int, help='Hash partitions spilled to disk (RECONCILE_PARTITIONS)')
+@click.option('--workers', type=int, help='Worker processes (RECONCILE_WORKERS)')
+def reconcile(order_file, output, merchant_id, amount_unit, order_column, amount_column, status_column,
+              partitions, workers):
+    """Reconcile a merchant order export (CSV/NDJSON) against recorded integrations"""
+    reconciler = Reconciler(
+        partitions=partitions,
+        workers=workers,
+        amount_unit=amount_unit,
+        merchant_id=merchant_id,
+        order_column=order_column,
+        amount_column=amount_column,
+        status_column=status_column
+    )
+    summary = reconciler.run(order_file, output)
+
+    click.echo(f"Read {summary['file_rows']} orders ({summary['skipped_rows']} without an order id) "
+               f"against {summary['recorded_rows']} integrations")
+    for result, count in summary['results'].items():
+        click.echo(f"{result}: {count}")
+    click.echo(f"recorded but not in file: {summary['recorded_not_in_file']}")
+    click.echo(f"✅ Report written to {summary['report']}")
+
+@integrations_cli.command('validate-payouts')
+@click.argument('payout_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--output', '-o', default='payout-errors.ndjson', show_default=True,
+              help='Per-row error report path (add .gz to compress)')
+@click.option('--workers', type=int, help='Worker processes (PAYOUT_WORKERS)')
+@click.option('--chunk-rows', type=int, help='Lines per worker task (PAYOUT_CHUNK_ROWS)')
+def validate_payouts(payout_file, output, workers, chunk_rows):
+    """Validate a bulk payout CSV (optionally .gz) before uploading it"""
+    validator = BulkPayoutValidator(workers=workers, chunk_rows=chunk_rows)
+    opener = gzip.open if payout_file.endswith('.gz') else open
+    with opener(payout_file, 'rb') as f:
+        try:
+            chunks = validator.report(f)
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+        _write_text(output, chunks)
+
+    summary = validator.summary
+    click.echo(f"Checked {summary['rows']} payouts in {summary['elapsed_s']}s ({summary['rows_per_s']} rows/s)")
+    click.echo(f"valid: {summary['valid']}, rejected: {summary['rejected']}, duplicates: {summary['duplicates']}")
+    for field, count in summary['errors_by_field'].items():
+        click.echo(f"  {field}: {count} rows")
+    if summary['rejected']:
+        click.echo(f"⚠️ Row errors written to {output}")
+    else:
+        click.echo(f"✅ All rows valid, ₹{summary['valid_amount'] / 100:,.2f} in total")
+
+@integrations_cli.command('export')
+@click.option('--output', '-o', default='integrations.ndjson', show_default=True,
+              help='Output path (.ndjson or .csv, add .gz to compress)')
+@click.option('--merchant-id', help='Only export this merchant')
+@click.option('--status', help='Only export this status')
+@click.option('--since', help='Created at or after (ISO date)')
+@click.option('--until', help='Created before (ISO date)')
+@click.option('--no-payloads', is_flag=True, help='Leave out request and response payloads')
+@click.option('--batch-size', type=int, help='Rows fetched per cursor batch (EXPORT_BATCH_SIZE)')
+def export(output, merchant_id, status, since, until, no_payloads, batch_size):
+    """Stream integration records to an NDJSON or CSV file"""
+    try:
+        exporter = IntegrationExporter(
+            merchant_id=merchant_id,
+            status=status,
+            since=parse_timestamp(since),
+            until=parse_timestamp(until),
+            include_payloads=not no_payloads,
+            batch_size=batch_size
+        )
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+    name = output[:-3] if output.endswith('.gz') else output
+    chunks = exporter.stream('csv' if name.endswith('.csv') else 'ndjson')
+
+    written = _write_text(output, chunks)
+    click.echo(f"✅ Exported integrations to {output} ({written} bytes)")
+
+def _write_text(output, chunks):
+    """Write text chunks to a file, gzip-compressed when the name ends in .gz"""
+    written = 0
+    if output.endswith('.gz'):
+        with open(output, 'wb') as f:
+            for data in gzip_stream(chunks):
+                f.write(data)
+                written += len(data)
+    else:
+        with open(output, 'w', encoding='utf-8', newline='') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+    return written
+
+@integrations_cli.command('import')
+@click.argument('input_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', type=int, help='Rows per executemany insert (IMPORT_BATCH_SIZE)')
+@click.option('--keep-ids', is_flag=True, help='Insert with the exported ids instead of new ones')
+def import_(input_file, batch_size, keep_ids):
+    """Bulk-load integration records from an NDJSON export"""
+    with open_text(input_file) as f:
+        counts = import_ndjson(f, batch_size=batch_size, keep_ids=keep_ids)
+    click.echo(f"✅ Imported {counts['inserted']} rows ({counts['skipped']} skipped)")
+
+@integrations_cli.command('redact')
+@click.argument('input_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--output', '-o', required=True, help='Redacted NDJSON path (add .gz to compress)')
+def redact_file(input_file, output):
+    """Mask card data, secrets and tokens in an NDJSON export or archive"""
+    with open_text(input_file) as f:
+        written = _write_text(output, redact_ndjson(f))
+    click.echo(f"✅ Redacted {input_file} to {output} ({written} bytes)")
+
+@integrations_cli.command('poll')
+@click.option('--follow', is_flag=True, help='Keep running and pick up new pending integrations')
+@click.option('--rescan-interval', default=30.0, show_default=True, help='Seconds between scans in --follow mode')
+@click.option('--batch-size', type=int, help='Orders per Fetch Order batch (POLL_BATCH_SIZE)')
+@click.option('--workers', type=int, help='Concurrent fetch batches (POLL_WORKERS)')
+@click.option('--max-delay', type=float, help='Longest backoff between polls of one order (POLL_MAX_DELAY)')
+def poll(follow, rescan_interval, batch_size, workers, max_delay):
+    """Poll the gateway for pending integrations until they settle"""
+    poller = StatusPoller(batch_size=batch_size, workers=workers, max_delay=max_delay)
+    click.echo(f"Tracking {poller.load_pending()} pending orders")
+
+    try:
+        poller.run(until_idle=not follow, rescan_interval=rescan_interval if follow else None)
+    except KeyboardInterrupt:
+        poller.flush()
+
+    metrics = poller.metrics()
+    click.echo(f"Fetched {metrics['fetches']} times in {metrics['batches']} batches, "
+               f"{metrics['errors']} errors")
+    click.echo(f"✅ Settled {metrics['settled']} orders, {metrics['expired']} expired, "
+               f"{metrics['pending']} still pending")
+
+@integrations_cli.command('replay')
+@click.option('--target', type=click.Choice(REPLAY_TARGETS), default='simulator', show_default=True,
+              help='Re-run through the simulator, the validator only, or a mock gateway')
+@click.option('--gateway-url', help='Mock gateway endpoint for --target gateway (REPLAY_GATEWAY_URL)')
+@click.option('--output', '-o', default='replay-mismatches.ndjson', show_default=True,
+              help='Mismatch report path (add .gz to compress)')
+@click.option('--merchant-id', help='Only replay this merchant')
+@click.option('--type', 'integration_type', help='Only replay this integration type')
+@click.option('--status', help='Only replay this recorded status')
+@click.option('--since', help='Created at or after (ISO date)')
+@click.option('--until', help='Created before (ISO date)')
+@click.option('--limit', type=int, help='Replay at most this many rows')
+@click.option('--ignore', multiple=True, help='Extra response key to ignore in diffs (repeatable, REPLAY_IGNORE_KEYS)')
+@click.option('--workers', type=int, help='Worker processes (REPLAY_WORKERS)')
+@click.option('--batch-size', type=int, help='Rows per worker task (REPLAY_BATCH_SIZE)')
+def replay(target, gateway_url, output, merchant_id, integration_type, status, since, until, limit, ignore,
+           workers, batch_size):
+    """Replay recorded integrations against the current code and diff the responses"""
+    try:
+        engine = ReplayEngine(
+            target=target,
+            gateway_url=gateway_url,
+            workers=workers,
+            batch_size=batch_size,
+            merchant_id=merchant_id,
+            integration_type=integration_type,
+            status=status,
+            since=parse_timestamp(since),
+            until=parse_timestamp(until),
+            limit=limit,
+            ignore_keys=ignore
+        )
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+    summary = engine.run(output)
+    click.echo(f"Replayed {summary['rows']} integrations through the {summary['target']} "
+               f"in {summary['elapsed_s']}s ({summary['rows_per_s']} rows/s)")
+    for result, count in summary['results'].items():
+        click.echo(f"{result}: {count}")
+    if summary['masked']:
+        click.echo(f"  {summary['masked']} skipped rows were stored with masked card numbers, VPAs or secrets")
+    for path, count in summary['top_diff_paths']:
+        click.echo(f"  {path}: {count} rows")
+    if summary['results']['mismatched'] or summary['results']['errors']:
+        click.echo(f"⚠️ Mismatches written to {summary['report']}")
+    else:
+        click.echo("✅ No regressions")
+
+@docs_cli.command('build-error-catalog')
+@click.option('--docs-dir', default=DOCS_DIR, show_default=True, type=click.Path(exists=True, file_okay=False))
+@click.option('--output', '-o', default=CATALOG_PATH, show_default=True, help='Catalog JSON path (ERROR_CATALOG_PATH)')
+def build_error_catalog(docs_dir, output):
+    """Compile the docs' error-code tables into the error catalog"""
+    catalog = write_error_catalog(docs_dir, output)
+    for source in catalog['sources']:
+        click.echo(f"  {source['doc']}: {source['rows']} rows")
+    retryable = sum(1 for entry in catalog['entries'] if entry['retryable'])
+    click.echo(f"✅ Wrote {len(catalog['entries'])} errors ({retryable} retryable) to {output}")
+
+@docs_cli.command('build-corpus')
+@click.option('--docs-dir', default=DOCS_DIR, show_default=True, type=click.Path(exists=True, file_okay=False))
+@click.option('--output', '-o', default=CORPUS_PATH, show_default=True, help='Corpus file path (DOCS_CORPUS_PATH)')
+@click.option('--skip-hidden', is_flag=True, help='Leave out hidden pages even when no visible page has their slug')
+def build_corpus(docs_dir, output, skip_hidden):
+    """Build the deduplicated, content-addressed docs corpus"""
+    stats = write_corpus(docs_dir, output, include_hidden=not skip_hidden)['stats']
+    click.echo(f"  {stats['pages']} pages: {stats['documents']} kept, {stats['superseded']} older versions, "
+               f"{stats['duplicates']} duplicates, {stats['hidden_skipped']} hidden drafts")
+    click.echo(f"  {stats['chunks_seen']} chunks: {stats['exact_duplicates']} exact duplicates removed, "
+               f"{stats['near_duplicates']} near duplicates grouped")
+    click.echo(f"✅ Wrote {stats['chunks']} chunks ({stats['raw_bytes']:,} bytes of docs in "
+               f"{stats['corpus_bytes']:,}) to {output} and {manifest_path(output)}")
+
+@jobs_cli.command('work')
+@click.option('--workers', type=int, help='Concurrent jobs (JOB_WORKERS)')
+def work(workers):
+    """Run queued agent jobs until interrupted"""
+    queue = JobQueue(current_app._get_current_object(), workers=workers or None)
+    if not queue.start():
+        raise click.UsageError('Need at least one worker')
+    click.echo(f"🧵 {queue.workers} job workers running as {queue.worker_id}")
+
+    try:
+        while True:
+            time.sleep(60)
+            click.echo(f"  {queue.metrics()['jobs']}")
+    except KeyboardInterrupt:
+        click.echo("Finishing running jobs...")
+        queue.stop(timeout=queue.lease_seconds)
+
+    click.echo(f"✅ {queue.stats['succeeded']} jobs succeeded, {queue.stats['failed']} failed, "
+               f"{queue.stats['retried']} retried")
@@ -1,29 +1,63 @@
+import json
 from datetime import datetime
 from app import db
+from app.utils.payload_storage import encode_payload, decode_payload
+from app.utils.redaction import redact
 
 class Integration(db.Model):
+    __table_args__ = (
+        # Serves the retention archiver and status-filtered listings
+        db.Index('ix_integration_status_created_at', 'status', 'created_at'),
+        # Lets the live dashboard find writes made by other processes
+        db.Index('ix_integration_updated_at', 'updated_at'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     merchant_id = db.Column(db.String(100), nullable=False)
     integration_type = db.Column(db.String(50), nullable=False)  # 'payment', 'refund', 'status_check'
     status = db.Column(db.String(20), default='pending')  # 'pending', 'success', 'failed'
-    request_payload = db.Column(db.Text, nullable=True)
-    response_data = db.Column(db.Text, nullable=True)
+    # Payload columns are deferred so list queries never load them
+    request_payload = db.deferred(db.Column(db.Text, nullable=True))
+    request_codec = db.Column(db.String(10), nullable=True)  # 'json', 'zlib', 'zstd'
+    response_data = db.deferred(db.Column(db.Text, nullable=True))
+    response_codec = db.Column(db.String(10), nullable=True)
     error_message = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    def to_dict(self):
-        return {
+    def set_request_payload(self, data):
+        """Store the redacted request payload in its compact encoding"""
+        self.request_payload, self.request_codec = encode_payload(redact(data))
+    
+    def set_response_data(self, data):
+        """Store the redacted response data in its compact encoding"""
+        self.response_data, self.response_codec = encode_payload(redact(data))
+    
+    def get_request_payload(self):
+        """Decode the stored request payload"""
+        return decode_payload(self.request_payload, self.request_codec)
+    
+    def get_response_data(self):
+        """Decode the stored response data"""
+        return decode_payload(self.response_data, self.response_codec)
+    
+    def to_dict(self, include_payloads=False):
+        data = {
             'id': self.id,
             'merchant_id': self.merchant_id,
             'integration_type': self.integration_type,
             'status': self.status,
-            'request_payload': self.request_payload,
-            'response_data': self.response_data,
             'error_message': self.error_message,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
+        
+        # Payloads are only decoded for detail views
+        if include_payloads:
+            data['request_payload'] = self.get_request_payload()
+            data['response_data'] = self.get_response_data()
+        
+        return data
 
 class CodeSnippet(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -41,4 +75,53 @@ class CodeSnippet(db.Model):
             'code': self.code,
             'description': self.description,
             'created_at': self.created_at.isoformat()
-        } 
\ No newline at end of file
+        } 
+class Job(db.Model):
+    __table_args__ = (
+        # Serves the worker claim query: next runnable job by priority, then age
+        db.Index('ix_job_status_priority_created_at', 'status', 'priority', 'created_at'),
+    )
+    
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # 'fix_error', 'generate_code', 'agent_chat'
+    status = db.Column(db.String(20), default='queued')  # 'queued', 'running', 'succeeded', 'failed'
+    priority = db.Column(db.Integer, default=0)  # LLM scheduler priority, lower runs first
+    merchant_id = db.Column(db.String(100), nullable=True)
+    payload = db.deferred(db.Column(db.Text, nullable=False))
+    result = db.deferred(db.Column(db.Text, nullable=True))
+    error_message = db.Column(db.Text, nullable=True)
+    progress = db.Column(db.Integer, default=0)  # percent
+    stage = db.Column(db.String(50), nullable=True)
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=3)
+    # Set while a worker holds the job; an expired lease means the worker died
+    locked_by = db.Column(db.String(100), nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def get_result(self):
+        """Decode the stored result"""
+        return json.loads(self.result) if self.result else None
+    
+    def to_dict(self, include_result=False):
+        data = {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'stage': self.stage,
+            'attempts': self.attempts,
+            'error_message': self.error_message,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+        
+        if include_result:
+            data['result'] = self.get_result()
+        
+        return data
@@ -1,10 +1,13 @@
 from flask import Blueprint, request, jsonify
 from app.services.ai_assistant import AIAssistant
+from app.services.llm_scheduler import llm_endpoint, PRIORITY_INTERACTIVE, PRIORITY_CODEGEN
+from app.services.job_queue import job_handler, async_requested, enqueue_request
 from app.models import CodeSnippet, db
 
 ai_bp = Blueprint('ai_assistant', __name__)
 
 @ai_bp.route('/chat', methods=['POST'])
+@llm_endpoint(PRIORITY_INTERACTIVE)
 def chat():
     """AI-powered chat assistance"""
     try:
@@ -27,21 +30,22 @@ def chat():
         }), 500
 
 @ai_bp.route('/fix-error', methods=['POST'])
+@llm_endpoint(PRIORITY_CODEGEN)
 def fix_error():
     """AI-powered error fixing"""
     try:
         data = request.get_json()
-        error_message = data.get('error_message', '')
-        code = data.get('code', '')
-        language = data.get('language', 'python')
+        payload = {
+            'error_message': data.get('error_message', ''),
+            'code': data.get('code', ''),
+            'language': data.get('language', 'python')
+        }
         
-        ai_assistant = AIAssistant()
-        fixed_code = ai_assistant.fix_error(error_message, code, language)
+        # Clients that poll get a job id instead of holding the worker for the LLM call
+        if async_requested():
+            return enqueue_request('fix_error', payload)
         
-        return jsonify({
-            'success': True,
-            'fixed_code': fixed_code
-        })
+        return jsonify(run_fix_error(payload))
         
     except Exception as e:
         return jsonify({
@@ -49,6 +53,17 @@ def fix_error():
             'error': str(e)
         }), 500
 
+@job_handler('fix_error')
+def run_fix_error(payload, report=None):
+    """Fix an error in the submitted code"""
+    ai_assistant = AIAssistant()
+    fixed_code = ai_assistant.fix_error(payload['error_message'], payload['code'], payload['language'])
+    
+    return {
+        'success': True,
+        'fixed_code': fixed_code
+    }
+
 @ai_bp.route('/code-snippets', methods=['GET'])
 def get_code_snippets():
     """Get saved code snippets"""
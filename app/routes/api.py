@@ -1,6 +1,23 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, current_app, abort, stream_with_context
 from app.services.pine_labs import PineLabsService
-from app.models import Integration, db
+from app.services.integration_archive import IntegrationArchive
+from app.services.integration_transfer import IntegrationExporter, EXPORT_FORMATS, CHUNK_BYTES, gzip_stream, import_ndjson, parse_timestamp
+from app.services.llm_client import get_llm_client
+from app.services.llm_scheduler import get_llm_scheduler, llm_endpoint, PRIORITY_BATCH
+from app.services.answer_cache import get_answer_cache
+from app.services.anomaly_detector import get_anomaly_detector, webhook_outcome, EVENT_WEBHOOK
+from app.services.event_bus import get_event_bus
+from app.services.error_catalog import get_error_catalog, describe
+from app.services.code_generator import get_code_generator
+from app.services.docs_corpus import get_docs_corpus
+from app.services.payouts import BulkPayoutValidator
+from app.services.emi_calculator import get_emi_calculator
+from app.services.job_queue import get_job_queue, submit_job, job_accepted, job_kinds, JOB_STATUSES
+from app.utils.singleflight import all_metrics as singleflight_metrics
+from app.models import Integration, Job, db
+from app.utils.database import read_query
+import gzip
+import io
 import json
 
 api_bp = Blueprint('api', __name__)
@@ -10,18 +27,79 @@ def get_integrations():
     """Get all integration attempts"""
     merchant_id = request.args.get('merchant_id')
     
-    query = Integration.query
+    query = read_query(Integration)
     if merchant_id:
         query = query.filter_by(merchant_id=merchant_id)
     
     integrations = query.order_by(Integration.created_at.desc()).all()
     return jsonify([integration.to_dict() for integration in integrations])
 
+@api_bp.route('/integrations/export', methods=['GET'])
+def export_integrations():
+    """Stream integration history as NDJSON or CSV"""
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    
+    try:
+        exporter = IntegrationExporter(
+            merchant_id=request.args.get('merchant_id'),
+            status=request.args.get('status'),
+            since=parse_timestamp(request.args.get('since')),
+            until=parse_timestamp(request.args.get('until')),
+            include_payloads=request.args.get('payloads', '1') != '0'
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    chunks = exporter.stream(export_format)
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    filename = f"integrations.{export_format}"
+    headers = {}
+    
+    # gzip=1 downloads a .gz file; otherwise compress transparently when the client accepts it
+    if request.args.get('gzip') == '1':
+        chunks = gzip_stream(chunks)
+        mimetype = 'application/gzip'
+        filename += '.gz'
+    elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+        chunks = gzip_stream(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    
+    headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
+@api_bp.route('/integrations/import', methods=['POST'])
+def import_integrations():
+    """Bulk-load integration records from an NDJSON body"""
+    try:
+        stream = request.stream
+        if request.headers.get('Content-Encoding') == 'gzip':
+            stream = gzip.GzipFile(fileobj=stream)
+        
+        counts = import_ndjson(
+            stream,
+            batch_size=request.args.get('batch_size', type=int),
+            keep_ids=request.args.get('keep_ids') == '1'
+        )
+        return jsonify({'success': True, **counts})
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @api_bp.route('/integrations/<int:integration_id>', methods=['GET'])
 def get_integration(integration_id):
     """Get specific integration details"""
-    integration = Integration.query.get_or_404(integration_id)
-    return jsonify(integration.to_dict())
+    integration = db.session.get(Integration, integration_id)
+    if integration is not None:
+        return jsonify(integration.to_dict(include_payloads=True))
+    
+    # Fall back to the archive for rows aged out of the hot table
+    archived = IntegrationArchive.from_config(current_app.config).find(integration_id)
+    if archived is None:
+        abort(404)
+    return jsonify(archived)
 
 @api_bp.route('/validate-payload', methods=['POST'])
 def validate_payload():
@@ -39,6 +117,43 @@ def validate_payload():
             'errors': [str(e)]
         }), 500
 
+@api_bp.route('/payouts/validate', methods=['POST'])
+def validate_payouts():
+    """Stream a per-row error report for a bulk payout CSV (multipart "file" or the raw body)"""
+    upload = request.files.get('file')
+    # The raw request stream reads lines a byte at a time without a buffer
+    stream = upload.stream if upload is not None else io.BufferedReader(request.stream, CHUNK_BYTES)
+    filename = upload.filename or '' if upload is not None else ''
+    if request.headers.get('Content-Encoding') == 'gzip' or filename.endswith('.gz'):
+        stream = gzip.GzipFile(fileobj=stream)
+    
+    # MAX_CONTENT_LENGTH caps the upload; the same cap applies to the CSV inside a gzip
+    validator = BulkPayoutValidator(max_bytes=current_app.config.get('MAX_CONTENT_LENGTH'))
+    try:
+        chunks = validator.report(stream)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    headers = {}
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        chunks = gzip_stream(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(stream_with_context(chunks), mimetype='application/x-ndjson', headers=headers)
+
+@api_bp.route('/emi/plans', methods=['GET'])
+def emi_plans():
+    """EMI instalments, interest and discounts of a cart amount for every issuer and tenure"""
+    amount = request.args.get('amount', type=int)
+    if amount is None:
+        return jsonify({'success': False, 'error': 'amount (in paisa) is required'}), 400
+    issuers = [name for value in request.args.getlist('issuer') for name in value.split(',')]
+    
+    try:
+        plans = get_emi_calculator().plans(amount, issuers, card_type=request.args.get('card_type'))
+        return jsonify({'success': True, **plans})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
 @api_bp.route('/simulate-response', methods=['POST'])
 def simulate_response():
     """Simulate API responses for testing"""
@@ -55,4 +170,109 @@ def simulate_response():
         return jsonify({
             'success': False,
             'error': str(e)
-        }), 500 
\ No newline at end of file
+        }), 500 
+
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """LLM scheduling, usage, coalescing, cache and job queue metrics for this process"""
+    return jsonify({
+        'llm_scheduler': get_llm_scheduler().metrics(),
+        'llm_usage': get_llm_client().usage_totals,
+        'singleflight': singleflight_metrics(),
+        'answer_cache': get_answer_cache().metrics(),
+        'anomaly_detector': get_anomaly_detector().metrics(),
+        'error_catalog': get_error_catalog().metrics(),
+        'code_generator': get_code_generator().metrics(),
+        'docs_corpus': get_docs_corpus().metrics(),
+        'emi_calculator': get_emi_calculator().metrics(),
+        'job_queue': get_job_queue().metrics()
+    })
+
+@api_bp.route('/alerts', methods=['GET'])
+def get_alerts():
+    """Failure-rate spike alerts per merchant and payment mode"""
+    detector = get_anomaly_detector()
+    return jsonify({
+        'alerts': detector.alerts(
+            active_only=request.args.get('active') == '1',
+            merchant_id=request.args.get('merchant_id')
+        ),
+        'metrics': detector.metrics()
+    })
+
+@api_bp.route('/errors/explain', methods=['GET'])
+def explain_error():
+    """Look up a Pine Labs error by code and/or message in the documented error catalog"""
+    code, message = request.args.get('code'), request.args.get('message')
+    if not code and not message:
+        return jsonify({'success': False, 'error': 'code or message is required'}), 400
+    
+    known = get_error_catalog().explain({'code': code, 'message': message}, domain=request.args.get('domain'))
+    if known is None:
+        return jsonify({'success': False, 'error': 'Unknown error'}), 404
+    return jsonify({'success': True, 'error': known, 'explanation': describe(known)})
+
+@api_bp.route('/webhooks/pine-labs', methods=['POST'])
+def pine_labs_webhook():
+    """Receive Pine Labs payment webhooks and feed them to the anomaly detector"""
+    body = request.get_data()
+    pine_service = PineLabsService()
+    if not pine_service.webhook_secret and not pine_service.webhook_insecure:
+        return jsonify({'success': False, 'error': 'Webhook secret is not configured'}), 503
+    if not pine_service.verify_webhook_signature(body, request.headers.get('X-verify')):
+        return jsonify({'success': False, 'error': 'Invalid signature'}), 401
+    
+    try:
+        outcome = webhook_outcome(json.loads(body))
+    except (ValueError, AttributeError) as e:
+        return jsonify({'success': False, 'error': f"Invalid webhook body: {str(e)}"}), 400
+    
+    get_event_bus().publish(EVENT_WEBHOOK, outcome)
+    return jsonify({'success': True})
+
+@api_bp.route('/jobs', methods=['POST'])
+@llm_endpoint(PRIORITY_BATCH)
+def create_job():
+    """Queue a background job and return its id for polling"""
+    data = request.get_json(silent=True) or {}
+    kind = data.get('kind')
+    if kind not in job_kinds():
+        return jsonify({'success': False, 'error': f"kind must be one of {', '.join(job_kinds())}"}), 400
+    if not isinstance(data.get('payload'), dict):
+        return jsonify({'success': False, 'error': 'payload must be an object'}), 400
+    
+    try:
+        return job_accepted(submit_job(kind, data['payload'], priority=PRIORITY_BATCH,
+                                       merchant_id=data.get('merchant_id')))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Poll a job's status, progress and result"""
+    # Read from the primary: a replica may not have the job or its latest progress yet
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job.to_dict(include_result=job.status == 'succeeded')})
+
+@api_bp.route('/jobs', methods=['GET'])
+def list_jobs():
+    """Recent jobs, optionally filtered by status and kind"""
+    status = request.args.get('status')
+    if status and status not in JOB_STATUSES:
+        return jsonify({'success': False, 'error': f"status must be one of {', '.join(JOB_STATUSES)}"}), 400
+    
+    query = Job.query
+    if status:
+        query = query.filter_by(status=status)
+    if request.args.get('kind'):
+        query = query.filter_by(kind=request.args['kind'])
+    
+    jobs = query.order_by(Job.created_at.desc()).limit(request.args.get('limit', 50, type=int)).all()
+    return jsonify([job.to_dict() for job in jobs])
@@ -1,34 +1,109 @@
-from flask import Blueprint, render_template
-from app.models import Integration, db
-from sqlalchemy import func
+import json
+import os
+import threading
+from flask import Blueprint, Response, current_app, render_template, request, jsonify, stream_with_context
+from app.models import Integration
+from app.services.anomaly_detector import get_anomaly_detector
+from app.services.event_bus import get_event_bus
+from app.services.live_stats import get_live_stats
+from app.server import is_draining
+from app.utils.database import read_query
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
+# Seconds an idle SSE stream waits before a keep-alive, and the long-poll cap
+SSE_KEEPALIVE_SECONDS = 15
+LONG_POLL_MAX_SECONDS = 30
+# Each open stream holds a worker thread for as long as the tab is open, so only
+# this many per process get one; the rest are sent to the long-poll endpoint
+SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', max(1, int(os.getenv('WEB_THREADS', 4)) // 2)))
+_sse_streams = threading.BoundedSemaphore(SSE_MAX_STREAMS)
+
 @dashboard_bp.route('/')
 def dashboard():
     """Integration dashboard"""
-    # Get integration statistics
-    total_integrations = Integration.query.count()
-    successful_integrations = Integration.query.filter_by(status='success').count()
-    failed_integrations = Integration.query.filter_by(status='failed').count()
-    
+    # Counters come from the live stats, kept current by integration events
+    stats = get_live_stats().snapshot()
+
     # Get recent integrations
-    recent_integrations = Integration.query.order_by(Integration.created_at.desc()).limit(10).all()
-    
-    # Get integration types breakdown
-    type_stats = db.session.query(
-        Integration.integration_type,
-        func.count(Integration.id).label('count')
-    ).group_by(Integration.integration_type).all()
-    
-    stats = {
-        'total': total_integrations,
-        'successful': successful_integrations,
-        'failed': failed_integrations,
-        'success_rate': (successful_integrations / total_integrations * 100) if total_integrations > 0 else 0,
-        'type_breakdown': dict(type_stats)
-    }
-    
-    return render_template('dashboard.html', 
-                         stats=stats, 
-                         recent_integrations=recent_integrations) 
\ No newline at end of file
+    recent_integrations = read_query(Integration).order_by(Integration.created_at.desc()).limit(10).all()
+
+    return render_template('dashboard.html',
+                         stats=stats,
+                         recent_integrations=recent_integrations,
+                         alerts=get_anomaly_detector().alerts(active_only=True),
+                         last_event_id=get_event_bus().last_id)
+
+@dashboard_bp.route('/stats')
+def stats():
+    """Current dashboard counters"""
+    return jsonify(get_live_stats().snapshot())
+
+def _resync_event():
+    """Tells a client it missed events and should replace its counters"""
+    return {'id': get_event_bus().last_id, 'type': 'resync', 'data': {'stats': get_live_stats().snapshot()}}
+
+@dashboard_bp.route('/events')
+def events():
+    """Server-sent events feed of integration writes and stat deltas"""
+    if not _sse_streams.acquire(blocking=False):
+        response = jsonify({
+            'success': False,
+            'error': 'Too many open event streams; use the long-poll feed',
+            'poll_url': '/dashboard/events/poll'
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+    bus = get_event_bus()
+    bus.connect()
+    get_live_stats().watch(current_app._get_current_object())
+    # Browsers resend the last id they saw when reconnecting
+    after_id = request.headers.get('Last-Event-ID', type=int)
+    if after_id is None:
+        after_id = request.args.get('after', type=int)
+    if after_id is None:
+        after_id = bus.last_id
+
+    def stream(after_id):
+        yield "retry: 3000\n\n"
+        while not is_draining():
+            batch = bus.wait(after_id, SSE_KEEPALIVE_SECONDS)
+            if batch is None:
+                batch = [_resync_event()]
+            if not batch:
+                yield ": keep-alive\n\n"
+                continue
+            for item in batch:
+                yield f"id: {item['id']}\nevent: {item['type']}\ndata: {json.dumps(item['data'])}\n\n"
+            after_id = batch[-1]['id']
+
+    response = Response(stream_with_context(stream(after_id)), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Runs when the client disconnects or the stream ends, even if it never started
+    response.call_on_close(_sse_streams.release)
+    response.call_on_close(bus.disconnect)
+    return response
+
+@dashboard_bp.route('/events/poll')
+def poll_events():
+    """Long-poll variant of the events feed for clients without EventSource"""
+    bus = get_event_bus()
+    after_id = request.args.get('after', bus.last_id, type=int)
+    timeout = min(request.args.get('timeout', 25, type=float), LONG_POLL_MAX_SECONDS)
+
+    bus.connect()
+    try:
+        get_live_stats().watch(current_app._get_current_object())
+        batch = bus.wait(after_id, timeout)
+    finally:
+        bus.disconnect()
+    if batch is None:
+        batch = [_resync_event()]
+
+    return jsonify({
+        'events': batch,
+        'last_id': batch[-1]['id'] if batch else after_id
+    })
@@ -2,7 +2,10 @@ from flask import Blueprint, render_template, request, jsonify
 from app.services.pine_labs import PineLabsService
 from app.services.react_agent import ReActAgent
 from app.models import Integration, db
-import json
+from app.services.llm_scheduler import llm_endpoint, PRIORITY_CODEGEN
+from app.services.code_generator import get_code_generator
+from app.services.job_queue import job_handler, async_requested, enqueue_request
+from app.server import is_draining
 
 main_bp = Blueprint('main', __name__)
 
@@ -26,6 +29,13 @@ def react_page():
     """ReAct Agent Interface"""
     return render_template('react_interface.html')
 
+@main_bp.route('/healthz')
+def healthz():
+    """Health check that fails while the worker drains"""
+    if is_draining():
+        return jsonify({'status': 'draining'}), 503
+    return jsonify({'status': 'ok'})
+
 @main_bp.route('/test-integration', methods=['POST'])
 def test_integration():
     """Test Pine Labs API integration"""
@@ -35,9 +45,9 @@ def test_integration():
         # Create integration record
         integration = Integration(
             merchant_id=data.get('merchant_id', 'test_merchant'),
-            integration_type=data.get('type', 'payment'),
-            request_payload=json.dumps(data)
+            integration_type=data.get('type', 'payment')
         )
+        integration.set_request_payload(data)
         db.session.add(integration)
         db.session.commit()
         
@@ -47,7 +57,7 @@ def test_integration():
         
         # Update integration record
         integration.status = 'success' if result.get('success') else 'failed'
-        integration.response_data = json.dumps(result)
+        integration.set_response_data(result)
         if not result.get('success'):
             integration.error_message = result.get('error', 'Unknown error')
         db.session.commit()
@@ -63,26 +73,54 @@ def test_integration():
 @main_bp.route('/generate-code', methods=['POST'])
 def generate_code():
     """Generate code snippets for integration"""
-    try:
-        data = request.get_json()
-        language = data.get('language', 'python')
-        integration_type = data.get('type', 'payment')
-        
-        agent = ReActAgent()
-        result = agent.reason_and_act(
-            f"Generate {language} code for {integration_type} integration",
-            {"action": "generate_code", "language": language, "integration_type": integration_type}
-        )
-        
+    data = request.get_json(silent=True) or {}
+    language = data.get('language', 'python')
+    integration_type = data.get('type', 'payment')
+    
+    # Standard integrations are pre-rendered from the API collection; only custom requests reach the LLM
+    code = get_code_generator().render(language, integration_type)
+    if code is not None:
         return jsonify({
             'success': True,
-            'code': result.get('result', {}).get('code', ''),
+            'code': code,
             'language': language,
-            'integration_type': integration_type
+            'integration_type': integration_type,
+            'source': 'template'
         })
+    return _generate_code_with_agent(language, integration_type)
+
+@llm_endpoint(PRIORITY_CODEGEN)
+def _generate_code_with_agent(language: str, integration_type: str):
+    """Generate code for a custom integration with the agent"""
+    try:
+        payload = {'language': language, 'integration_type': integration_type}
+        if async_requested():
+            return enqueue_request('generate_code', payload)
+        
+        return jsonify(run_generate_code(payload))
         
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
-        }), 500 
\ No newline at end of file
+        }), 500 
+
+@job_handler('generate_code')
+def run_generate_code(payload, report=None):
+    """Generate code for a custom integration with the agent"""
+    language = payload['language']
+    integration_type = payload['integration_type']
+    agent = ReActAgent()
+    result = agent.reason_and_act(
+        f"Generate {language} code for {integration_type} integration",
+        {"action": "generate_code", "language": language, "integration_type": integration_type},
+        on_step=report
+    )
+    
+    return {
+        'success': True,
+        'code': result.get('result', {}).get('code', ''),
+        'language': language,
+        'integration_type': integration_type,
+        'source': 'llm'
+    }
@@ -1,11 +1,36 @@
-from flask import Blueprint, request, jsonify, render_template
+from flask import Blueprint, request, jsonify, render_template, session
 from app.services.react_agent import ReActAgent
+from app.services.state_store import get_state_store
+from app.services.llm_scheduler import llm_endpoint, PRIORITY_INTERACTIVE
+from app.services.job_queue import job_handler, async_requested, enqueue_request
 import json
+import os
+import uuid
 
 react_bp = Blueprint('react_assistant', __name__)
 
-# Global agent instance
-react_agent = ReActAgent()
+# Conversation memory lives in the shared state store, keyed by session,
+# so any worker process can continue any conversation
+SESSION_TTL = int(os.getenv('AGENT_SESSION_TTL', 86400))
+
+def _session_id() -> str:
+    """Resolve the conversation id from the header, request body or cookie session"""
+    session_id = request.headers.get('X-Session-Id')
+    if not session_id and request.is_json:
+        session_id = (request.get_json(silent=True) or {}).get('session_id')
+    if not session_id:
+        session_id = session.setdefault('react_session_id', uuid.uuid4().hex)
+    return session_id
+
+def load_agent(session_id: str = None) -> ReActAgent:
+    """Build an agent with this session's conversation memory"""
+    agent = ReActAgent()
+    agent.memory.load_state(get_state_store('agent').get(session_id or _session_id()))
+    return agent
+
+def save_agent(agent: ReActAgent, session_id: str = None):
+    """Persist the agent's conversation memory for the next request"""
+    get_state_store('agent').set(session_id or _session_id(), agent.memory.to_state(), ttl=SESSION_TTL)
 
 @react_bp.route('/')
 def react_interface():
@@ -13,6 +38,7 @@ def react_interface():
     return render_template('react_interface.html')
 
 @react_bp.route('/chat', methods=['POST'])
+@llm_endpoint(PRIORITY_INTERACTIVE)
 def chat():
     """Handle ReAct agent conversation"""
     try:
@@ -26,18 +52,14 @@ def chat():
                 'error': 'Message is required'
             }), 400
         
-        # Process through ReAct agent
-        response = react_agent.reason_and_act(user_message, context)
+        payload = {'message': user_message, 'context': context, 'session_id': _session_id()}
         
-        return jsonify({
-            'success': True,
-            'response': response.get('response', ''),
-            'reasoning': response.get('reasoning', ''),
-            'action_taken': response.get('action_taken'),
-            'observation': response.get('observation', ''),
-            'result': response.get('result', {}),
-            'timestamp': json.dumps(response.get('timestamp', ''))
-        })
+        # Multi-step requests can run on the job workers while the client polls. The worker that
+        # claims the job may be another process, so that needs a shared session store.
+        if async_requested() and get_state_store('agent').shared:
+            return enqueue_request('agent_chat', payload)
+        
+        return jsonify(run_agent_chat(payload))
         
     except Exception as e:
         return jsonify({
@@ -45,11 +67,28 @@ def chat():
             'error': str(e)
         }), 500
 
+@job_handler('agent_chat')
+def run_agent_chat(payload, report=None):
+    """Process a message through the ReAct agent with the session's memory"""
+    react_agent = load_agent(payload['session_id'])
+    response = react_agent.reason_and_act(payload['message'], payload['context'], on_step=report)
+    save_agent(react_agent, payload['session_id'])
+    
+    return {
+        'success': True,
+        'response': response.get('response', ''),
+        'reasoning': response.get('reasoning', ''),
+        'action_taken': response.get('action_taken'),
+        'observation': response.get('observation', ''),
+        'result': response.get('result', {}),
+        'timestamp': json.dumps(response.get('timestamp', ''))
+    }
+
 @react_bp.route('/conversation', methods=['GET'])
 def get_conversation():
     """Get conversation history"""
     try:
-        history = react_agent.get_conversation_history()
+        history = load_agent().get_conversation_history()
         return jsonify({
             'success': True,
             'conversation': history
@@ -61,11 +100,26 @@ def get_conversation():
             'error': str(e)
         }), 500
 
+@react_bp.route('/artifacts/<ref>', methods=['GET'])
+def get_artifact(ref):
+    """Get the full content of a large result referenced in the conversation"""
+    content = load_agent().get_artifact(ref)
+    if content is None:
+        return jsonify({
+            'success': False,
+            'error': 'Artifact not found'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'content': content
+    })
+
 @react_bp.route('/clear', methods=['POST'])
 def clear_conversation():
     """Clear conversation history"""
     try:
-        react_agent.clear_conversation()
+        get_state_store('agent').delete(_session_id())
         return jsonify({
             'success': True,
             'message': 'Conversation cleared'
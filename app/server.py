@@ -0,0 +1,118 @@
+import os
+import signal
+import threading
+from app import db
+from app.utils.warmup import warm_up
+from app.services.job_queue import start_job_workers, stop_job_workers
+
+# Set once the process starts shutting down; /healthz reports 503 from then on
+_draining = threading.Event()
+
+def begin_drain():
+    """Mark this process as draining so load balancers stop routing to it"""
+    _draining.set()
+
+def is_draining() -> bool:
+    """Whether this process is draining"""
+    return _draining.is_set()
+
+def default_workers() -> int:
+    """Worker processes from WEB_CONCURRENCY, defaulting to one per core"""
+    return int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1))
+
+def default_threads() -> int:
+    """Threads per worker from WEB_THREADS"""
+    return int(os.getenv('WEB_THREADS', 4))
+
+def serve(app, host: str, port: int, workers: int, threads: int, graceful_timeout: int = 30):
+    """Serve the app with gunicorn (multi-process) or waitress (multi-threaded)"""
+    try:
+        import gunicorn
+    except ImportError:
+        gunicorn = None
+
+    # Worker processes must share sessions, or a conversation is lost when a request lands elsewhere
+    if gunicorn is not None and workers > 1:
+        backend = os.getenv('STATE_BACKEND', '').lower()
+        if backend == 'memory':
+            raise SystemExit("❌ STATE_BACKEND=memory is per-process and loses conversations across "
+                             f"{workers} workers; use sqlite or redis, or run with --workers 1")
+        if not backend:
+            os.environ['STATE_BACKEND'] = 'sqlite'
+            print(f"🗄️  Sharing sessions across workers in {os.getenv('STATE_SQLITE_PATH', 'pine_state.db')} "
+                  "(STATE_BACKEND=sqlite)")
+
+    # Templates and indexes are loaded once here and shared copy-on-write by workers
+    warm_up(app)
+
+    if gunicorn is not None:
+        _serve_gunicorn(app, host, port, workers, threads, graceful_timeout)
+    else:
+        _serve_waitress(app, host, port, threads, graceful_timeout)
+
+def _serve_gunicorn(app, host: str, port: int, workers: int, threads: int, graceful_timeout: int):
+    """Pre-forking gunicorn server with threaded workers"""
+    from gunicorn.app.base import BaseApplication
+
+    def post_fork(server, worker):
+        # Connections opened while preloading must not be shared with the parent
+        with app.app_context():
+            db.engine.dispose()
+        # Worker threads do not survive fork, so each worker starts its own job workers
+        start_job_workers(app)
+
+    def post_worker_init(worker):
+        # gunicorn already handles SIGTERM by finishing in-flight requests
+        # within graceful_timeout; flag the drain first so health checks fail fast
+        gunicorn_handler = signal.getsignal(signal.SIGTERM)
+
+        def handle_term(signum, frame):
+            begin_drain()
+            stop_job_workers()
+            gunicorn_handler(signum, frame)
+
+        signal.signal(signal.SIGTERM, handle_term)
+
+    class PineGunicornApplication(BaseApplication):
+        def __init__(self):
+            self.options = {
+                'bind': f"{host}:{port}",
+                'workers': workers,
+                'threads': threads,
+                'worker_class': 'gthread',
+                'preload_app': True,
+                'graceful_timeout': graceful_timeout,
+                'timeout': int(os.getenv('WEB_TIMEOUT', 120)),
+                'post_fork': post_fork,
+                'post_worker_init': post_worker_init
+            }
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    PineGunicornApplication().run()
+
+def _serve_waitress(app, host: str, port: int, threads: int, graceful_timeout: int):
+    """Single-process waitress server for platforms without fork"""
+    from waitress import create_server
+
+    server = create_server(app, host=host, port=port, threads=threads)
+    start_job_workers(app)
+
+    def drain():
+        # Let queued and in-flight requests finish before closing sockets
+        stop_job_workers()
+        server.task_dispatcher.shutdown(cancel_pending=False, timeout=graceful_timeout)
+        server.close()
+
+    def handle_term(signum, frame):
+        begin_drain()
+        threading.Thread(target=drain, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, handle_term)
+    server.run()
@@ -1,15 +1,27 @@
-import openai
-import os
 from typing import Dict, Any
 import json
+from app.services.llm_client import get_llm_client
+from app.services.answer_cache import get_answer_cache
+from app.services.error_catalog import get_error_catalog, describe, as_comment
+from app.services.llm_scheduler import slot_granted
+from app.utils.singleflight import coalesce
+from app.utils.code_context import minimize_code
 
 class AIAssistant:
     def __init__(self):
-        openai.api_key = os.getenv('OPENAI_API_KEY')
-        self.model = "gpt-3.5-turbo"
+        self.llm = get_llm_client()
+        self.model = self.llm.model
     
+    @coalesce('ai_assistant', share=slot_granted)
     def chat(self, message: str, context: Dict[str, Any] = None) -> str:
         """AI-powered chat assistance for integration questions"""
+        # Context-free questions can reuse answers to near-identical earlier ones
+        answer_cache = get_answer_cache() if not context else None
+        if answer_cache is not None:
+            cached = answer_cache.lookup(message, 'ai_chat')
+            if cached is not None:
+                return cached
+        
         try:
             system_prompt = """
             You are an AI assistant specialized in Pine Labs payment API integration.
@@ -33,18 +45,21 @@ class AIAssistant:
                 context_str = f"Context: {json.dumps(context)}"
                 messages.insert(1, {"role": "system", "content": context_str})
             
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=messages,
+            response = self.llm.chat(
+                messages,
                 max_tokens=500,
                 temperature=0.7
             )
             
-            return response.choices[0].message.content.strip()
+            answer = response.content.strip()
+            if answer_cache is not None:
+                answer_cache.store(message, answer, 'ai_chat')
+            return answer
             
         except Exception as e:
             return f"I apologize, but I'm having trouble processing your request. Error: {str(e)}"
     
+    @coalesce('ai_assistant', share=slot_granted)
     def generate_code(self, language: str, integration_type: str) -> str:
         """Generate code snippets for different integration types"""
         try:
@@ -98,30 +113,38 @@ class AIAssistant:
                 {"role": "user", "content": prompt}
             ]
             
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=messages,
+            response = self.llm.chat(
+                messages,
                 max_tokens=1000,
                 temperature=0.3
             )
             
-            return response.choices[0].message.content.strip()
+            return response.content.strip()
             
         except Exception as e:
             return f"// Error generating code: {str(e)}"
     
+    @coalesce('ai_assistant', share=slot_granted)
     def fix_error(self, error_message: str, code: str, language: str) -> str:
         """AI-powered error fixing for integration code"""
+        known = get_error_catalog().explain(error_message)
+        if known and not known['fix_in_request']:
+            # Declines and outages are not fixed in code: answer from the docs without the LLM
+            return f"{as_comment(describe(known), language)}\n{code}"
+        
         try:
+            documented = f"\n            Pine Labs documents this error as: {describe(known)}\n" if known else ""
+            # Large inputs are cut down to the code around the error and spliced back afterwards
+            context = minimize_code(code, error_message, language)
             prompt = f"""
             I have this {language} code that's causing an error with Pine Labs API integration:
             
             Error: {error_message}
-            
+            {documented}
             Code:
-            {code}
+            {context.prompt_block()}
             
-            Please fix the error and provide the corrected code with explanations.
+            {context.instructions()}
             Focus on Pine Labs API best practices and common integration mistakes.
             """
             
@@ -130,14 +153,17 @@ class AIAssistant:
                 {"role": "user", "content": prompt}
             ]
             
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=messages,
+            response = self.llm.chat(
+                messages,
                 max_tokens=1000,
                 temperature=0.2
             )
             
-            return response.choices[0].message.content.strip()
+            reply = response.content.strip()
+            fixed_code, explanation = context.splice(reply)
+            if fixed_code is None:
+                return reply
+            return f"{as_comment(explanation, language)}\n{fixed_code}" if explanation else fixed_code
             
         except Exception as e:
             return f"// Error fixing code: {str(e)}" 
\ No newline at end of file
@@ -0,0 +1,309 @@
+import itertools
+import math
+import os
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional, Tuple
+from app.services.event_bus import get_event_bus
+
+EVENT_ALERT_RAISED = 'alert.raised'
+EVENT_ALERT_RESOLVED = 'alert.resolved'
+EVENT_WEBHOOK = 'payment.webhook'
+
+# Integration statuses and webhook events that are payment outcomes
+OUTCOMES = {'success': False, 'failed': True}
+WEBHOOK_OUTCOMES = {
+    'payment.captured': False,
+    'payment.completion': False,
+    'payment.failed': True,
+    'payment.refund.success': False,
+    'payment.refund.failed': True
+}
+PAYMENT_MODE_KEYS = ('payment_mode', 'payment_method', 'mode_of_payment')
+OTHER_REASON = 'OTHER'
+_VOLATILE = re.compile(r'\d+')
+_SPACES = re.compile(r'\s+')
+
+def payment_mode_of(payload: Any) -> Optional[str]:
+    """Payment mode named in a request payload, gateway response or webhook body"""
+    if not isinstance(payload, dict):
+        return None
+    for key in PAYMENT_MODE_KEYS:
+        if payload.get(key):
+            return str(payload[key]).upper()
+    # Fetch Order responses list the attempts under payments
+    payments = payload.get('payments')
+    if isinstance(payments, list) and payments and isinstance(payments[0], dict):
+        return payment_mode_of(payments[0])
+    return None
+
+def normalize_reason(reason: Optional[str]) -> Optional[str]:
+    """Fold order ids and amounts out of a failure message so one reason is one series"""
+    if not reason:
+        return None
+    reason = _SPACES.sub(' ', _VOLATILE.sub('#', str(reason))).strip().upper()
+    return reason[:80] or None
+
+class AnomalyDetector:
+    """Streaming failure-rate spike detection per merchant, payment mode and failure reason
+
+    Each (merchant, mode) series keeps a fast and a slow time-decayed count of
+    outcomes and failures; each (merchant, mode, reason) series keeps decayed
+    counts of failures with that reason, measured against its parent's outcomes.
+    Counters live in flat arrays indexed by series slot, so an event costs two
+    constant-time updates and no database access. An alert is raised when the
+    fast rate exceeds the slow baseline by `sensitivity` standard errors, and
+    resolved once it falls back under half of that.
+    """
+
+    COLUMNS = ('updated', 'fast_n', 'fast_bad', 'slow_n', 'slow_bad')
+
+    def __init__(self, fast_half_life: float = None, slow_half_life: float = None, sensitivity: float = None,
+                 min_events: float = None, min_delta: float = None, max_series: int = None,
+                 max_reasons: int = None, history_size: int = None):
+        self.fast_half_life = fast_half_life or float(os.getenv('ANOMALY_FAST_HALF_LIFE', 300))
+        self.slow_half_life = slow_half_life or float(os.getenv('ANOMALY_SLOW_HALF_LIFE', 21600))
+        self.sensitivity = sensitivity or float(os.getenv('ANOMALY_SENSITIVITY', 3))
+        self.min_events = min_events or float(os.getenv('ANOMALY_MIN_EVENTS', 20))
+        self.min_delta = min_delta or float(os.getenv('ANOMALY_MIN_DELTA', 0.1))
+        self.max_series = max_series or int(os.getenv('ANOMALY_MAX_SERIES', 50000))
+        self.max_reasons = max_reasons or int(os.getenv('ANOMALY_MAX_REASONS', 20))
+
+        self._fast_rate = math.log(2) / self.fast_half_life
+        self._slow_rate = math.log(2) / self.slow_half_life
+        self._lock = threading.Lock()
+        self._slots: Dict[Tuple[str, str, Optional[str]], int] = {}
+        self._keys: List[Tuple[str, str, Optional[str]]] = []
+        self._parent = array('l')
+        self._reasons = array('l')
+        for column in self.COLUMNS:
+            setattr(self, f'_{column}', array('d'))
+
+        self._active: Dict[int, Dict[str, Any]] = {}
+        self._history = deque(maxlen=history_size or int(os.getenv('ANOMALY_HISTORY_SIZE', 200)))
+        self._alert_ids = itertools.count(1)
+        # Payment mode of integrations still pending, for updates that carry no payload
+        self._pending_modes = OrderedDict()
+        self.stats = {'events': 0, 'dropped': 0, 'raised': 0, 'resolved': 0}
+
+    def _slot(self, key: Tuple[str, str, Optional[str]], parent: int = -1) -> int:
+        slot = self._slots.get(key)
+        if slot is not None:
+            return slot
+        if len(self._keys) >= self.max_series:
+            return -1
+        if parent >= 0:
+            if self._reasons[parent] >= self.max_reasons and key[2] != OTHER_REASON:
+                # Too many distinct reasons for one merchant and mode: fold the rest together
+                return self._slot((key[0], key[1], OTHER_REASON), parent)
+            self._reasons[parent] += 1
+        slot = len(self._keys)
+        self._slots[key] = slot
+        self._keys.append(key)
+        self._parent.append(parent)
+        self._reasons.append(0)
+        for column in self.COLUMNS:
+            getattr(self, f'_{column}').append(0.0)
+        return slot
+
+    def _decay(self, slot: int, now: float):
+        """Bring a series' decayed counts forward to now"""
+        elapsed = now - self._updated[slot]
+        if elapsed > 0:
+            fast, slow = math.exp(-self._fast_rate * elapsed), math.exp(-self._slow_rate * elapsed)
+            self._fast_n[slot] *= fast
+            self._fast_bad[slot] *= fast
+            self._slow_n[slot] *= slow
+            self._slow_bad[slot] *= slow
+        self._updated[slot] = now
+
+    def _rates(self, slot: int) -> Tuple[float, float, float]:
+        """Fast rate, baseline rate and fast event count of a series (decayed to its last update)"""
+        parent = self._parent[slot]
+        counts = parent if parent >= 0 else slot
+        fast_n, slow_n = self._fast_n[counts], self._slow_n[counts]
+        if fast_n <= 0 or slow_n <= 0:
+            return 0.0, 0.0, 0.0
+        return min(self._fast_bad[slot] / fast_n, 1.0), min(self._slow_bad[slot] / slow_n, 1.0), fast_n
+
+    def _score(self, slot: int) -> Tuple[float, float, float, float]:
+        current, baseline, events = self._rates(slot)
+        if events <= 0:
+            return current, baseline, events, 0.0
+        # Floor the baseline so a series that never failed does not alert on a single failure
+        spread = max(baseline, 0.01)
+        return current, baseline, events, (current - baseline) / math.sqrt(spread * (1 - min(spread, 0.99)) / events)
+
+    def observe(self, merchant_id: str, payment_mode: Optional[str], failed: bool, reason: Optional[str] = None,
+                now: float = None) -> List[Dict[str, Any]]:
+        """Count one payment outcome; returns alerts raised or resolved by it"""
+        now = time.time() if now is None else now
+        changes = []
+        with self._lock:
+            self.stats['events'] += 1
+            parent = self._slot((str(merchant_id), payment_mode or 'UNKNOWN', None))
+            if parent < 0:
+                self.stats['dropped'] += 1
+                return changes
+
+            self._decay(parent, now)
+            self._fast_n[parent] += 1
+            self._slow_n[parent] += 1
+            if failed:
+                self._fast_bad[parent] += 1
+                self._slow_bad[parent] += 1
+            changes.extend(self._evaluate(parent, now))
+
+            if failed and reason:
+                slot = self._slot((self._keys[parent][0], self._keys[parent][1], reason), parent)
+                if slot >= 0:
+                    self._decay(slot, now)
+                    self._fast_bad[slot] += 1
+                    self._slow_bad[slot] += 1
+                    changes.extend(self._evaluate(slot, now))
+
+        for kind, alert in changes:
+            get_event_bus().publish(kind, {'alert': alert})
+        return [alert for _, alert in changes]
+
+    def _evaluate(self, slot: int, now: float) -> List[Tuple[str, Dict[str, Any]]]:
+        """Raise or resolve the alert of one series"""
+        current, baseline, events, score = self._score(slot)
+        alert = self._active.get(slot)
+
+        if alert is None:
+            if events >= self.min_events and current - baseline >= self.min_delta and score >= self.sensitivity:
+                alert = self._new_alert(slot, current, baseline, events, score, now)
+                self._active[slot] = alert
+                self._history.appendleft(alert)
+                self.stats['raised'] += 1
+                return [(EVENT_ALERT_RAISED, dict(alert))]
+            return []
+
+        alert.update(current_rate=round(current, 4), events=round(events, 1), score=round(score, 2))
+        if current - baseline < self.min_delta / 2 or score < self.sensitivity / 2:
+            alert['resolved_at'] = now
+            del self._active[slot]
+            self.stats['resolved'] += 1
+            return [(EVENT_ALERT_RESOLVED, dict(alert))]
+        return []
+
+    def _new_alert(self, slot: int, current: float, baseline: float, events: float, score: float,
+                   now: float) -> Dict[str, Any]:
+        merchant_id, payment_mode, reason = self._keys[slot]
+        if reason is None:
+            kind = 'sr_drop'
+            message = (f"SR drop for {merchant_id} on {payment_mode}: success rate "
+                       f"{(1 - current) * 100:.0f}% vs {(1 - baseline) * 100:.0f}% baseline")
+        else:
+            kind = 'failure_reason_spike'
+            message = (f"Spike in failure reason {reason} for {merchant_id} on {payment_mode}: "
+                       f"{current * 100:.0f}% of transactions vs {baseline * 100:.0f}% baseline")
+        return {
+            'id': next(self._alert_ids),
+            'kind': kind,
+            'merchant_id': merchant_id,
+            'payment_mode': payment_mode,
+            'failure_reason': reason,
+            'current_rate': round(current, 4),
+            'baseline_rate': round(baseline, 4),
+            'events': round(events, 1),
+            'score': round(score, 2),
+            'message': message,
+            'raised_at': now,
+            'resolved_at': None
+        }
+
+    def alerts(self, active_only: bool = False, merchant_id: str = None, now: float = None) -> List[Dict[str, Any]]:
+        """Active alerts (re-checked against decayed counts) and recent history, newest first"""
+        now = time.time() if now is None else now
+        changes = []
+        with self._lock:
+            # A spike that simply stopped has no further events to resolve it
+            for slot in list(self._active):
+                self._decay(slot, now)
+                parent = self._parent[slot]
+                if parent >= 0:
+                    self._decay(parent, now)
+                changes.extend(self._evaluate(slot, now))
+            alerts = list(self._active.values()) if active_only else list(self._history)
+            alerts = [dict(alert) for alert in alerts if merchant_id is None or alert['merchant_id'] == merchant_id]
+
+        for kind, alert in changes:
+            get_event_bus().publish(kind, {'alert': alert})
+        return sorted(alerts, key=lambda alert: alert['id'], reverse=True)
+
+    def handle_event(self, event: Dict[str, Any]):
+        """Event bus listener for integration writes and gateway webhooks"""
+        data = event['data']
+        if event['type'] == EVENT_WEBHOOK:
+            if data.get('failed') is not None:
+                self.observe(data['merchant_id'], data.get('payment_mode'), data['failed'], data.get('failure_reason'))
+            return
+        if not event['type'].startswith('integration.'):
+            return
+
+        integration = data['integration']
+        mode = integration.get('payment_mode')
+        with self._lock:
+            if integration['status'] not in OUTCOMES:
+                if mode:
+                    self._remember_mode(integration['id'], mode)
+                return
+            mode = mode or self._pending_modes.pop(integration['id'], None)
+        mode = mode or (integration.get('integration_type') or '').upper()
+
+        failed = OUTCOMES[integration['status']]
+        self.observe(integration['merchant_id'], mode, failed,
+                     normalize_reason(integration.get('error_message')) if failed else None)
+
+    def _remember_mode(self, integration_id: int, mode: str):
+        self._pending_modes[integration_id] = mode
+        if len(self._pending_modes) > self.max_series:
+            self._pending_modes.popitem(last=False)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, series=len(self._keys), active_alerts=len(self._active))
+
+_anomaly_detector = None
+_anomaly_detector_lock = threading.Lock()
+
+def get_anomaly_detector() -> AnomalyDetector:
+    """Get the process-wide anomaly detector"""
+    global _anomaly_detector
+    if _anomaly_detector is None:
+        with _anomaly_detector_lock:
+            if _anomaly_detector is None:
+                _anomaly_detector = AnomalyDetector()
+    return _anomaly_detector
+
+_installed = False
+
+def install_anomaly_detector():
+    """Feed integration and webhook events from the event bus into the detector"""
+    global _installed
+    if _installed:
+        return
+    get_event_bus().subscribe(get_anomaly_detector().handle_event)
+    _installed = True
+
+def webhook_outcome(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Detector fields of a Pine Labs webhook body"""
+    response = body.get('merchant_response') or {}
+    event_name = body.get('event_name')
+    failed = WEBHOOK_OUTCOMES.get(event_name)
+    reason = None
+    if failed:
+        reason = response.get('parent_txn_response_message') or response.get('txn_response_msg')
+    return {
+        'event_name': event_name,
+        'merchant_id': str(response.get('merchant_id') or ''),
+        'order_id': response.get('unique_merchant_txn_id'),
+        'payment_mode': payment_mode_of(response),
+        'failed': failed,
+        'failure_reason': normalize_reason(reason)
+    }
@@ -0,0 +1,200 @@
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Any, List, Optional
+
+DOCS_DIR = os.getenv(
+    'PINE_DOCS_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                 'AirTribe', 'Integration Docs')
+)
+
+# Question filler plus words that carry no topic in this domain
+STOPWORDS = {
+    'a', 'an', 'the', 'i', 'me', 'my', 'we', 'you', 'your', 'to', 'for', 'of', 'in', 'on',
+    'and', 'or', 'is', 'are', 'do', 'does', 'can', 'could', 'should', 'would', 'how', 'what',
+    'which', 'when', 'where', 'please', 'with', 'it', 'this', 'that', 'be', 'about', 'tell',
+    'explain', 'show', 'api', 'apis', 'pine', 'labs', 'pinelabs', 'step', 'process', 'way',
+    'guide', 'help', 'using', 'use'
+}
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+NUMBER_PATTERN = re.compile(r"\d+")
+SHINGLE_SIZE = 4
+MERSENNE_PRIME = (1 << 61) - 1
+
+def _stem(word: str) -> str:
+    """Very light suffix stripping so 'refunds'/'refunding' match 'refund'"""
+    if word.endswith(('ss', 'us')):
+        return word
+    for suffix in ('ing', 'ed', 'es', 's'):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+def normalize_query(text: str) -> str:
+    """Lowercase, drop filler words, stem and sort so word order does not matter"""
+    stems = (_stem(word) for word in WORD_PATTERN.findall((text or '').lower()) if word not in STOPWORDS)
+    words = {stem for stem in stems if stem not in STOPWORDS}
+    return ' '.join(sorted(words))
+
+def query_numbers(text: str) -> tuple:
+    """Numbers in the query, which must match exactly (refund 100 is not refund 1000)"""
+    return tuple(sorted(set(NUMBER_PATTERN.findall(text or ''))))
+
+def _shingles(text: str) -> set:
+    """Character shingles of the normalized query"""
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+def docs_version(docs_dir: str = DOCS_DIR) -> str:
+    """Fingerprint of the docs tree (paths, sizes, mtimes), or DOCS_VERSION when set"""
+    if os.getenv('DOCS_VERSION'):
+        return os.getenv('DOCS_VERSION')
+
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(docs_dir):
+        dirs.sort()
+        for name in sorted(files):
+            stat = os.stat(os.path.join(root, name))
+            digest.update(f"{os.path.relpath(os.path.join(root, name), docs_dir)}:{stat.st_size}:{int(stat.st_mtime)}".encode())
+    return digest.hexdigest()[:16]
+
+class AnswerCache:
+    """Approximate answer cache using MinHash signatures and LSH banding"""
+
+    def __init__(self, threshold: float = None, max_entries: int = None,
+                 num_perm: int = 64, bands: int = 16, version_check_interval: float = 60):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold or float(os.getenv('ANSWER_CACHE_THRESHOLD', 0.8))
+        self.max_entries = max_entries or int(os.getenv('ANSWER_CACHE_SIZE', 1000))
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.version_check_interval = version_check_interval
+
+        # Fixed seed so signatures are stable across processes and restarts
+        rng = random.Random(1729)
+        self._perms = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME))
+                       for _ in range(num_perm)]
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._buckets = defaultdict(set)
+        self._next_id = 0
+        self._docs_version = None
+        self._version_checked_at = 0.0
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'invalidations': 0}
+
+    def signature(self, normalized: str) -> List[int]:
+        """MinHash signature over the query's character shingles"""
+        hashes = [int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big')
+                  for shingle in _shingles(normalized)]
+        return [min((a * value + b) % MERSENNE_PRIME for value in hashes) for a, b in self._perms]
+
+    def _band_keys(self, namespace: str, signature: List[int]) -> List[tuple]:
+        return [(namespace, band, tuple(signature[band * self.rows:(band + 1) * self.rows]))
+                for band in range(self.bands)]
+
+    def _check_docs_version(self):
+        """Drop everything when the docs the answers were based on change; call without the lock"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._version_checked_at < self.version_check_interval and self._docs_version is not None:
+                return
+            # Claimed under the lock so one caller walks the tree while the rest keep serving
+            self._version_checked_at = now
+        # Stat'ing every docs file is slow, so lookups are not held up behind it
+        version = docs_version()
+        with self._lock:
+            if self._docs_version is not None and version != self._docs_version:
+                self._entries.clear()
+                self._buckets.clear()
+                self.stats['invalidations'] += 1
+            self._docs_version = version
+
+    def lookup(self, query: str, namespace: str = 'default') -> Optional[str]:
+        """Return a cached answer for a sufficiently similar earlier query"""
+        normalized = normalize_query(query)
+        if not normalized:
+            return None
+        signature = self.signature(normalized)
+        numbers = query_numbers(query)
+
+        self._check_docs_version()
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(namespace, signature):
+                candidates.update(self._buckets.get(key, ()))
+
+            best_id, best_score = None, 0.0
+            for entry_id in candidates:
+                if self._entries[entry_id]['numbers'] != numbers:
+                    continue
+                entry_signature = self._entries[entry_id]['signature']
+                score = sum(1 for x, y in zip(signature, entry_signature) if x == y) / self.num_perm
+                if score > best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None or best_score < self.threshold:
+                self.stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            self.stats['hits'] += 1
+            return self._entries[best_id]['answer']
+
+    def store(self, query: str, answer: str, namespace: str = 'default'):
+        """Cache an answer under the query's fingerprint"""
+        normalized = normalize_query(query)
+        if not normalized or not answer:
+            return
+        signature = self.signature(normalized)
+
+        self._check_docs_version()
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            keys = self._band_keys(namespace, signature)
+            self._entries[entry_id] = {'signature': signature, 'numbers': query_numbers(query), 'answer': answer,
+                                       'keys': keys}
+            for key in keys:
+                self._buckets[key].add(entry_id)
+            self.stats['stores'] += 1
+
+            while len(self._entries) > self.max_entries:
+                evicted_id, evicted = self._entries.popitem(last=False)
+                for key in evicted['keys']:
+                    self._buckets[key].discard(evicted_id)
+                    if not self._buckets[key]:
+                        del self._buckets[key]
+                self.stats['evictions'] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Size, hit rate and counters"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return dict(
+                self.stats,
+                entries=len(self._entries),
+                hit_rate=round(self.stats['hits'] / lookups, 3) if lookups else 0.0,
+                threshold=self.threshold,
+                docs_version=self._docs_version
+            )
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+def get_answer_cache() -> AnswerCache:
+    """Get the process-wide answer cache"""
+    global _answer_cache
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                _answer_cache = AnswerCache()
+    return _answer_cache
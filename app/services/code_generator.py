@@ -0,0 +1,223 @@
+import json
+import os
+import re
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit
+from jinja2 import Environment, FileSystemLoader, StrictUndefined
+from app.utils.warmup import register_warmup
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+COLLECTION_PATH = os.getenv('PINE_COLLECTION_PATH', os.path.join(ROOT_DIR, 'AirTribe', 'API Collection.json'))
+TEMPLATE_DIR = os.path.join(ROOT_DIR, 'app', 'codegen_templates')
+
+# Collection requests the generator covers, named as client methods
+OPERATIONS = {
+    'Generate Token': 'generate_token',
+    'Create Order': 'create_order',
+    'Fetch Order': 'fetch_order',
+    'Create Payment Card': 'create_card_payment',
+    'Create Payment UPI': 'create_upi_payment',
+    'Create Payment Netbanking': 'create_netbanking_payment',
+    'Capture Payment': 'capture_order',
+    'Cancel Payment': 'cancel_order',
+    'Create Refund': 'create_refund'
+}
+# Operations rendered for each standard integration type
+INTEGRATION_OPERATIONS = {
+    'payment': ('create_order', 'create_card_payment', 'create_upi_payment', 'create_netbanking_payment', 'fetch_order'),
+    'refund': ('create_refund', 'fetch_order'),
+    'status_check': ('fetch_order',),
+    'capture': ('capture_order', 'cancel_order', 'fetch_order')
+}
+LANGUAGES = {'python': 'python.py.j2', 'javascript': 'javascript.js.j2', 'java': 'java.java.j2'}
+LANGUAGE_ALIASES = {'py': 'python', 'js': 'javascript', 'node': 'javascript', 'nodejs': 'javascript'}
+TYPE_ALIASES = {'payments': 'payment', 'refunds': 'refund', 'status': 'status_check', 'fetch': 'status_check'}
+
+# Body sections passed through as optional objects instead of being flattened into parameters
+OPTIONAL_SECTIONS = ('purchase_details', 'merchant_metadata', 'device_info')
+# Fields fixed by the operation itself
+CONSTANT_FIELDS = ('payment_method', 'grant_type')
+# Fields the caller always supplies: sample values from the collection are never emitted for these
+REQUIRED_FIELDS = ('card_number', 'cvv', 'expiry_month', 'expiry_year', 'name', 'pay_code')
+FIELD_NAMES = {'name': 'card_holder_name', 'value': 'amount'}
+
+_COMMENT_LINE = re.compile(r'^\s*//.*$', re.MULTILINE)
+_VARIABLE = re.compile(r'\{\{\s*([\w$]+)\s*\}\}')
+_CAMEL = re.compile(r'(?<=[a-z0-9])(?=[A-Z])')
+_PLACEHOLDER = re.compile(r'\{(\w+)\}')
+
+def snake_case(name: str) -> str:
+    return _CAMEL.sub('_', name).lower()
+
+def camel_case(name: str) -> str:
+    head, *rest = name.split('_')
+    return head + ''.join(part.title() for part in rest)
+
+def pascal_case(name: str) -> str:
+    return ''.join(part.title() for part in name.split('_'))
+
+def literal(value: Any, language: str) -> str:
+    """A constant as source code in the target language"""
+    if language == 'python':
+        return repr(value)
+    if language == 'javascript' and isinstance(value, str):
+        return "'" + value.replace('\\', '\\\\').replace("'", "\\'") + "'"
+    if language == 'java' and isinstance(value, int) and not isinstance(value, bool):
+        return f"{value}L"
+    return json.dumps(value)
+
+def path_expression(path: str, language: str) -> str:
+    """A request path with its {placeholders} filled from same-named (camelCased) variables"""
+    if language == 'javascript':
+        return '`' + _PLACEHOLDER.sub(lambda match: f"${{encodeURIComponent({camel_case(match.group(1))})}}", path) + '`'
+    if language == 'java':
+        expression = '"' + _PLACEHOLDER.sub(lambda match: f'" + encode({camel_case(match.group(1))}) + "', path) + '"'
+        return expression[:-5] if expression.endswith(' + ""') else expression
+    return repr(path)
+
+def _sample_body(raw: str) -> Any:
+    """Parse a collection body: commented-out alternatives dropped, {{$guid}} and variables quoted"""
+    raw = _COMMENT_LINE.sub('', raw or '')
+    raw = re.sub(r'"?\{\{\s*[\w$]+\s*\}\}"?', '"{{}}"', raw)
+    return json.loads(raw) if raw.strip() else None
+
+class _BodyParser:
+    """Turns a sample body into a build tree and the typed parameters it needs"""
+
+    def __init__(self):
+        self.params: List[Dict[str, Any]] = []
+
+    def node(self, key: Optional[str], value: Any, parent: str = '') -> Dict[str, Any]:
+        if key in OPTIONAL_SECTIONS:
+            return {'section': self._param(key, 'object', required=False, default=None)}
+        if isinstance(value, dict):
+            return {'object': [[child_key, self.node(child_key, child, key or '')] for child_key, child in value.items()]}
+        if isinstance(value, list):
+            return {'list': [self.node(None, value[0], parent)] if value else []}
+        if key in CONSTANT_FIELDS:
+            return {'const': value}
+        name = FIELD_NAMES.get(key, key) if key != 'value' or parent.endswith('_amount') else key
+        kind = 'bool' if isinstance(value, bool) else 'int' if isinstance(value, int) else 'str'
+        # References, amounts and instrument details have no meaningful sample default
+        required = key in REQUIRED_FIELDS or name == 'amount' or key.endswith('_reference') or value == '{{}}'
+        return {'param': self._param(name, kind, required=required, default=None if required else value)}
+
+    def _param(self, name: str, kind: str, required: bool, default: Any) -> str:
+        if not any(param['name'] == name for param in self.params):
+            self.params.append({'name': name, 'type': kind, 'required': required, 'default': default})
+        return name
+
+def load_operations(path: str = COLLECTION_PATH) -> Tuple[str, Dict[str, Dict[str, Any]]]:
+    """Base URL and operation specs (method, path, headers, typed parameters, body tree) from the collection"""
+    with open(path, encoding='utf-8') as f:
+        collection = json.load(f)
+
+    base_url = None
+    operations = {}
+    for item in collection.get('item', []):
+        name = OPERATIONS.get(item.get('name'))
+        if name is None:
+            continue
+        request = item['request']
+        url = request['url']['raw'] if isinstance(request['url'], dict) else request['url']
+        parts = urlsplit(url)
+        base_url = base_url or f"{parts.scheme}://{parts.netloc}"
+        path_params = [snake_case(variable) for variable in _VARIABLE.findall(parts.path)]
+        headers = {header['key'].lower() for header in request.get('header', []) if not header.get('disabled')}
+
+        parser = _BodyParser()
+        body = _sample_body((request.get('body') or {}).get('raw')) if name != 'generate_token' else None
+        tree = parser.node(None, body) if body is not None else None
+        params = sorted(parser.params, key=lambda param: not param['required'])
+        operations[name] = {
+            'name': name,
+            'title': item['name'],
+            'method': request['method'],
+            'path': _VARIABLE.sub(lambda match: '{' + snake_case(match.group(1)) + '}', parts.path),
+            'path_params': path_params,
+            'merchant_header': 'merchant-id' in headers,
+            'authenticated': name != 'generate_token',
+            'params': params,
+            'body': tree
+        }
+    return base_url, operations
+
+class CodeGenerator:
+    """Renders Pine Labs API clients from the Postman collection without the LLM
+
+    Every standard (language, integration type) pair is rendered once and
+    served from memory; anything else returns None so callers can fall
+    back to the LLM.
+    """
+
+    def __init__(self, collection_path: str = COLLECTION_PATH, template_dir: str = TEMPLATE_DIR):
+        self.base_url, self.operations = load_operations(collection_path)
+        self.env = Environment(loader=FileSystemLoader(template_dir), undefined=StrictUndefined,
+                               extensions=['jinja2.ext.do'], trim_blocks=True, lstrip_blocks=True,
+                               keep_trailing_newline=True)
+        self.env.filters.update(camel=camel_case, pascal=pascal_case, literal=literal, path=path_expression)
+        self._rendered: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def resolve(language: str, integration_type: str) -> Tuple[str, str]:
+        """Canonical language and integration type names"""
+        language = (language or '').strip().lower()
+        integration_type = (integration_type or '').strip().lower().replace('-', '_').replace(' ', '_')
+        return LANGUAGE_ALIASES.get(language, language), TYPE_ALIASES.get(integration_type, integration_type)
+
+    def supports(self, language: str, integration_type: str) -> bool:
+        language, integration_type = self.resolve(language, integration_type)
+        return language in LANGUAGES and integration_type in INTEGRATION_OPERATIONS
+
+    def render(self, language: str, integration_type: str) -> Optional[str]:
+        """Client code for a standard integration, or None when it is not covered"""
+        language, integration_type = self.resolve(language, integration_type)
+        key = (language, integration_type)
+        code = self._rendered.get(key)
+        if code is not None or not self.supports(language, integration_type):
+            return code
+
+        operations = [self.operations[name] for name in INTEGRATION_OPERATIONS[integration_type]
+                      if name in self.operations]
+        code = self.env.get_template(LANGUAGES[language]).render(
+            base_url=self.base_url,
+            integration_type=integration_type,
+            token=self.operations['generate_token'],
+            operations=operations,
+            language=language
+        )
+        with self._lock:
+            self._rendered[key] = code
+        return code
+
+    def render_all(self) -> int:
+        """Pre-render every standard integration"""
+        for language in LANGUAGES:
+            for integration_type in INTEGRATION_OPERATIONS:
+                self.render(language, integration_type)
+        return len(self._rendered)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'operations': sorted(self.operations),
+            'rendered': len(self._rendered),
+            'bytes': sum(len(code) for code in self._rendered.values())
+        }
+
+_code_generator = None
+_code_generator_lock = threading.Lock()
+
+def get_code_generator() -> CodeGenerator:
+    """Get the process-wide code generator"""
+    global _code_generator
+    if _code_generator is None:
+        with _code_generator_lock:
+            if _code_generator is None:
+                _code_generator = CodeGenerator()
+    return _code_generator
+
+@register_warmup
+def _render_code_templates(app):
+    get_code_generator().render_all()
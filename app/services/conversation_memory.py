@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import re
+from collections import deque, OrderedDict
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from app.utils.redaction import redact
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+ARTIFACT_PREFIX = 'artifact:'
+
+def count_tokens(text: str) -> int:
+    """Deterministic token estimate: ~4 characters per word piece, 1 per symbol"""
+    count = 0
+    for match in TOKEN_PATTERN.finditer(text or ''):
+        piece = match.group()
+        if piece[0].isalnum() or piece[0] == '_':
+            count += (len(piece) + 3) // 4
+        else:
+            count += 1
+    return count
+
+class ConversationMemory:
+    """Bounded conversation memory with a token budget and out-of-line artifacts"""
+
+    def __init__(self, max_turns: int = None, token_budget: int = None,
+                 artifact_threshold: int = None, summary_token_budget: int = 300,
+                 max_artifacts: int = 50):
+        self.max_turns = max_turns or int(os.getenv('AGENT_MEMORY_MAX_TURNS', 20))
+        self.token_budget = token_budget or int(os.getenv('AGENT_MEMORY_TOKEN_BUDGET', 1500))
+        self.artifact_threshold = artifact_threshold or int(os.getenv('AGENT_MEMORY_ARTIFACT_CHARS', 400))
+        self.summary_token_budget = summary_token_budget
+        self.max_artifacts = max_artifacts
+        self.clear()
+
+    def clear(self):
+        """Forget all turns, artifacts and the rolled-up summary"""
+        self.turns = deque()
+        self.turn_tokens = deque()
+        self.total_tokens = 0
+        self.summary_points = deque()
+        self.summary_tokens = 0
+        self.artifacts = OrderedDict()
+
+    def add(self, role: str, content: str, **fields) -> Dict[str, Any]:
+        """Append a redacted turn, moving large values out of line and evicting old turns"""
+        turn = {
+            "role": role,
+            "content": self._externalize(redact(content)),
+            "timestamp": datetime.now().isoformat()
+        }
+        for key, value in fields.items():
+            turn[key] = self._externalize(redact(value))
+
+        tokens = count_tokens(json.dumps(turn, default=str))
+        self.turns.append(turn)
+        self.turn_tokens.append(tokens)
+        self.total_tokens += tokens
+
+        # Always keep the newest turn, even if it alone exceeds the budget
+        while len(self.turns) > 1 and (len(self.turns) > self.max_turns or self.total_tokens > self.token_budget):
+            self._evict_oldest()
+
+        return turn
+
+    def to_state(self) -> Dict[str, Any]:
+        """Serialize the memory so another worker process can resume it"""
+        return {
+            "turns": list(self.turns),
+            "turn_tokens": list(self.turn_tokens),
+            "summary_points": list(self.summary_points),
+            "artifacts": list(self.artifacts.items())
+        }
+
+    def load_state(self, state: Optional[Dict[str, Any]]):
+        """Restore memory saved with to_state"""
+        self.clear()
+        if not state:
+            return
+        self.turns = deque(state.get("turns", []))
+        self.turn_tokens = deque(state.get("turn_tokens", []))
+        self.total_tokens = sum(self.turn_tokens)
+        self.summary_points = deque(state.get("summary_points", []))
+        self.summary_tokens = sum(count_tokens(point) for point in self.summary_points)
+        self.artifacts = OrderedDict((ref, content) for ref, content in state.get("artifacts", []))
+
+    def history(self) -> List[Dict[str, Any]]:
+        """Return the retained turns, oldest first"""
+        return list(self.turns)
+
+    @property
+    def summary(self) -> str:
+        """Local summary of turns that no longer fit in the buffer"""
+        return ' '.join(self.summary_points)
+
+    def prompt_context(self, max_recent: int = 3) -> Dict[str, Any]:
+        """Summary plus the most recent turns, stripped of bookkeeping fields"""
+        recent = [
+            {key: value for key, value in turn.items() if key != 'timestamp'}
+            for turn in list(self.turns)[-max_recent:]
+        ]
+        context = {"recent": recent}
+        if self.summary_points:
+            context["summary"] = self.summary
+        return context
+
+    def get_artifact(self, ref: str) -> Optional[str]:
+        """Resolve an artifact reference back to its full content"""
+        digest = ref.replace(ARTIFACT_PREFIX, '', 1).split(' ')[0]
+        return self.artifacts.get(digest)
+
+    def _externalize(self, value: Any) -> Any:
+        """Replace large strings, at any depth, with artifact references"""
+        if isinstance(value, str):
+            if len(value) <= self.artifact_threshold:
+                return value
+            return self._store_artifact(value)
+        if isinstance(value, dict):
+            return {key: self._externalize(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._externalize(item) for item in value]
+        return value
+
+    def _store_artifact(self, content: str) -> str:
+        """Keep content out of line and return a short reference to it"""
+        digest = hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+        self.artifacts[digest] = content
+        self.artifacts.move_to_end(digest)
+        while len(self.artifacts) > self.max_artifacts:
+            self.artifacts.popitem(last=False)
+        return f"{ARTIFACT_PREFIX}{digest} ({len(content)} chars)"
+
+    def _evict_oldest(self):
+        """Drop the oldest turn and roll it into the summary"""
+        turn = self.turns.popleft()
+        self.total_tokens -= self.turn_tokens.popleft()
+
+        point = self._summarize(turn)
+        self.summary_points.append(point)
+        self.summary_tokens += count_tokens(point)
+        while len(self.summary_points) > 1 and self.summary_tokens > self.summary_token_budget:
+            self.summary_tokens -= count_tokens(self.summary_points.popleft())
+
+    def _summarize(self, turn: Dict[str, Any]) -> str:
+        """One-line extractive summary of a turn"""
+        content = ' '.join(str(turn.get('content', '')).split())
+        if len(content) > 100:
+            content = content[:97] + '...'
+
+        if turn.get('role') == 'user':
+            return f"User asked: {content}"
+        if turn.get('action_taken'):
+            return f"Assistant ran {turn['action_taken']}: {content}"
+        return f"Assistant replied: {content}"
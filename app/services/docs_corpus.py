@@ -0,0 +1,350 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+from collections import Counter, defaultdict
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from app.services.answer_cache import DOCS_DIR, docs_version
+from app.services.error_catalog import front_matter
+from app.utils.warmup import register_warmup
+
+CORPUS_PATH = os.getenv(
+    'DOCS_CORPUS_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'docs_corpus.bin'))
+
+MAGIC = b'PLDOCS\x00\x01'
+HEADER = struct.Struct('<8sI')
+# Chunk index entry: content digest, SimHash, data offset, compressed length
+ENTRY = struct.Struct('<16sQQI')
+DIGEST_SIZE = 16
+
+# Chunks are cut at headings, and long sections again at paragraph breaks
+MAX_CHUNK_CHARS = 2000
+# SimHash distance (of 64 bits) at or under which two chunks count as the same text
+NEAR_DUPLICATE_BITS = 3
+SIMHASH_BANDS = NEAR_DUPLICATE_BITS + 1
+SHINGLE_WORDS = 3
+# Chunks too short to fingerprint reliably are only deduplicated exactly
+MIN_SIMHASH_WORDS = 12
+
+# Editor scratch pages: foo-copy.md, foo-copy-2.md, integration-steps-test4.md, test_custom-html.md
+_DRAFT_NAME = re.compile(r'-copy(-\d+)?$|-test-?\d*$|^test_')
+_VERSION_DIR = re.compile(r'^v(\d+)(?:\.(\d+))?$')
+_HEADING = re.compile(r'^#{1,4}\s', re.MULTILINE)
+_WORD = re.compile(r'[a-z0-9]+')
+
+def _version_rank(relative: str) -> Tuple[int, int]:
+    """(major, minor) of the vX.Y directory a page lives in; unversioned pages rank lowest"""
+    match = _VERSION_DIR.match(relative.split(os.sep, 1)[0])
+    return (int(match.group(1)), int(match.group(2) or 0)) if match else (0, 0)
+
+def _body(text: str) -> str:
+    """Page text without its front matter"""
+    if text.startswith('---'):
+        end = text.find('\n---', 3)
+        if end != -1:
+            return text[end + 4:].lstrip('\n')
+    return text
+
+def _chunks(body: str) -> List[str]:
+    """Sections of a page, long ones split further at blank lines"""
+    starts = [match.start() for match in _HEADING.finditer(body)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    chunks = []
+    for start, end in zip(starts, starts[1:] + [len(body)]):
+        section = body[start:end].strip()
+        current = ''
+        for paragraph in section.split('\n\n'):
+            if current and len(current) + len(paragraph) > MAX_CHUNK_CHARS:
+                chunks.append(current)
+                current = ''
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+        if current.strip():
+            chunks.append(current)
+    return chunks
+
+def chunk_digest(text: str) -> bytes:
+    """Content address of a chunk: its exact text, so code samples are never confused"""
+    return hashlib.blake2b(text.encode(), digest_size=DIGEST_SIZE).digest()
+
+def simhash(words: List[str]) -> int:
+    """64-bit SimHash over word shingles"""
+    if len(words) < SHINGLE_WORDS:
+        words = words + [''] * (SHINGLE_WORDS - len(words))
+    weights = [0] * 64
+    for index in range(len(words) - SHINGLE_WORDS + 1):
+        shingle = ' '.join(words[index:index + SHINGLE_WORDS]).encode()
+        value = int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+def _bands(value: int) -> List[Tuple[int, int]]:
+    # Two hashes within NEAR_DUPLICATE_BITS differ in at most that many bands, so they share one
+    width = 64 // SIMHASH_BANDS
+    return [(band, value >> (band * width) & ((1 << width) - 1)) for band in range(SIMHASH_BANDS)]
+
+class _ChunkStore:
+    """Content-addressed chunks with exact deduplication and near-duplicate grouping"""
+
+    def __init__(self):
+        self.texts: List[str] = []
+        self.digests: List[bytes] = []
+        self.hashes: List[int] = []
+        # Variant chunk -> the stored chunk it nearly duplicates; both are kept, never substituted
+        self.near: Dict[int, int] = {}
+        self._by_digest: Dict[bytes, int] = {}
+        self._by_band: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        self.stats = Counter({'chunks_seen': 0, 'exact_duplicates': 0, 'near_duplicates': 0})
+
+    def add(self, text: str) -> int:
+        """Index of the stored chunk for text, reusing only an identical one"""
+        self.stats['chunks_seen'] += 1
+        digest = chunk_digest(text)
+        index = self._by_digest.get(digest)
+        if index is not None:
+            self.stats['exact_duplicates'] += 1
+            return index
+
+        index = len(self.texts)
+        words = _WORD.findall(text.lower())
+        value = simhash(words) if len(words) >= MIN_SIMHASH_WORDS else 0
+        if value:
+            # A changed status, amount or endpoint is a few bits away, so near matches are only grouped
+            similar = next((candidate for key in _bands(value) for candidate in self._by_band.get(key, ())
+                            if bin(self.hashes[candidate] ^ value).count('1') <= NEAR_DUPLICATE_BITS), None)
+            if similar is not None:
+                self.near[index] = self.near.get(similar, similar)
+                self.stats['near_duplicates'] += 1
+
+        self.texts.append(text)
+        self.digests.append(digest)
+        self.hashes.append(value)
+        self._by_digest[digest] = index
+        if value:
+            for key in _bands(value):
+                self._by_band[key].append(index)
+        return index
+
+def build_corpus(docs_dir: str = DOCS_DIR, include_hidden: bool = True) -> Tuple[_ChunkStore, Dict[str, Any]]:
+    """Deduplicated chunks of the docs and the manifest describing which pages use them
+
+    One canonical page is kept per slug: visible before hidden, the newest
+    vX.Y directory first. Older versions are recorded as superseded, and
+    pages that add no chunk of their own as duplicates. Hidden pages are
+    only kept for slugs without a visible page, and not at all without
+    include_hidden.
+    """
+    pages = []
+    for root, _, names in os.walk(docs_dir):
+        for name in names:
+            if not name.endswith('.md'):
+                continue
+            path = os.path.join(root, name)
+            with open(path, encoding='utf-8') as f:
+                text = f.read()
+            relative = os.path.relpath(path, docs_dir)
+            fields = front_matter(text)
+            stem = name[:-3]
+            pages.append({
+                'path': relative,
+                'slug': fields.get('slug') or stem,
+                'title': fields.get('title') or stem,
+                'hidden': fields.get('hidden') == 'true',
+                'draft': bool(_DRAFT_NAME.search(stem)),
+                'version': relative.split(os.sep, 1)[0] if _version_rank(relative) != (0, 0) else None,
+                'text': text
+            })
+
+    # Canonical candidates first, so their chunks are the ones stored
+    rank = lambda page: (page['hidden'], page['draft'], tuple(-part for part in _version_rank(page['path'])), page['path'])
+    pages.sort(key=rank)
+
+    store = _ChunkStore()
+    documents = []
+    aliases = {}
+    canonical: Dict[str, Dict[str, Any]] = {}
+    skipped = Counter()
+    raw_bytes = 0
+    for page in pages:
+        raw_bytes += len(page['text'].encode())
+        kept = canonical.get(page['slug'])
+        if kept is not None:
+            aliases[page['path']] = {'superseded_by': kept['path']}
+            skipped['superseded'] += 1
+            continue
+        if page['hidden'] and (page['draft'] or not include_hidden):
+            skipped['hidden'] += 1
+            continue
+
+        before = len(store.texts)
+        chunks = [store.add(chunk) for chunk in _chunks(_body(page['text']))]
+        if chunks and len(store.texts) == before:
+            # Every chunk was already stored for another page
+            owner = Counter(next(document['path'] for document in documents if chunk in document['_chunks'])
+                            for chunk in chunks).most_common(1)[0][0]
+            aliases[page['path']] = {'duplicate_of': owner}
+            skipped['duplicate'] += 1
+            continue
+
+        document = {key: page[key] for key in ('slug', 'title', 'path', 'version', 'hidden')}
+        document['chunks'] = chunks
+        document['_chunks'] = set(chunks)
+        documents.append(document)
+        canonical[page['slug']] = document
+
+    for document in documents:
+        del document['_chunks']
+    documents.sort(key=lambda document: document['path'])
+    stored_bytes = sum(len(text.encode()) for text in store.texts)
+    manifest = {
+        'format': 1,
+        'docs_version': docs_version(docs_dir),
+        'documents': documents,
+        'aliases': aliases,
+        'near_duplicates': {str(variant): index for variant, index in sorted(store.near.items())},
+        'stats': {
+            'pages': len(pages),
+            'documents': len(documents),
+            'superseded': skipped['superseded'],
+            'duplicates': skipped['duplicate'],
+            'hidden_skipped': skipped['hidden'],
+            'chunks': len(store.texts),
+            **store.stats,
+            'raw_bytes': raw_bytes,
+            'chunk_bytes': stored_bytes
+        }
+    }
+    return store, manifest
+
+def manifest_path(path: str) -> str:
+    return os.path.splitext(path)[0] + '.json'
+
+def write_corpus(docs_dir: str = DOCS_DIR, path: str = CORPUS_PATH, include_hidden: bool = True) -> Dict[str, Any]:
+    """Build the corpus and write the binary chunk file and its JSON manifest"""
+    store, manifest = build_corpus(docs_dir, include_hidden)
+    blobs = [zlib.compress(text.encode(), 9) for text in store.texts]
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    offset = HEADER.size + ENTRY.size * len(blobs)
+    digest = hashlib.sha256()
+    with open(path, 'wb') as f:
+        def write(data):
+            f.write(data)
+            digest.update(data)
+
+        write(HEADER.pack(MAGIC, len(blobs)))
+        for chunk_digest, value, blob in zip(store.digests, store.hashes, blobs):
+            write(ENTRY.pack(chunk_digest, value, offset, len(blob)))
+            offset += len(blob)
+        for blob in blobs:
+            write(blob)
+
+    manifest['corpus'] = os.path.basename(path)
+    manifest['corpus_sha256'] = digest.hexdigest()
+    manifest['stats']['corpus_bytes'] = offset
+    with open(manifest_path(path), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+        f.write('\n')
+    return manifest
+
+class DocsCorpus:
+    """Read-only view of a built corpus; chunk text is decompressed on demand from a shared mmap"""
+
+    def __init__(self, manifest: Dict[str, Any], data: Optional[mmap.mmap] = None):
+        self.manifest = manifest
+        self._data = data
+        self.count = HEADER.unpack_from(data)[1] if data is not None else 0
+        self._by_slug = {document['slug']: document for document in manifest.get('documents', [])}
+        self._by_path = {document['path']: document for document in manifest.get('documents', [])}
+        self._by_digest = {self._entry(index)[0]: index for index in range(self.count)}
+
+    @classmethod
+    def load(cls, path: str = CORPUS_PATH) -> 'DocsCorpus':
+        try:
+            with open(manifest_path(path), encoding='utf-8') as f:
+                manifest = json.load(f)
+            with open(path, 'rb') as f:
+                # Mapped read-only, so forked workers share the pages
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            print(f"⚠️ Docs corpus {path} not found; run `flask docs build-corpus`")
+            return cls({})
+        if HEADER.unpack_from(data)[0] != MAGIC:
+            raise ValueError(f"{path} is not a docs corpus")
+        return cls(manifest, data)
+
+    def _entry(self, index: int) -> Tuple[bytes, int, int, int]:
+        return ENTRY.unpack_from(self._data, HEADER.size + ENTRY.size * index)
+
+    def chunk(self, index: int) -> str:
+        """Text of one stored chunk"""
+        _, _, offset, length = self._entry(index)
+        return zlib.decompress(self._data[offset:offset + length]).decode()
+
+    def find(self, text: str) -> Optional[int]:
+        """Index of the stored chunk with exactly this content"""
+        return self._by_digest.get(chunk_digest(text))
+
+    def variants(self, index: int) -> List[int]:
+        """Stored chunks in the same near-duplicate group as a chunk, itself included"""
+        near = self.manifest.get('near_duplicates', {})
+        group = near.get(str(index), index)
+        return sorted({group} | {int(variant) for variant, head in near.items() if head == group})
+
+    def resolve(self, slug_or_path: str) -> Optional[Dict[str, Any]]:
+        """Canonical document for a slug or any page path, following superseded and duplicate pages"""
+        document = self._by_slug.get(slug_or_path) or self._by_path.get(slug_or_path)
+        seen = set()
+        alias = self.manifest.get('aliases', {}).get(slug_or_path)
+        while document is None and alias is not None and slug_or_path not in seen:
+            seen.add(slug_or_path)
+            slug_or_path = alias.get('superseded_by') or alias.get('duplicate_of')
+            document = self._by_path.get(slug_or_path)
+            alias = self.manifest['aliases'].get(slug_or_path)
+        return document
+
+    def text(self, slug_or_path: str) -> Optional[str]:
+        """Full text of the canonical document"""
+        document = self.resolve(slug_or_path)
+        if document is None:
+            return None
+        return '\n\n'.join(self.chunk(index) for index in document['chunks'])
+
+    def iter_chunks(self) -> Iterator[Tuple[int, str]]:
+        """Every distinct chunk once, for building indexes"""
+        for index in range(self.count):
+            yield index, self.chunk(index)
+
+    def documents_for(self, chunk: int) -> List[str]:
+        """Slugs of the documents that contain a chunk"""
+        return [document['slug'] for document in self.manifest.get('documents', []) if chunk in document['chunks']]
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'documents': len(self._by_slug),
+            'chunks': self.count,
+            'docs_version': self.manifest.get('docs_version'),
+            **{key: self.manifest.get('stats', {}).get(key) for key in ('raw_bytes', 'corpus_bytes')}
+        }
+
+_docs_corpus = None
+_docs_corpus_lock = threading.Lock()
+
+def get_docs_corpus() -> DocsCorpus:
+    """Get the process-wide docs corpus"""
+    global _docs_corpus
+    if _docs_corpus is None:
+        with _docs_corpus_lock:
+            if _docs_corpus is None:
+                _docs_corpus = DocsCorpus.load()
+    return _docs_corpus
+
+@register_warmup
+def _map_docs_corpus(app):
+    get_docs_corpus()
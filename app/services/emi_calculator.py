@@ -0,0 +1,179 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, List, Tuple
+import numpy as np
+from app.utils.warmup import register_warmup
+
+EMI_PLANS_PATH = os.getenv(
+    'EMI_PLANS_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'emi_plans.json'))
+
+# subvention_type values of the EMI Calculator API
+NO_COST, LOW_COST, STANDARD = 1, 2, 3
+OFFER_NAMES = {NO_COST: 'no_cost', LOW_COST: 'low_cost', STANDARD: 'standard'}
+# bank_interest_rate and discount percentages are percent * 10000 (130000 = 13%)
+RATE_SCALE = 1000000
+
+class EmiCalculator:
+    """EMI plans for every (issuer, tenure) pair of a cart amount in one vectorized pass
+
+    The issuer/tenure/interest table is flattened into NumPy columns, one
+    row per plan, so a quote is a handful of array operations however many
+    plans there are. Quotes are cached per (amount bucket, issuer set):
+    checkout pages ask again on every cart change, mostly for amounts and
+    issuers they have asked about before.
+    """
+
+    def __init__(self, issuers: List[Dict[str, Any]], amount_bucket: int = None, cache_size: int = None):
+        self.issuers = issuers
+        self.amount_bucket = amount_bucket or int(os.getenv('EMI_AMOUNT_BUCKET', 100))
+        self.cache_size = cache_size or int(os.getenv('EMI_CACHE_SIZE', 4096))
+
+        rows = [(index, tenure) for index, issuer in enumerate(issuers) for tenure in issuer['tenures']]
+        self.issuer_index = np.array([index for index, _ in rows], dtype=np.int32)
+        self.months = np.array([tenure['tenure_in_month'] for _, tenure in rows], dtype=np.int64)
+        self.rates = np.array([tenure['bank_interest_rate'] for _, tenure in rows], dtype=np.int64)
+        self.offers = np.array([tenure.get('subvention_type', STANDARD) for _, tenure in rows], dtype=np.int8)
+        self.discounts = np.array([tenure.get('discount_percentage', 0) for _, tenure in rows], dtype=np.int64)
+        self.min_amounts = np.array([issuers[index].get('min_amount') or 0 for index, _ in rows], dtype=np.int64)
+        self.max_amounts = np.array([issuers[index].get('max_amount') or np.iinfo(np.int64).max
+                                     for index, _ in rows], dtype=np.int64)
+
+        # Per-rupee instalment and interest depend only on the plan, so they are computed once
+        monthly_rate = self.rates / RATE_SCALE / 12
+        growth = (1 + monthly_rate) ** self.months
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.factors = np.where(monthly_rate > 0, monthly_rate * growth / (growth - 1), 1 / self.months)
+        self.interest_factors = self.factors * self.months - 1
+
+        self._by_name = {issuer['name'].lower(): index for index, issuer in enumerate(issuers)}
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    @classmethod
+    def load(cls, path: str = EMI_PLANS_PATH) -> 'EmiCalculator':
+        try:
+            with open(path, encoding='utf-8') as f:
+                return cls(json.load(f)['issuers'])
+        except FileNotFoundError:
+            print(f"⚠️ EMI plan table {path} not found; EMI quotes are disabled")
+            return cls([])
+
+    def resolve_issuers(self, names: Iterable[str] = None, card_type: str = None) -> Tuple[Tuple[int, ...], List[str]]:
+        """Table indexes of the named issuers (all when none are named) and the names not in the table"""
+        if names:
+            found = [(name, self._by_name.get(name.strip().lower())) for name in names if name.strip()]
+            indexes = {index for _, index in found if index is not None}
+            unknown = [name for name, index in found if index is None]
+        else:
+            indexes = set(range(len(self.issuers)))
+            unknown = []
+        if card_type:
+            indexes = {index for index in indexes if self.issuers[index].get('card_type') == card_type}
+        return tuple(sorted(indexes)), unknown
+
+    def compute(self, amount: int, issuers: Tuple[int, ...]) -> Dict[str, np.ndarray]:
+        """Instalment, interest and discount columns for every plan of the given issuers"""
+        selected = np.isin(self.issuer_index, issuers) & (self.min_amounts <= amount) & (amount <= self.max_amounts)
+        months = self.months[selected]
+        factors = self.factors[selected]
+        interest_factors = self.interest_factors[selected]
+        offers = self.offers[selected]
+
+        # No-cost EMI discounts the cart by exactly the interest, so the instalments add up to the cart amount
+        no_cost = amount * interest_factors / (1 + interest_factors)
+        discount = np.select(
+            [offers == NO_COST, offers == LOW_COST],
+            [no_cost, np.minimum(amount * self.discounts[selected] / RATE_SCALE, no_cost)],
+            0
+        )
+        discount = np.rint(discount).astype(np.int64)
+        loan = amount - discount
+        installment = np.rint(loan * factors).astype(np.int64)
+        total = installment * months
+        return {
+            'issuer_index': self.issuer_index[selected],
+            'tenure_in_month': months,
+            'bank_interest_rate': self.rates[selected],
+            'subvention_type': offers,
+            'monthly_installment': installment,
+            'interest_pay_to_bank': total - loan,
+            'total_offerred_discount_cashback_amount': discount,
+            'loan_amount': loan,
+            'total_payable': total
+        }
+
+    def plans(self, amount: int, issuers: Iterable[str] = None, card_type: str = None) -> Dict[str, Any]:
+        """EMI plans of a cart amount in paisa, grouped by issuer"""
+        if amount <= 0:
+            raise ValueError("amount must be a positive number of paisa")
+        indexes, unknown = self.resolve_issuers(issuers, card_type)
+        # Quotes are for the cart amount rounded to the bucket (₹1 by default)
+        quoted = max(self.amount_bucket, round(amount / self.amount_bucket) * self.amount_bucket)
+        key = (quoted, indexes)
+
+        with self._lock:
+            quote = self._cache.get(key)
+            if quote is not None:
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+        if quote is None:
+            quote = self._quote(quoted, indexes)
+            with self._lock:
+                self.stats['misses'] += 1
+                self._cache[key] = quote
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+                    self.stats['evictions'] += 1
+        return dict(quote, amount=amount, unknown_issuers=unknown)
+
+    def _quote(self, amount: int, indexes: Tuple[int, ...]) -> Dict[str, Any]:
+        columns = self.compute(amount, indexes)
+        rows = [dict(zip(columns, values)) for values in zip(*(column.tolist() for column in columns.values()))]
+        grouped = OrderedDict()
+        for row in rows:
+            issuer = self.issuers[row.pop('issuer_index')]
+            row['offer'] = OFFER_NAMES.get(row['subvention_type'], 'standard')
+            grouped.setdefault(issuer['name'], {
+                'issuer_name': issuer['name'],
+                'is_debit_emi_issuer': issuer.get('card_type') == 'debit',
+                'list_emi_tenure': []
+            })['list_emi_tenure'].append(row)
+
+        lowest = None
+        if rows:
+            best = int(np.argmin(columns['monthly_installment']))
+            lowest = {
+                'issuer_name': self.issuers[int(columns['issuer_index'][best])]['name'],
+                'tenure_in_month': int(columns['tenure_in_month'][best]),
+                'monthly_installment': int(columns['monthly_installment'][best])
+            }
+        return {
+            'quoted_amount': amount,
+            'plans': len(rows),
+            'no_cost_plans': sum(1 for row in rows if row['subvention_type'] == NO_COST),
+            'lowest_monthly_installment': lowest,
+            'issuer': list(grouped.values())
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        return {'issuers': len(self.issuers), 'plans': len(self.months), 'cached_quotes': len(self._cache), **self.stats}
+
+_emi_calculator = None
+_emi_calculator_lock = threading.Lock()
+
+def get_emi_calculator() -> EmiCalculator:
+    """Get the process-wide EMI calculator"""
+    global _emi_calculator
+    if _emi_calculator is None:
+        with _emi_calculator_lock:
+            if _emi_calculator is None:
+                _emi_calculator = EmiCalculator.load()
+    return _emi_calculator
+
+@register_warmup
+def _load_emi_calculator(app):
+    get_emi_calculator()
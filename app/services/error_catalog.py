@@ -0,0 +1,323 @@
+import json
+import os
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from app.services.answer_cache import DOCS_DIR
+from app.utils.aho_corasick import AhoCorasick
+from app.utils.warmup import register_warmup
+
+CATALOG_PATH = os.getenv(
+    'ERROR_CATALOG_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'error_catalog.json'))
+
+# Doc table headers (lowercased) mapped to catalog fields; tables without a code column are skipped
+HEADER_FIELDS = {
+    'code': 'code',
+    'error code': 'code',
+    'response code': 'code',
+    'ppc_parenttxnresponsecode': 'code',
+    'error name': 'name',
+    'error message': 'message',
+    'message': 'message',
+    'response message': 'message',
+    'ppc_parenttxnresponsemessage': 'message',
+    'error description': 'description',
+    'description': 'description',
+    'next steps': 'fix',
+    'next step': 'fix',
+    'error source': 'source',
+    'source': 'source',
+    'error step': 'step',
+    'error category': 'category',
+    'status code': 'http_status',
+    'field': 'field'
+}
+# Path fragments naming the product an error table belongs to, checked in order
+DOMAIN_HINTS = (('payout', 'payout'), ('upi-error', 'upi'), ('card-error', 'card'), ('pay-by-links', 'pay_by_link'))
+# Status life-cycle pages list the response code of every state, not errors
+SKIP_DOCS = ('life-cycle',)
+# Sources outside the merchant's request: the code is fine, the payment was declined
+EXTERNAL_SOURCES = {'issuer', 'acquirer', 'npci', 'customer', 'bank', 'network', 'processor', 'internal', 'pg'}
+EXTERNAL_CATEGORIES = {'card', 'instrument', 'payment error'}
+
+_BLOCK = re.compile(r'\[block:parameters\]\s*(\{.*?\})\s*\[/block\]', re.S)
+_FENCED_JSON = re.compile(r'```json[^\n]*\n(.*?)```', re.S)
+_HTML = re.compile(r'<[^>]+>')
+_CODE_SPLIT = re.compile(r'\s+(?:OR|or|and|/)\s+|\s*[,/]\s*')
+_RETRY = re.compile(r'\b(retry|try again|try after|try later|after some time|temporar\w*|timed? ?out|too many requests)\b', re.I)
+_RETRY_DESCRIPTION = re.compile(r'\b(too many requests|timed? ?out|try again later|try later)\b', re.I)
+_CHANGE = re.compile(r'\b(correct|re-?enter|verify|another|different|valid\w*|\w*check|configure|enable|activate|new)\b', re.I)
+_NON_ALNUM = re.compile(r'[^A-Z0-9]+')
+_CAMEL = re.compile(r'(?<=[a-z0-9])(?=[A-Z])')
+_CODE_LIKE = re.compile(r'^-?\d+$|^[A-Z][A-Z0-9_]+$')
+_SUCCESS = re.compile(r'^SUCCESS$|\bsuccess(ful)?(ly)?\b', re.I)
+_CODE_IN_TEXT = re.compile(r'\bcode\W{0,3}(-?\d{1,5})\b', re.I)
+# Shorter message patterns ("FAILED") match too much free text to mean anything
+MATCH_CACHE_SIZE = 4096
+MIN_PATTERN_LENGTH = 6
+
+def _clean(cell: Any) -> str:
+    """Plain text of a doc table cell"""
+    text = _HTML.sub(' ', str(cell or '')).replace('\\-', '-').replace('`', '').replace('\\_', '_')
+    text = ' '.join(text.split())
+    return '' if text in ('-', 'NA', 'N/A') else text
+
+def front_matter(text: str) -> Dict[str, str]:
+    if not text.startswith('---'):
+        return {}
+    end = text.find('\n---', 3)
+    fields = {}
+    for line in text[3:end].splitlines():
+        key, _, value = line.partition(':')
+        fields[key.strip()] = value.strip().strip('"')
+    return fields
+
+def _pipe_tables(text: str) -> Iterator[Tuple[List[str], List[List[str]]]]:
+    """Header and rows of each markdown pipe table"""
+    lines = text.splitlines()
+    index = 0
+    while index < len(lines) - 1:
+        line, separator = lines[index].strip(), lines[index + 1].strip()
+        if line.startswith('|') and separator.startswith('|') and set(separator) <= set('|:- '):
+            split = lambda row: [cell.strip() for cell in re.split(r'(?<!\\)\|', row.strip().strip('|'))]
+            header, rows = split(line), []
+            index += 2
+            while index < len(lines) and lines[index].strip().startswith('|'):
+                rows.append(split(lines[index]))
+                index += 1
+            yield header, rows
+        else:
+            index += 1
+
+def _block_tables(text: str) -> Iterator[Tuple[List[str], List[List[str]]]]:
+    """Header and rows of each readme.io [block:parameters] table"""
+    for match in _BLOCK.finditer(text):
+        try:
+            block = json.loads(match.group(1))
+            data, cols, rows = block['data'], int(block['cols']), int(block['rows'])
+        except (ValueError, KeyError, TypeError):
+            continue
+        yield ([data.get(f'h-{col}', '') for col in range(cols)],
+               [[data.get(f'{row}-{col}', '') for col in range(cols)] for row in range(rows)])
+
+def _retryable(entry: Dict[str, Any]) -> bool:
+    """Whether the same request may succeed when simply sent again"""
+    status = entry.get('http_status', '')
+    if status.startswith('5') or status == '429':
+        return True
+    fix = entry.get('fix', '')
+    if _RETRY_DESCRIPTION.search(entry.get('description', '')):
+        return True
+    return bool(_RETRY.search(fix)) and not _CHANGE.search(fix)
+
+def _fix_in_request(entry: Dict[str, Any]) -> bool:
+    """Whether the integration's request has to change (as opposed to a decline or outage)"""
+    if entry.get('retryable'):
+        return False
+    if entry.get('field') or entry.get('category') in ('request', 'validation'):
+        return True
+    source = entry.get('source', '').lower()
+    if source in EXTERNAL_SOURCES or entry.get('category') in EXTERNAL_CATEGORIES:
+        return False
+    return not entry.get('http_status', '').startswith('5')
+
+def build_error_catalog(docs_dir: str = DOCS_DIR) -> Dict[str, Any]:
+    """Parse every error-code table in the docs into catalog entries"""
+    entries: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+    examples = []
+    sources = []
+    paths = sorted(os.path.join(root, name) for root, _, names in os.walk(docs_dir)
+                   for name in names if name.endswith('.md') and not any(skip in name for skip in SKIP_DOCS))
+    # Visible pages first, so their wording wins over hidden copies
+    documents = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        documents.append((front_matter(text).get('hidden') == 'true', path, text))
+    documents.sort(key=lambda document: document[:2])
+
+    for hidden, path, text in documents:
+        relative = os.path.relpath(path, docs_dir)
+        domain = next((name for hint, name in DOMAIN_HINTS if hint in relative.lower()), 'api')
+        found = 0
+        for header, rows in list(_pipe_tables(text)) + list(_block_tables(text)):
+            fields = [HEADER_FIELDS.get(_clean(cell).lower()) for cell in header]
+            if 'code' not in fields or not {'message', 'description', 'name'} & set(fields):
+                continue
+            for row in rows:
+                record = {field: _clean(cell) for field, cell in zip(fields, row) if field and _clean(cell)}
+                # Response-code tables also list the success codes
+                if _SUCCESS.search(record.get('message') or record.get('description', '')):
+                    continue
+                for code in _CODE_SPLIT.split(record.pop('code', '')):
+                    if not _CODE_LIKE.match(code):
+                        continue
+                    key = (domain, code.upper(), record.get('name') or record.get('message', '').upper())
+                    entry = entries.setdefault(key, {'code': code, 'domain': domain, 'doc': relative})
+                    for field, value in record.items():
+                        entry.setdefault(field, value)
+                    found += 1
+        if found:
+            sources.append({'doc': relative, 'domain': domain, 'rows': found, 'hidden': hidden})
+        # Sample {"code", "message"} error bodies give extra wordings of the same code
+        for block in _FENCED_JSON.finditer(text):
+            try:
+                sample = json.loads(block.group(1))
+            except ValueError:
+                continue
+            if isinstance(sample, dict) and isinstance(sample.get('code'), str) and isinstance(sample.get('message'), str):
+                examples.append((domain, sample['code'].upper(), _clean(sample['message'])))
+
+    catalog = []
+    for entry in entries.values():
+        entry['retryable'] = _retryable(entry)
+        entry['fix_in_request'] = _fix_in_request(entry)
+        catalog.append(entry)
+    by_code = defaultdict(list)
+    for entry in catalog:
+        by_code[(entry['domain'], entry['code'].upper())].append(entry)
+    for domain, code, message in examples:
+        for entry in by_code.get((domain, code), [])[:1]:
+            aliases = entry.setdefault('aliases', [])
+            if message and message not in aliases and message != entry.get('message'):
+                aliases.append(message)
+
+    catalog.sort(key=lambda entry: (entry['domain'], entry['code']))
+    return {'version': 1, 'sources': sources, 'entries': catalog}
+
+def write_error_catalog(docs_dir: str = DOCS_DIR, path: str = CATALOG_PATH) -> Dict[str, Any]:
+    """Build the catalog and write it as compact JSON"""
+    catalog = build_error_catalog(docs_dir)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(catalog, f, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+        f.write('\n')
+    return catalog
+
+def _normalize(text: str) -> str:
+    """Uppercase words separated by single spaces and padded, so matches fall on word boundaries"""
+    return f" {_NON_ALNUM.sub(' ', _CAMEL.sub(' ', text).upper()).strip()} "
+
+class ErrorCatalog:
+    """Indexed error codes from the docs with a message automaton for free-text errors"""
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        self.entries = entries
+        self._by_code: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        patterns = []
+        for entry in entries:
+            self._by_code[entry['code'].upper()].append(entry)
+            texts = [entry.get('message'), entry.get('name')] + entry.get('aliases', [])
+            if not entry['code'].lstrip('-').isdigit():
+                texts.append(entry['code'])
+            for text in {_normalize(text) for text in texts if text}:
+                if len(text.strip()) >= MIN_PATTERN_LENGTH:
+                    patterns.append((text, entry))
+        self._automaton = AhoCorasick(patterns)
+        # Validation and gateway messages repeat, so matches are memoized per (text, domain)
+        self._matches: Dict[Tuple[str, Optional[str]], List[Dict[str, Any]]] = {}
+
+    @classmethod
+    def load(cls, path: str = CATALOG_PATH) -> 'ErrorCatalog':
+        try:
+            with open(path, encoding='utf-8') as f:
+                return cls(json.load(f)['entries'])
+        except FileNotFoundError:
+            print(f"⚠️ Error catalog {path} not found; run `flask docs build-error-catalog`")
+            return cls([])
+
+    def lookup(self, code: Any, domain: str = None) -> Optional[Dict[str, Any]]:
+        """Entry for an exact error code, preferring the given domain"""
+        candidates = self._by_code.get(str(code).strip().upper())
+        if not candidates:
+            return None
+        if domain:
+            for entry in candidates:
+                if entry['domain'] == domain:
+                    return entry
+        return candidates[0]
+
+    def match(self, text: str, domain: str = None) -> List[Dict[str, Any]]:
+        """Entries whose message, name or code appears in free text, longest match first"""
+        cached = self._matches.get((text, domain))
+        if cached is not None:
+            return cached
+        found = {}
+        for start, end, entry in self._automaton.iter(_normalize(text)):
+            length = end - start
+            if length > found.get(id(entry), (0, None))[0]:
+                found[id(entry)] = (length, entry)
+        ranked = sorted(found.values(), key=lambda item: (-item[0], item[1]['domain'] != domain))
+        matches = [entry for _, entry in ranked]
+        if len(self._matches) >= MATCH_CACHE_SIZE:
+            self._matches.clear()
+        self._matches[(text, domain)] = matches
+        return matches
+
+    def explain(self, error: Any, domain: str = None) -> Optional[Dict[str, Any]]:
+        """Catalog entry for an error response dict or message, or None when it is not a known error"""
+        code = message = None
+        if isinstance(error, dict):
+            code = next((error[key] for key in ('code', 'error_code', 'ppc_ParentTxnResponseCode',
+                                               'parent_txn_response_code', 'response_code') if error.get(key)), None)
+            message = next((error[key] for key in ('message', 'error', 'error_message', 'ppc_ParentTxnResponseMessage',
+                                                  'parent_txn_response_message', 'txn_response_msg') if error.get(key)), None)
+        elif error:
+            message = str(error)
+            if message.strip().upper() in self._by_code:
+                code = message
+        if code is None and isinstance(message, str):
+            mentioned = _CODE_IN_TEXT.search(message)
+            code = mentioned.group(1) if mentioned else None
+
+        matches = self.match(str(message), domain) if isinstance(message, str) else []
+        if code is not None:
+            candidates = self._by_code.get(str(code).strip().upper(), [])
+            # A code shared across products is settled by the message, then by the domain
+            for entry in matches:
+                if entry in candidates:
+                    return dict(entry, matched_by='code')
+            entry = self.lookup(code, domain)
+            if entry is not None:
+                return dict(entry, matched_by='code')
+        if matches:
+            return dict(matches[0], matched_by='message')
+        return None
+
+    def metrics(self) -> Dict[str, Any]:
+        return {'entries': len(self.entries), 'codes': len(self._by_code), 'automaton_states': len(self._automaton)}
+
+def describe(entry: Dict[str, Any]) -> str:
+    """One-paragraph explanation of a catalog entry"""
+    parts = [f"{entry['code']} {entry.get('message') or entry.get('name', '')}".strip() + '.']
+    if entry.get('description'):
+        parts.append(entry['description'].rstrip('.') + '.')
+    if entry.get('fix'):
+        parts.append(f"Next steps: {entry['fix'].rstrip('.')}.")
+    if entry.get('source'):
+        parts.append(f"Raised by: {entry['source']}.")
+    parts.append('Safe to retry as is.' if entry.get('retryable') else 'Do not retry unchanged.')
+    return ' '.join(parts)
+
+def as_comment(text: str, language: str) -> str:
+    """Text as line comments in the given language"""
+    prefix = '#' if language.lower() in ('python', 'ruby', 'shell', 'bash') else '//'
+    return '\n'.join(f"{prefix} {line}".rstrip() for line in text.splitlines() or [''])
+
+_error_catalog = None
+_error_catalog_lock = threading.Lock()
+
+def get_error_catalog() -> ErrorCatalog:
+    """Get the process-wide error catalog"""
+    global _error_catalog
+    if _error_catalog is None:
+        with _error_catalog_lock:
+            if _error_catalog is None:
+                _error_catalog = ErrorCatalog.load()
+    return _error_catalog
+
+@register_warmup
+def _load_error_catalog(app):
+    get_error_catalog()
@@ -0,0 +1,113 @@
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Callable, List, Optional
+
+class EventBus:
+    """In-process publish/subscribe with a replay buffer
+
+    Events go into one shared ring buffer with increasing ids, so any number
+    of SSE or long-poll readers can follow it from their last seen id without
+    per-reader queues. Listeners registered with subscribe() are called
+    synchronously on publish for in-process consumers.
+    """
+
+    def __init__(self, buffer_size: int = None):
+        self.buffer_size = buffer_size or int(os.getenv('EVENT_BUFFER_SIZE', 1000))
+        self._events = deque(maxlen=self.buffer_size)
+        self._ids = itertools.count(1)
+        self._last_id = 0
+        self._cond = threading.Condition()
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._viewers = 0
+        self.published = 0
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    @property
+    def viewers(self) -> int:
+        """Open SSE streams and long-polls currently following the bus"""
+        return self._viewers
+
+    def connect(self):
+        """Count a reader in until the matching disconnect()"""
+        with self._cond:
+            self._viewers += 1
+
+    def disconnect(self):
+        with self._cond:
+            self._viewers -= 1
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Append an event, wake waiting readers and notify listeners"""
+        with self._cond:
+            event = {'id': next(self._ids), 'type': event_type, 'time': time.time(), 'data': data}
+            self._events.append(event)
+            self._last_id = event['id']
+            self.published += 1
+            self._cond.notify_all()
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"❌ Event listener failed: {str(e)}")
+        return event
+
+    def subscribe(self, listener: Callable[[Dict[str, Any]], None]):
+        """Call listener with every published event"""
+        with self._cond:
+            self._listeners.append(listener)
+
+    def events_after(self, after_id: int) -> Optional[List[Dict[str, Any]]]:
+        """Buffered events newer than after_id, or None when some were already dropped"""
+        with self._cond:
+            return self._since(after_id)
+
+    def _since(self, after_id: int) -> Optional[List[Dict[str, Any]]]:
+        # Too old for the buffer, or an id from before a restart
+        if after_id > self._last_id or (self._events and after_id < self._events[0]['id'] - 1):
+            return None
+        if after_id == self._last_id:
+            return []
+        # Ids are contiguous, so the start index follows from the first id
+        start = after_id - self._events[0]['id'] + 1
+        return list(itertools.islice(self._events, max(start, 0), None))
+
+    def wait(self, after_id: int, timeout: float) -> Optional[List[Dict[str, Any]]]:
+        """Block until there are events newer than after_id or the timeout passes"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while after_id == self._last_id:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._cond.wait(remaining)
+            return self._since(after_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'published': self.published,
+                'buffered': len(self._events),
+                'last_id': self._last_id,
+                'listeners': len(self._listeners),
+                'viewers': self._viewers
+            }
+
+_event_bus = None
+_event_bus_lock = threading.Lock()
+
+def get_event_bus() -> EventBus:
+    """Get the process-wide event bus"""
+    global _event_bus
+    if _event_bus is None:
+        with _event_bus_lock:
+            if _event_bus is None:
+                _event_bus = EventBus()
+    return _event_bus
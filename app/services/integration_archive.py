@@ -0,0 +1,177 @@
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+from sqlalchemy.orm import undefer
+from app.models import Integration, db
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet archives are optional
+    pyarrow = None
+    pq = None
+
+MANIFEST_NAME = 'manifest.json'
+
+def parse_retention(spec: str) -> Dict[str, int]:
+    """Parse a retention spec like 'success=30,failed=90' into days per status"""
+    retention = {}
+    for item in (spec or '').split(','):
+        if not item.strip():
+            continue
+        status, _, days = item.partition('=')
+        retention[status.strip()] = int(days)
+    return retention
+
+class IntegrationArchive:
+    """Moves aged integration rows into monthly archive files and reads them back"""
+
+    def __init__(self, archive_dir: str, retention_days: Dict[str, int], archive_format: str = 'ndjson'):
+        if archive_format not in ('ndjson', 'parquet'):
+            raise ValueError(f"Unsupported archive format: {archive_format}")
+        if archive_format == 'parquet' and pyarrow is None:
+            raise RuntimeError("pyarrow is required for parquet archives")
+
+        self.archive_dir = archive_dir
+        self.retention_days = retention_days
+        self.archive_format = archive_format
+
+    @classmethod
+    def from_config(cls, config) -> 'IntegrationArchive':
+        """Build an archive from the Flask app config"""
+        return cls(
+            config['INTEGRATION_ARCHIVE_DIR'],
+            config['INTEGRATION_RETENTION_DAYS'],
+            config['INTEGRATION_ARCHIVE_FORMAT']
+        )
+
+    def eligible_counts(self, now: datetime = None) -> Dict[str, int]:
+        """Count rows past their retention window, per status"""
+        now = now or datetime.utcnow()
+        return {
+            status: Integration.query.filter(
+                Integration.status == status,
+                Integration.created_at < now - timedelta(days=days)
+            ).count()
+            for status, days in self.retention_days.items()
+        }
+
+    def archive(self, now: datetime = None, batch_size: int = 500) -> Dict[str, int]:
+        """Archive every row past its retention window, one batch per transaction"""
+        now = now or datetime.utcnow()
+        archived = {}
+
+        for status, days in self.retention_days.items():
+            cutoff = now - timedelta(days=days)
+            archived[status] = 0
+
+            while True:
+                batch = Integration.query.options(
+                    undefer(Integration.request_payload),
+                    undefer(Integration.response_data)
+                ).filter(
+                    Integration.status == status,
+                    Integration.created_at < cutoff
+                ).order_by(Integration.id).limit(batch_size).all()
+
+                if not batch:
+                    break
+
+                # Files are written before rows are deleted so a crash can
+                # only duplicate a row in the archive, never lose it
+                self._write_batch(batch)
+                Integration.query.filter(
+                    Integration.id.in_([integration.id for integration in batch])
+                ).delete(synchronize_session=False)
+                db.session.commit()
+
+                archived[status] += len(batch)
+
+        return archived
+
+    def find(self, integration_id: int) -> Optional[Dict[str, Any]]:
+        """Look up an archived integration by id"""
+        manifest = self._load_manifest()
+
+        for name, entry in manifest['files'].items():
+            if not entry['min_id'] <= integration_id <= entry['max_id']:
+                continue
+
+            for record in self._read_file(os.path.join(self.archive_dir, name), integration_id):
+                if record['id'] == integration_id:
+                    record['archived'] = True
+                    return record
+
+        return None
+
+    def _write_batch(self, batch: List[Integration]):
+        """Append a batch of rows to the archive file of their month"""
+        by_month = {}
+        for integration in batch:
+            by_month.setdefault(integration.created_at.strftime('%Y-%m'), []).append(
+                integration.to_dict(include_payloads=True)
+            )
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        manifest = self._load_manifest()
+
+        for month, records in by_month.items():
+            if self.archive_format == 'parquet':
+                name = os.path.join(month, f"part-{records[0]['id']}-{records[-1]['id']}.parquet")
+                self._write_parquet(os.path.join(self.archive_dir, name), records)
+            else:
+                name = f"integration-{month}.ndjson.gz"
+                self._write_ndjson(os.path.join(self.archive_dir, name), records)
+
+            ids = [record['id'] for record in records]
+            entry = manifest['files'].setdefault(name, {'min_id': min(ids), 'max_id': max(ids), 'rows': 0})
+            entry['min_id'] = min(entry['min_id'], min(ids))
+            entry['max_id'] = max(entry['max_id'], max(ids))
+            entry['rows'] += len(records)
+
+        self._save_manifest(manifest)
+
+    def _write_ndjson(self, path: str, records: List[Dict[str, Any]]):
+        """Append records as a new gzip member of the monthly NDJSON file"""
+        with gzip.open(path, 'at', encoding='utf-8') as archive_file:
+            for record in records:
+                archive_file.write(json.dumps(record, separators=(',', ':'), default=str))
+                archive_file.write('\n')
+
+    def _write_parquet(self, path: str, records: List[Dict[str, Any]]):
+        """Write records as a zstd-compressed parquet part file"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        rows = [dict(record, request_payload=json.dumps(record['request_payload']),
+                     response_data=json.dumps(record['response_data'])) for record in records]
+        pq.write_table(pyarrow.Table.from_pylist(rows), path, compression='zstd')
+
+    def _read_file(self, path: str, integration_id: int):
+        """Yield candidate records for an id from one archive file"""
+        if path.endswith('.parquet'):
+            for row in pq.read_table(path, filters=[('id', '=', integration_id)]).to_pylist():
+                row['request_payload'] = json.loads(row['request_payload'])
+                row['response_data'] = json.loads(row['response_data'])
+                yield row
+            return
+
+        with gzip.open(path, 'rt', encoding='utf-8') as archive_file:
+            for line in archive_file:
+                yield json.loads(line)
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        """Load the id-range manifest used to narrow archive lookups"""
+        path = os.path.join(self.archive_dir, MANIFEST_NAME)
+        if not os.path.exists(path):
+            return {'files': {}}
+        with open(path, encoding='utf-8') as manifest_file:
+            return json.load(manifest_file)
+
+    def _save_manifest(self, manifest: Dict[str, Any]):
+        """Atomically replace the manifest file"""
+        path = os.path.join(self.archive_dir, MANIFEST_NAME)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
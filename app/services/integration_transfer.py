@@ -0,0 +1,178 @@
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import Dict, Any, Iterable, Iterator, Optional
+from app.models import Integration, db
+from app.utils.database import read_session
+from app.utils.payload_storage import compact_json, decode_payload, encode_payload
+from app.utils.redaction import redact
+
+EXPORT_FIELDS = ['id', 'merchant_id', 'integration_type', 'status', 'error_message',
+                 'created_at', 'updated_at', 'request_payload', 'response_data']
+EXPORT_FORMATS = ('ndjson', 'csv')
+# Text is handed to the response/file in chunks of roughly this size
+CHUNK_BYTES = 64 * 1024
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO date or datetime filter value"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', expected ISO format like 2024-11-01 or 2024-11-01T10:00:00")
+
+class IntegrationExporter:
+    """Streams integration rows out as NDJSON or CSV with constant memory"""
+
+    def __init__(self, merchant_id: str = None, status: str = None, since: datetime = None,
+                 until: datetime = None, include_payloads: bool = True, batch_size: int = None):
+        self.merchant_id = merchant_id
+        self.status = status
+        self.since = since
+        self.until = until
+        self.include_payloads = include_payloads
+        self.batch_size = batch_size or int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+
+    def query(self):
+        """Filtered select over the integration table in id order"""
+        table = Integration.__table__
+        columns = [table.c[name] for name in EXPORT_FIELDS if name not in ('request_payload', 'response_data')]
+        if self.include_payloads:
+            columns += [table.c.request_payload, table.c.request_codec,
+                        table.c.response_data, table.c.response_codec]
+
+        query = db.select(*columns).order_by(table.c.id)
+        if self.merchant_id:
+            query = query.where(table.c.merchant_id == self.merchant_id)
+        if self.status:
+            query = query.where(table.c.status == self.status)
+        if self.since:
+            query = query.where(table.c.created_at >= self.since)
+        if self.until:
+            query = query.where(table.c.created_at < self.until)
+        return query.execution_options(yield_per=self.batch_size)
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """Export records, fetched batch by batch from a streaming cursor"""
+        for row in read_session().execute(self.query()):
+            record = {
+                'id': row.id,
+                'merchant_id': row.merchant_id,
+                'integration_type': row.integration_type,
+                'status': row.status,
+                'error_message': row.error_message,
+                'created_at': row.created_at.isoformat() if row.created_at else None,
+                'updated_at': row.updated_at.isoformat() if row.updated_at else None
+            }
+            if self.include_payloads:
+                # Rows stored before write-path redaction may still hold card data
+                record['request_payload'] = redact(decode_payload(row.request_payload, row.request_codec))
+                record['response_data'] = redact(decode_payload(row.response_data, row.response_codec))
+            yield record
+
+    def fields(self):
+        if self.include_payloads:
+            return EXPORT_FIELDS
+        return [name for name in EXPORT_FIELDS if name not in ('request_payload', 'response_data')]
+
+    def stream(self, export_format: str = 'ndjson') -> Iterator[str]:
+        """Serialized export in text chunks"""
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format '{export_format}'")
+        lines = self._csv_lines() if export_format == 'csv' else self._ndjson_lines()
+        return _chunked(lines)
+
+    def _ndjson_lines(self) -> Iterator[str]:
+        for record in self.rows():
+            yield compact_json(record) + '\n'
+
+    def _csv_lines(self) -> Iterator[str]:
+        fields = self.fields()
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for record in self.rows():
+            # Payloads go into single CSV cells as compact JSON
+            writer.writerow([compact_json(record[name]) if name in ('request_payload', 'response_data')
+                             and record[name] is not None else record[name] for name in fields])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+def _chunked(lines: Iterable[str]) -> Iterator[str]:
+    """Group small lines into larger chunks to cut per-write overhead"""
+    parts = []
+    size = 0
+    for line in lines:
+        parts.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield ''.join(parts)
+            parts = []
+            size = 0
+    if parts:
+        yield ''.join(parts)
+
+def gzip_stream(chunks: Iterable[str]) -> Iterator[bytes]:
+    """Gzip text chunks on the fly"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def import_ndjson(lines: Iterable, batch_size: int = None, keep_ids: bool = False) -> Dict[str, int]:
+    """Load NDJSON integration records with batched executemany inserts"""
+    batch_size = batch_size or int(os.getenv('IMPORT_BATCH_SIZE', 1000))
+    table = Integration.__table__
+    batch = []
+    counts = {'inserted': 0, 'skipped': 0}
+
+    def flush():
+        if batch:
+            db.session.execute(db.insert(table), batch)
+            db.session.commit()
+            counts['inserted'] += len(batch)
+            batch.clear()
+
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        try:
+            batch.append(_import_row(json.loads(line), keep_ids))
+        except (ValueError, KeyError, TypeError):
+            counts['skipped'] += 1
+            continue
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return counts
+
+def _import_row(record: Dict[str, Any], keep_ids: bool) -> Dict[str, Any]:
+    """Column values for one exported record; payloads are re-encoded for storage"""
+    now = datetime.utcnow()
+    request_payload, request_codec = encode_payload(redact(record.get('request_payload')))
+    response_data, response_codec = encode_payload(redact(record.get('response_data')))
+    row = {
+        'merchant_id': record['merchant_id'],
+        'integration_type': record['integration_type'],
+        'status': record.get('status') or 'pending',
+        'error_message': record.get('error_message'),
+        'request_payload': request_payload,
+        'request_codec': request_codec,
+        'response_data': response_data,
+        'response_codec': response_codec,
+        'created_at': parse_timestamp(record.get('created_at')) or now,
+        'updated_at': parse_timestamp(record.get('updated_at')) or now
+    }
+    if keep_ids:
+        row['id'] = int(record['id'])
+    return row
@@ -0,0 +1,344 @@
+import json
+import os
+import socket
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Any, Callable, List, Optional
+from flask import current_app, request, jsonify, url_for
+from app.models import Job, db
+from app.services.llm_scheduler import llm_request_context, current_request_context, SchedulerRejected
+from app.utils.redaction import redact
+
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed')
+FINISHED_STATUSES = ('succeeded', 'failed')
+# Progress reported for ReAct steps when a handler passes none
+STAGE_PROGRESS = {'reasoning': 10, 'acting': 40, 'observing': 70, 'responding': 85}
+
+# Handlers by job kind, registered next to the routes that run the same work synchronously
+_handlers: Dict[str, Callable[[Dict[str, Any], Callable], Any]] = {}
+# Wakes idle workers in this process when a job is submitted
+_submitted = threading.Condition()
+
+def job_handler(kind: str):
+    """Register the function that runs jobs of a kind: handler(payload, report) -> result"""
+    def decorator(handler):
+        _handlers[kind] = handler
+        return handler
+    return decorator
+
+def job_kinds() -> List[str]:
+    return sorted(_handlers)
+
+def submit_job(kind: str, payload: Dict[str, Any], priority: int = 0, merchant_id: str = None,
+               max_attempts: int = None) -> Job:
+    """Queue a job and wake a local worker"""
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+    stored = redact(payload)
+    if stored != payload:
+        # The worker runs on the stored copy, which would no longer be what the client sent
+        raise ValueError("The payload holds card numbers, CVVs or secrets, which are never stored; "
+                         "send the request without async")
+    job = Job(
+        id=uuid.uuid4().hex,
+        kind=kind,
+        status='queued',
+        priority=priority,
+        merchant_id=merchant_id,
+        # Stored like every other payload: card numbers, CVVs and secrets never reach the table
+        payload=json.dumps(stored, separators=(',', ':')),
+        max_attempts=max_attempts or int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+    )
+    db.session.add(job)
+    db.session.commit()
+    with _submitted:
+        _submitted.notify()
+    return job
+
+def async_requested() -> bool:
+    """Whether the client asked for a job id instead of waiting (?async=1 or "async": true)"""
+    if request.args.get('async', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return request.is_json and (request.get_json(silent=True) or {}).get('async') is True
+
+def enqueue_request(kind: str, payload: Dict[str, Any]):
+    """Queue the current request's work at its scheduling priority and answer 202"""
+    context = current_request_context()
+    try:
+        job = submit_job(kind, payload, priority=context.priority, merchant_id=context.merchant_id)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return job_accepted(job)
+
+def job_accepted(job: Job):
+    """202 response pointing at the job's poll URL"""
+    poll_url = url_for('api.get_job', job_id=job.id)
+    response = jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'poll_url': poll_url
+    })
+    response.status_code = 202
+    response.headers['Location'] = poll_url
+    return response
+
+class JobQueue:
+    """Runs jobs from the job table on a pool of worker threads
+
+    Workers claim the next runnable job with a conditional UPDATE, so any
+    number of threads and processes can share the table without running a
+    job twice. A claimed job carries a lease that this process keeps
+    renewing; once a lease expires (the worker died or the process was
+    restarted) the job is runnable again until it runs out of attempts.
+    """
+
+    def __init__(self, app, workers: int = None, lease_seconds: float = None, poll_interval: float = None,
+                 retry_delay: float = None, retention_hours: float = None):
+        self.app = app
+        self.workers = workers if workers is not None else int(os.getenv('JOB_WORKERS', 2))
+        self.lease_seconds = lease_seconds or float(os.getenv('JOB_LEASE_SECONDS', 120))
+        self.poll_interval = poll_interval or float(os.getenv('JOB_POLL_INTERVAL', 2))
+        self.retry_delay = retry_delay or float(os.getenv('JOB_RETRY_DELAY', 5))
+        self.retention_hours = retention_hours or float(os.getenv('JOB_RETENTION_HOURS', 24))
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._running = 0
+        self.stats = Counter({'claimed': 0, 'succeeded': 0, 'failed': 0, 'retried': 0, 'recovered': 0})
+
+    def _runnable(self, now: datetime):
+        table = Job.__table__
+        return db.or_(
+            db.and_(table.c.status == 'queued', table.c.run_after <= now),
+            db.and_(table.c.status == 'running', table.c.lease_expires_at < now)
+        )
+
+    def claim(self) -> Optional[str]:
+        """Take the next runnable job by priority and age; None when there is none"""
+        table = Job.__table__
+        for _ in range(5):
+            now = datetime.utcnow()
+            job_id = db.session.execute(
+                db.select(table.c.id).where(self._runnable(now))
+                .order_by(table.c.priority, table.c.created_at).limit(1)
+            ).scalar()
+            if job_id is None:
+                return None
+            # Re-checking the condition makes the claim atomic: another worker may have won the row
+            claimed = db.session.execute(
+                db.update(table).where(table.c.id == job_id, self._runnable(now)).values(
+                    status='running',
+                    locked_by=self.worker_id,
+                    lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                    attempts=table.c.attempts + 1,
+                    started_at=now,
+                    stage='claimed',
+                    progress=0,
+                    updated_at=now
+                )
+            ).rowcount
+            db.session.commit()
+            if claimed:
+                return job_id
+        return None
+
+    def _update_held(self, job_id: str, **values) -> bool:
+        """Update a job only while this process still holds it"""
+        table = Job.__table__
+        values['updated_at'] = datetime.utcnow()
+        updated = db.session.execute(
+            db.update(table).where(table.c.id == job_id, table.c.locked_by == self.worker_id,
+                                   table.c.status == 'running').values(**values)
+        ).rowcount
+        db.session.commit()
+        return bool(updated)
+
+    def run_job(self, job_id: str):
+        """Run a claimed job and store its result, retry or failure"""
+        job = db.session.get(Job, job_id)
+        handler = _handlers.get(job.kind)
+
+        def report(stage: str, progress: int = None):
+            values = {'stage': stage}
+            progress = STAGE_PROGRESS.get(stage) if progress is None else progress
+            if progress is not None:
+                values['progress'] = progress
+            self._update_held(job_id, **values)
+
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown job kind: {job.kind}")
+            payload = json.loads(job.payload)
+            with llm_request_context(job.priority, f"job:{job.kind}", job.merchant_id or 'anonymous') as context:
+                result = handler(payload, report)
+            if context.rejected is not None:
+                raise context.rejected
+        except SchedulerRejected as e:
+            # Over the LLM budget: wait it out without spending an attempt
+            self._retry(job, str(e), e.retry_after, spend_attempt=False)
+        except Exception as e:
+            if job.attempts < job.max_attempts:
+                self._retry(job, str(e), self.retry_delay * 2 ** (job.attempts - 1))
+            else:
+                self._finish(job_id, 'failed', error_message=str(e))
+        else:
+            self._finish(job_id, 'succeeded', result=json.dumps(redact(result), default=str))
+
+    def _retry(self, job: Job, error: str, delay: float, spend_attempt: bool = True):
+        table = Job.__table__
+        values = {
+            'status': 'queued',
+            'error_message': error,
+            'locked_by': None,
+            'lease_expires_at': None,
+            'run_after': datetime.utcnow() + timedelta(seconds=delay),
+            'stage': 'retrying'
+        }
+        if not spend_attempt:
+            values['attempts'] = table.c.attempts - 1
+        if self._update_held(job.id, **values):
+            self.stats['retried'] += 1
+
+    def _finish(self, job_id: str, status: str, **values):
+        if status == 'succeeded':
+            values['progress'] = 100
+        if self._update_held(job_id, status=status, locked_by=None, lease_expires_at=None,
+                             finished_at=datetime.utcnow(), stage=status, **values):
+            self.stats[status] += 1
+
+    def heartbeat(self):
+        """Extend the leases of jobs this process is running"""
+        table = Job.__table__
+        now = datetime.utcnow()
+        db.session.execute(
+            db.update(table).where(table.c.locked_by == self.worker_id, table.c.status == 'running')
+            .values(lease_expires_at=now + timedelta(seconds=self.lease_seconds))
+        )
+        db.session.commit()
+
+    def recover(self) -> int:
+        """Fail abandoned jobs that are out of attempts and drop old finished jobs"""
+        table = Job.__table__
+        now = datetime.utcnow()
+        # Abandoned jobs with attempts left are picked up again by claim()
+        failed = db.session.execute(
+            db.update(table).where(
+                table.c.status == 'running',
+                table.c.lease_expires_at < now,
+                table.c.attempts >= table.c.max_attempts
+            ).values(status='failed', error_message='The worker stopped before the job finished',
+                     locked_by=None, lease_expires_at=None, finished_at=now, stage='failed', updated_at=now)
+        ).rowcount
+        db.session.execute(
+            db.delete(table).where(table.c.status.in_(FINISHED_STATUSES),
+                                   table.c.finished_at < now - timedelta(hours=self.retention_hours))
+        )
+        db.session.commit()
+        self.stats['recovered'] += failed
+        return failed
+
+    def _work(self):
+        while not self._stopping.is_set():
+            with self.app.app_context():
+                try:
+                    job_id = self.claim()
+                    if job_id is not None:
+                        with self._lock:
+                            self._running += 1
+                        self.stats['claimed'] += 1
+                        try:
+                            self.run_job(job_id)
+                        finally:
+                            with self._lock:
+                                self._running -= 1
+                except Exception as e:
+                    db.session.rollback()
+                    job_id = None
+                    print(f"❌ Job worker error: {str(e)}")
+            if job_id is None:
+                with _submitted:
+                    _submitted.wait(self.poll_interval)
+
+    def _maintain(self):
+        # Renewing at a third of the lease tolerates a couple of slow or failed renewals
+        while not self._stopping.wait(self.lease_seconds / 3):
+            with self.app.app_context():
+                try:
+                    self.heartbeat()
+                    self.recover()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"❌ Job lease renewal failed: {str(e)}")
+
+    def start(self) -> int:
+        """Start the worker and lease threads; returns the number of workers"""
+        if self.workers <= 0:
+            return 0
+        if self._threads:
+            return self.workers
+        with self.app.app_context():
+            self.recover()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._maintain, name='job-leases', daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return self.workers
+
+    def stop(self, timeout: float = 0):
+        """Stop claiming jobs and wait up to timeout seconds for running ones to finish"""
+        self._stopping.set()
+        with _submitted:
+            _submitted.notify_all()
+        if timeout:
+            for thread in self._threads:
+                thread.join(timeout)
+
+    def counts(self) -> Dict[str, int]:
+        """Jobs in the table by status"""
+        table = Job.__table__
+        rows = db.session.execute(db.select(table.c.status, db.func.count()).group_by(table.c.status)).all()
+        counts = {status: 0 for status in JOB_STATUSES}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'worker_id': self.worker_id,
+            'workers': self.workers if self._threads else 0,
+            'running': self._running,
+            'kinds': job_kinds(),
+            'jobs': self.counts(),
+            **self.stats
+        }
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue(app=None) -> JobQueue:
+    """Get the process-wide job queue"""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue(app or current_app._get_current_object())
+    return _job_queue
+
+def start_job_workers(app) -> int:
+    """Start this process's job workers (JOB_WORKERS, 0 to only submit)"""
+    workers = get_job_queue(app).start()
+    if workers:
+        print(f"🧵 Started {workers} job workers")
+    return workers
+
+def stop_job_workers(timeout: float = 0):
+    """Stop claiming new jobs; jobs cut off mid-run are recovered once their lease expires"""
+    if _job_queue is not None:
+        _job_queue.stop(timeout)
@@ -0,0 +1,214 @@
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+from app.models import Integration
+from app.services.anomaly_detector import payment_mode_of
+from app.services.event_bus import get_event_bus
+from app.utils.database import read_query
+from app.utils.payload_storage import decode_payload
+
+EVENT_CREATED = 'integration.created'
+EVENT_UPDATED = 'integration.updated'
+EVENT_RESYNC = 'resync'
+_PENDING_KEY = 'integration_events'
+
+class LiveStats:
+    """Dashboard counters kept current from integration events instead of per-view queries
+
+    Counts are seeded with one query, then adjusted by each committed write.
+    A periodic resync corrects drift from bulk writes that skip ORM events.
+    While anyone follows the event feed, a watcher thread also checks the
+    updated_at index for rows this process did not write (other workers,
+    the status poller, CLI imports) and recounts when it finds any. It
+    stops when the last viewer leaves and starts again with the next one.
+    """
+
+    def __init__(self, resync_seconds: float = None, watch_seconds: float = None):
+        self.resync_seconds = resync_seconds or float(os.getenv('LIVE_STATS_RESYNC_SECONDS', 300))
+        self.watch_seconds = watch_seconds if watch_seconds is not None else \
+            float(os.getenv('LIVE_STATS_WATCH_SECONDS', 5))
+        self._lock = threading.Lock()
+        self._by_status = Counter()
+        self._by_type = Counter()
+        self._seeded_at = None
+        # (id, updated_at) of writes this process published, so the watcher can skip them
+        self._local_writes = OrderedDict()
+        self._watermark = None
+        self._watcher = None
+
+    def _seed(self):
+        """Recount from the database; needs an app context"""
+        by_status = Counter(dict(read_query(Integration.status, func.count(Integration.id))
+                                 .group_by(Integration.status).all()))
+        by_type = Counter(dict(read_query(Integration.integration_type, func.count(Integration.id))
+                               .group_by(Integration.integration_type).all()))
+        with self._lock:
+            self._by_status = by_status
+            self._by_type = by_type
+            self._seeded_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current stats in the shape the dashboard template uses"""
+        if self._seeded_at is None or time.monotonic() - self._seeded_at > self.resync_seconds:
+            self._seed()
+        with self._lock:
+            return self._stats()
+
+    def _stats(self) -> Dict[str, Any]:
+        total = sum(self._by_status.values())
+        successful = self._by_status['success']
+        return {
+            'total': total,
+            'successful': successful,
+            'failed': self._by_status['failed'],
+            'success_rate': (successful / total * 100) if total > 0 else 0,
+            'type_breakdown': {key: value for key, value in self._by_type.items() if value}
+        }
+
+    def apply(self, delta: Dict[str, Any], integration: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Apply a write's status/type delta and return the new stats"""
+        with self._lock:
+            if self._seeded_at is not None:
+                # Before seeding, the seed query will already include this write
+                self._by_status.update(delta.get('status', {}))
+                self._by_type.update(delta.get('type', {}))
+            if integration is not None:
+                self._local_writes[(integration['id'], integration['updated_at'])] = True
+                if len(self._local_writes) > 1000:
+                    self._local_writes.popitem(last=False)
+            return self._stats()
+
+    def foreign_writes(self) -> bool:
+        """Whether rows written since the last check include writes from other processes"""
+        if self._watermark is None:
+            self._watermark = read_query(func.max(Integration.updated_at)).scalar() or datetime.min
+            return False
+        rows = (read_query(Integration.id, Integration.updated_at)
+                .filter(Integration.updated_at > self._watermark)
+                .order_by(Integration.updated_at).limit(500).all())
+        if not rows:
+            return False
+        self._watermark = rows[-1][1]
+        with self._lock:
+            return any((row_id, updated_at.isoformat()) not in self._local_writes for row_id, updated_at in rows)
+
+    def watch(self, app):
+        """Start the foreign-write watcher unless it runs; call after get_event_bus().connect()"""
+        if self.watch_seconds <= 0 or self._watcher is not None:
+            return
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._watcher = threading.Thread(target=self._watch, args=(app,), name='live-stats-watch', daemon=True)
+        self._watcher.start()
+
+    def _watch(self, app):
+        bus = get_event_bus()
+        while True:
+            time.sleep(self.watch_seconds)
+            # Checked under the lock watch() starts threads with, so a viewer that
+            # connects now either keeps this thread running or starts a new one
+            with self._lock:
+                if bus.viewers <= 0:
+                    self._watcher = None
+                    return
+            with app.app_context():
+                try:
+                    if self.foreign_writes():
+                        self._seed()
+                        get_event_bus().publish(EVENT_RESYNC, {'stats': self.snapshot()})
+                except Exception as e:
+                    print(f"❌ Live stats watcher failed: {str(e)}")
+
+_live_stats = None
+_live_stats_lock = threading.Lock()
+
+def get_live_stats() -> LiveStats:
+    """Get the process-wide live stats"""
+    global _live_stats
+    if _live_stats is None:
+        with _live_stats_lock:
+            if _live_stats is None:
+                _live_stats = LiveStats()
+    return _live_stats
+
+def _summary(target: Integration) -> Dict[str, Any]:
+    """List-view fields of an integration, without touching deferred payloads"""
+    return {
+        'id': target.id,
+        'merchant_id': target.merchant_id,
+        'integration_type': target.integration_type,
+        'status': target.status,
+        'error_message': target.error_message,
+        'payment_mode': _payment_mode(target),
+        'created_at': target.created_at.isoformat() if target.created_at else None,
+        'updated_at': target.updated_at.isoformat() if target.updated_at else None
+    }
+
+def _payment_mode(target: Integration) -> Optional[str]:
+    """Payment mode from whichever payload is already loaded; never triggers a load"""
+    state = inspect(target).dict
+    for column, codec in (('response_data', 'response_codec'), ('request_payload', 'request_codec')):
+        if state.get(column):
+            try:
+                mode = payment_mode_of(decode_payload(state[column], state.get(codec)))
+            except Exception:
+                continue
+            if mode:
+                return mode
+    return None
+
+def _queue(session: Session, event_type: str, target: Integration, delta: Dict[str, Any]):
+    """Hold the event until the transaction commits"""
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, []).append((event_type, _summary(target), delta))
+
+def _after_insert(mapper, connection, target):
+    delta = {'status': {target.status: 1}, 'type': {target.integration_type: 1}}
+    _queue(inspect(target).session, EVENT_CREATED, target, delta)
+
+def _after_update(mapper, connection, target):
+    history = inspect(target).attrs.status.history
+    if not history.has_changes():
+        return
+    old_status = history.deleted[0] if history.deleted else None
+    delta = {'status': {target.status: 1}}
+    if old_status is not None:
+        delta['status'][old_status] = delta['status'].get(old_status, 0) - 1
+    _queue(inspect(target).session, EVENT_UPDATED, target, delta)
+
+def _status_set(target, value, old_value, initiator):
+    # Registered with active_history so status changes always know the old value
+    return value
+
+def _after_commit(session: Session):
+    pending: List = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    live_stats = get_live_stats()
+    bus = get_event_bus()
+    for event_type, integration, delta in pending:
+        stats = live_stats.apply(delta, integration)
+        bus.publish(event_type, {'integration': integration, 'delta': delta, 'stats': stats})
+
+def _after_rollback(session: Session):
+    session.info.pop(_PENDING_KEY, None)
+
+_installed = False
+
+def install_integration_events():
+    """Publish committed Integration inserts and status changes on the event bus"""
+    global _installed
+    if _installed:
+        return
+    event.listen(Integration, 'after_insert', _after_insert)
+    event.listen(Integration, 'after_update', _after_update)
+    event.listen(Integration.status, 'set', _status_set, active_history=True, retval=True)
+    event.listen(Session, 'after_commit', _after_commit)
+    event.listen(Session, 'after_rollback', _after_rollback)
+    _installed = True
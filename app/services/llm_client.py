@@ -0,0 +1,156 @@
+import os
+import random
+import threading
+import time
+from typing import Dict, Any, List, Optional
+import httpx
+import openai
+from openai import OpenAI
+from app.services.llm_scheduler import get_llm_scheduler, current_request_context, SchedulerRejected
+from app.services.offline_llm import OfflineLLM
+
+# Status codes worth retrying: rate limits, timeouts and transient server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+class LLMResponse:
+    """Content, tool calls and token usage of one chat completion"""
+
+    def __init__(self, content: str, tool_calls: List[Any] = None, usage: Dict[str, int] = None,
+                 model: str = None):
+        self.content = content or ''
+        self.tool_calls = tool_calls or []
+        self.usage = usage or {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+        self.model = model
+
+class LLMClient:
+    """Process-wide chat client on the pooled openai 1.x transport"""
+
+    def __init__(self, api_key: str = None, model: str = None):
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.model = model or os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+        # 'offline' swaps in the deterministic stand-in (benchmarks, no API key)
+        self.backend = os.getenv('LLM_BACKEND', 'openai')
+        self.timeout = float(os.getenv('LLM_TIMEOUT', 30))
+        self.max_retries = int(os.getenv('LLM_MAX_RETRIES', 3))
+        self.backoff_base = float(os.getenv('LLM_BACKOFF_BASE', 0.5))
+        self.backoff_max = float(os.getenv('LLM_BACKOFF_MAX', 8))
+
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._usage_lock = threading.Lock()
+        self.usage_totals = {'requests': 0, 'retries': 0, 'prompt_tokens': 0,
+                             'completion_tokens': 0, 'total_tokens': 0}
+
+    def _get_client(self) -> OpenAI:
+        """Create the OpenAI client on first use so the app starts without a key"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None and self.backend == 'offline':
+                    self._client = OfflineLLM()
+                elif self._client is None:
+                    # One keep-alive connection pool shared by every request thread
+                    http_client = httpx.Client(
+                        timeout=self.timeout,
+                        limits=httpx.Limits(
+                            max_connections=int(os.getenv('LLM_MAX_CONNECTIONS', 50)),
+                            max_keepalive_connections=int(os.getenv('LLM_MAX_KEEPALIVE', 20)),
+                            keepalive_expiry=60
+                        )
+                    )
+                    # Retries are handled here so backoff and usage stay in one place
+                    self._client = OpenAI(
+                        api_key=self.api_key,
+                        timeout=self.timeout,
+                        max_retries=0,
+                        http_client=http_client
+                    )
+        return self._client
+
+    def chat(self, messages: List[Dict[str, Any]], max_tokens: int = 500, temperature: float = 0.7,
+             timeout: float = None, model: str = None, **kwargs) -> LLMResponse:
+        """Run a scheduled chat completion with a timeout and bounded retries"""
+        context = current_request_context()
+        scheduler = get_llm_scheduler()
+
+        try:
+            with scheduler.slot(context.priority, context.endpoint):
+                response = self._complete(messages, max_tokens, temperature, timeout, model, **kwargs)
+        except SchedulerRejected as e:
+            context.rejected = e
+            raise
+
+        # Budgets are charged with what the call actually used
+        scheduler.charge(context.merchant_id, response.usage['total_tokens'])
+        return response
+
+    def _complete(self, messages: List[Dict[str, Any]], max_tokens: int, temperature: float,
+                  timeout: Optional[float], model: Optional[str], **kwargs) -> LLMResponse:
+        """Call the chat completions API, retrying transient failures"""
+        client = self._get_client()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                completion = client.chat.completions.create(
+                    model=model or self.model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    timeout=timeout or self.timeout,
+                    **kwargs
+                )
+                return self._to_response(completion)
+
+            except openai.APIConnectionError:
+                # Includes APITimeoutError
+                retry_after = None
+                if attempt == self.max_retries:
+                    raise
+
+            except openai.APIStatusError as e:
+                if e.status_code not in RETRYABLE_STATUS_CODES or attempt == self.max_retries:
+                    raise
+                retry_after = e.response.headers.get('retry-after')
+
+            with self._usage_lock:
+                self.usage_totals['retries'] += 1
+            time.sleep(self._backoff(attempt, retry_after))
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        """Exponential backoff with jitter, honouring Retry-After when sent"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        delay = min(self.backoff_base * (2 ** attempt), self.backoff_max)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _to_response(self, completion) -> LLMResponse:
+        """Convert a completion and record its token usage"""
+        usage = {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+        if completion.usage is not None:
+            usage = {
+                'prompt_tokens': completion.usage.prompt_tokens,
+                'completion_tokens': completion.usage.completion_tokens,
+                'total_tokens': completion.usage.total_tokens
+            }
+
+        with self._usage_lock:
+            self.usage_totals['requests'] += 1
+            for key, value in usage.items():
+                self.usage_totals[key] += value
+
+        message = completion.choices[0].message
+        return LLMResponse(message.content, message.tool_calls, usage, completion.model)
+
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+def get_llm_client() -> LLMClient:
+    """Get the shared LLM client for this process"""
+    global _llm_client
+    if _llm_client is None:
+        with _llm_client_lock:
+            if _llm_client is None:
+                _llm_client = LLMClient()
+    return _llm_client
@@ -0,0 +1,315 @@
+import contextvars
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Any
+from flask import request, jsonify, session
+
+# Priority classes, lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_CODEGEN = 1
+PRIORITY_BATCH = 2
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_CODEGEN: 'codegen',
+    PRIORITY_BATCH: 'batch'
+}
+
+class SchedulerRejected(Exception):
+    """Raised when a request is over budget or cannot get an LLM slot in time"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class RequestContext:
+    """Scheduling attributes of the request currently making LLM calls"""
+
+    def __init__(self, priority: int, endpoint: str, merchant_id: str):
+        self.priority = priority
+        self.endpoint = endpoint
+        self.merchant_id = merchant_id
+        self.rejected = None
+
+DEFAULT_CONTEXT = RequestContext(PRIORITY_BATCH, 'default', 'anonymous')
+_current_context = contextvars.ContextVar('llm_request_context', default=DEFAULT_CONTEXT)
+
+@contextmanager
+def llm_request_context(priority: int, endpoint: str, merchant_id: str):
+    """Tag LLM calls made inside the block with a priority, endpoint and merchant"""
+    context = RequestContext(priority, endpoint, merchant_id)
+    token = _current_context.set(context)
+    try:
+        yield context
+    finally:
+        _current_context.reset(token)
+
+def current_request_context() -> RequestContext:
+    """Scheduling context of the running request"""
+    return _current_context.get()
+
+def slot_granted() -> bool:
+    """False once the running request was turned away by the scheduler
+
+    Services answer a rejection with an apology string, so coalesced calls
+    use this to keep that answer from reaching callers who were never
+    rejected themselves (and would otherwise get a 200 instead of a 429).
+    """
+    return _current_context.get().rejected is None
+
+class TokenBucket:
+    """Token bucket that refills continuously and may go into debt after actual usage"""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+    def retry_after(self, needed: float) -> float:
+        """Seconds until the bucket holds the needed tokens"""
+        missing = needed - self.available()
+        if missing <= 0:
+            return 0.0
+        return missing / self.refill_per_second
+
+def _parse_limits(spec: str) -> Dict[str, int]:
+    """Parse 'endpoint=limit,...' into a dict"""
+    limits = {}
+    for item in (spec or '').split(','):
+        if item.strip():
+            endpoint, _, limit = item.partition('=')
+            limits[endpoint.strip()] = int(limit)
+    return limits
+
+class LLMScheduler:
+    """Admission control, priority queueing and concurrency limits for LLM calls"""
+
+    def __init__(self, max_concurrency: int = None, endpoint_limits: Dict[str, int] = None,
+                 tokens_per_minute: int = None, token_burst: int = None,
+                 max_queue_depth: int = None, queue_timeout: float = None,
+                 estimated_tokens: int = None, max_buckets: int = None):
+        self.max_concurrency = max_concurrency or int(os.getenv('LLM_MAX_CONCURRENCY', 8))
+        self.endpoint_limits = endpoint_limits if endpoint_limits is not None else \
+            _parse_limits(os.getenv('LLM_ENDPOINT_LIMITS', ''))
+        self.tokens_per_minute = tokens_per_minute or int(os.getenv('LLM_MERCHANT_TOKENS_PER_MINUTE', 20000))
+        self.token_burst = token_burst or int(os.getenv('LLM_MERCHANT_TOKEN_BURST', self.tokens_per_minute))
+        self.max_queue_depth = max_queue_depth or int(os.getenv('LLM_MAX_QUEUE_DEPTH', 64))
+        self.queue_timeout = queue_timeout or float(os.getenv('LLM_QUEUE_TIMEOUT', 30))
+        self.estimated_tokens = estimated_tokens or int(os.getenv('LLM_ESTIMATED_TOKENS', 1000))
+        self.max_buckets = max_buckets or int(os.getenv('LLM_MAX_BUCKETS', 10000))
+
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._active = 0
+        self._active_by_endpoint = defaultdict(int)
+        # Least recently used merchant first
+        self._buckets = OrderedDict()
+
+        self._wait_times = {priority: deque(maxlen=1000) for priority in PRIORITY_NAMES}
+        self._counters = defaultdict(int)
+
+    def _bucket(self, merchant_id: str) -> TokenBucket:
+        bucket = self._buckets.get(merchant_id)
+        if bucket is None:
+            self._evict_buckets()
+            bucket = TokenBucket(self.token_burst, self.tokens_per_minute / 60.0)
+            self._buckets[merchant_id] = bucket
+        else:
+            self._buckets.move_to_end(merchant_id)
+        return bucket
+
+    def _evict_buckets(self):
+        """Drop idle buckets that have refilled, then the least recently used beyond max_buckets"""
+        now = time.monotonic()
+        for merchant_id, bucket in list(self._buckets.items()):
+            # Later buckets were used more recently, so the scan stops at the first busy one
+            if now - bucket.updated_at <= bucket.capacity / bucket.refill_per_second:
+                break
+            # A full bucket is the same as a new one, so forgetting it loses nothing
+            if bucket.available() >= bucket.capacity:
+                del self._buckets[merchant_id]
+                self._counters['buckets_expired'] += 1
+        while len(self._buckets) >= self.max_buckets:
+            self._buckets.popitem(last=False)
+            self._counters['buckets_evicted'] += 1
+
+    def admit(self, merchant_id: str):
+        """Reject up front when the merchant is over budget or the queue is full"""
+        with self._cond:
+            bucket = self._bucket(merchant_id)
+            if bucket.available() < self.estimated_tokens:
+                self._counters['rejected_budget'] += 1
+                raise SchedulerRejected("LLM token budget exceeded",
+                                        bucket.retry_after(self.estimated_tokens))
+            if len(self._waiters) >= self.max_queue_depth:
+                self._counters['rejected_queue_full'] += 1
+                raise SchedulerRejected("LLM queue is full", 1.0)
+            self._counters['admitted'] += 1
+
+    def charge(self, merchant_id: str, tokens: int):
+        """Deduct the tokens a call actually used from the merchant's budget"""
+        with self._cond:
+            self._bucket(merchant_id).consume(tokens)
+
+    def _endpoint_has_capacity(self, endpoint: str) -> bool:
+        limit = self.endpoint_limits.get(endpoint, self.max_concurrency)
+        return self._active_by_endpoint[endpoint] < limit
+
+    def _can_run(self, entry) -> bool:
+        """True when entry is the best waiter that could start right now"""
+        if self._active >= self.max_concurrency:
+            return False
+        for waiter in sorted(self._waiters):
+            if waiter is entry:
+                return self._endpoint_has_capacity(entry[2])
+            # A saturated endpoint must not block other endpoints behind it
+            if self._endpoint_has_capacity(waiter[2]):
+                return False
+        return False
+
+    @contextmanager
+    def slot(self, priority: int, endpoint: str):
+        """Hold one LLM concurrency slot; waiters are served by priority, then FIFO"""
+        started = time.monotonic()
+        entry = (priority, next(self._sequence), endpoint)
+
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while not self._can_run(entry):
+                    remaining = started + self.queue_timeout - time.monotonic()
+                    if remaining <= 0:
+                        self._counters['rejected_timeout'] += 1
+                        raise SchedulerRejected("Timed out waiting for an LLM slot", 1.0)
+                    self._cond.wait(remaining)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                # Leaving the queue (by starting or timing out) can unblock waiters behind this entry
+                self._cond.notify_all()
+
+            self._active += 1
+            self._active_by_endpoint[endpoint] += 1
+            self._wait_times[priority].append(time.monotonic() - started)
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._active_by_endpoint[endpoint] -= 1
+                self._counters['completed'] += 1
+                self._cond.notify_all()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth, concurrency and wait-time percentiles"""
+        with self._cond:
+            wait_times = {}
+            for priority, samples in self._wait_times.items():
+                ordered = sorted(samples)
+                wait_times[PRIORITY_NAMES[priority]] = {
+                    'samples': len(ordered),
+                    'p50_ms': round(_percentile(ordered, 50) * 1000, 2),
+                    'p99_ms': round(_percentile(ordered, 99) * 1000, 2)
+                }
+            return {
+                'queue_depth': len(self._waiters),
+                'queued_by_priority': {
+                    PRIORITY_NAMES[priority]: sum(1 for waiter in self._waiters if waiter[0] == priority)
+                    for priority in PRIORITY_NAMES
+                },
+                'active': self._active,
+                'active_by_endpoint': {key: value for key, value in self._active_by_endpoint.items() if value},
+                'max_concurrency': self.max_concurrency,
+                'merchant_buckets': len(self._buckets),
+                'wait_times': wait_times,
+                'counters': dict(self._counters)
+            }
+
+def _percentile(ordered: list, percentile: float) -> float:
+    """Nearest-rank percentile of sorted samples"""
+    if not ordered:
+        return 0.0
+    rank = max(0, math.ceil(percentile / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Get the process-wide LLM scheduler"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = LLMScheduler()
+    return _scheduler
+
+def _request_merchant_id() -> str:
+    """Merchant the request is billed to: signed session, trusted gateway header, then client address
+
+    Clients choose their own headers and body fields, so X-Merchant-Id is
+    only honoured when LLM_TRUST_MERCHANT_HEADER=1, i.e. an authenticating
+    proxy in front of the app sets it and strips the client's copy.
+    """
+    merchant_id = session.get('merchant_id')
+    if not merchant_id and os.getenv('LLM_TRUST_MERCHANT_HEADER') == '1':
+        merchant_id = request.headers.get('X-Merchant-Id')
+    return merchant_id or f"ip:{request.remote_addr}"
+
+def _too_many_requests(error: SchedulerRejected):
+    """429 response with a Retry-After header"""
+    retry_after = max(1, math.ceil(error.retry_after))
+    response = jsonify({
+        'success': False,
+        'error': str(error),
+        'retry_after': retry_after
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def llm_endpoint(priority: int):
+    """Route decorator applying admission control and a priority to LLM calls"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            scheduler = get_llm_scheduler()
+            merchant_id = _request_merchant_id()
+
+            try:
+                scheduler.admit(merchant_id)
+            except SchedulerRejected as e:
+                return _too_many_requests(e)
+
+            with llm_request_context(priority, request.endpoint, merchant_id) as context:
+                response = view(*args, **kwargs)
+
+            # Services swallow their own errors, so a queue timeout deep in the
+            # call chain is surfaced here instead of as a generic failure
+            if context.rejected is not None:
+                return _too_many_requests(context.rejected)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,364 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from array import array
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Iterable, Iterator, List, Tuple
+from app.services.integration_transfer import CHUNK_BYTES
+
+# Bulk payout file columns (v2.0/Payouts/bulk-payouts.md); header matching ignores case and punctuation
+PAYOUT_COLUMNS = ('clientReferenceId', 'beneficiaryId', 'payeeName', 'accountNumber', 'branchCode', 'vpa',
+                  'email', 'phone', 'amountCurrency', 'amountValue', 'mode', 'dateTime', 'remarks',
+                  'saveBeneficiary', 'validate')
+REQUIRED_COLUMNS = ('clientReferenceId', 'payeeName', 'amountValue', 'mode')
+PAYOUT_MODES = ('UPI', 'IMPS', 'NEFT', 'RTGS')
+# Amounts are in paisa: ₹1 to ₹10 lakh per payout
+MIN_AMOUNT = 100
+MAX_AMOUNT = 100000000
+# Transfer limits per mode from v2.0/Payouts/about-payouts.md, in paisa
+MODE_LIMITS = {
+    'NEFT': (100, 1000000000),
+    'RTGS': (20000000, 1000000000),
+    'IMPS': (100, 50000000),
+    'UPI': (100, 10000000)
+}
+
+_IFSC = re.compile(r'^[A-Z]{4}0[A-Z0-9]{6}$')
+_ACCOUNT_NUMBER = re.compile(r'^\d{9,18}$')
+_VPA = re.compile(r'^[\w.\-]{2,256}@[\w.\-]{2,64}$')
+_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+_PHONE = re.compile(r'^(?:\+?91)?[6-9]\d{9}$')
+_REFERENCE = re.compile(r'^\S{1,64}$')
+_DATE_TIME = re.compile(r'^\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])T([01]\d|2[0-3]):[0-5]\d:[0-5]\dZ$')
+_BOOLEAN = ('true', 'false')
+_HEADER_KEY = re.compile(r'[^a-z0-9]')
+_COLUMN_KEYS = {_HEADER_KEY.sub('', column.lower()): column for column in PAYOUT_COLUMNS}
+
+def validate_payout(record: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(field, error) pairs for one payout, from a bulk file row or a Payout API body"""
+    errors = []
+    fields = {key: str(value).strip() for key, value in record.items() if value is not None}
+    get = lambda key: fields.get(key, '')
+
+    for field in REQUIRED_COLUMNS:
+        if field != 'amountValue' and not get(field):
+            errors.append((field, f"Missing required field: {field}"))
+    reference = get('clientReferenceId')
+    if reference and not _REFERENCE.match(reference):
+        errors.append(('clientReferenceId', "clientReferenceId must be 1-64 characters without spaces"))
+
+    mode = get('mode').upper()
+    if mode and mode not in PAYOUT_MODES:
+        errors.append(('mode', f"Invalid mode {mode}: use one of {', '.join(PAYOUT_MODES)}"))
+
+    # The API nests the amount, the bulk file flattens it
+    amount = record.get('amount') if isinstance(record.get('amount'), dict) else {}
+    value = str(amount.get('value', record.get('amountValue')) or '').strip()
+    currency = str(amount.get('currency', record.get('amountCurrency')) or '').strip().upper()
+    if not value:
+        errors.append(('amountValue', "Missing required field: amountValue"))
+    elif not value.isdigit():
+        errors.append(('amountValue', "Invalid amount format: amountValue is a whole number of paisa"))
+    else:
+        paisa = int(value)
+        low, high = MODE_LIMITS.get(mode, (MIN_AMOUNT, MAX_AMOUNT))
+        low, high = max(low, MIN_AMOUNT), min(high, MAX_AMOUNT)
+        if not low <= paisa <= high:
+            limit = f"{mode} payouts" if mode in MODE_LIMITS else "Payouts"
+            errors.append(('amountValue', f"{limit} must be between {low} and {high} paisa"))
+    if currency and currency != 'INR':
+        errors.append(('amountCurrency', "Payouts are only made in INR"))
+
+    beneficiary_id = get('beneficiaryId')
+    account_number = get('accountNumber')
+    branch_code = get('branchCode').upper()
+    vpa = get('vpa')
+    if mode == 'UPI':
+        if not vpa and not beneficiary_id:
+            errors.append(('vpa', "UPI payouts need a vpa or a beneficiaryId"))
+    elif mode and not beneficiary_id and not (account_number and branch_code):
+        errors.append(('accountNumber', f"{mode} payouts need accountNumber and branchCode, or a beneficiaryId"))
+    if account_number and not _ACCOUNT_NUMBER.match(account_number):
+        errors.append(('accountNumber', "accountNumber must be 9-18 digits"))
+    if branch_code and not _IFSC.match(branch_code):
+        errors.append(('branchCode', f"branchCode {branch_code} is not a valid IFSC (4 letters, 0, 6 letters or digits)"))
+    if vpa and not _VPA.match(vpa):
+        errors.append(('vpa', f"Invalid VPA {vpa}"))
+
+    email = get('email')
+    if email and not _EMAIL.match(email):
+        errors.append(('email', "Invalid email address"))
+    phone = get('phone').replace(' ', '').replace('-', '')
+    if phone and not _PHONE.match(phone):
+        errors.append(('phone', "phone must be a 10-digit Indian mobile number"))
+    scheduled = get('dateTime') or get('scheduledAt')
+    if scheduled and not _DATE_TIME.match(scheduled):
+        errors.append(('dateTime', "dateTime must look like 2024-10-09T05:13:12Z"))
+    for field in ('saveBeneficiary', 'validate'):
+        if get(field) and get(field).lower() not in _BOOLEAN:
+            errors.append((field, f"{field} must be true or false"))
+    return errors
+
+def reference_digest(reference: str) -> int:
+    """Non-zero 64-bit digest of a clientReferenceId"""
+    return int.from_bytes(hashlib.blake2b(reference.encode(), digest_size=8).digest(), 'big') or 1
+
+class _ReferenceSet:
+    """Open-addressing set of 64-bit reference digests with the row each was first seen on
+
+    Two flat arrays take 12 bytes per slot, a fraction of a Python set of
+    strings, so millions of references fit in bounded memory.
+    """
+
+    def __init__(self, capacity: int = 1 << 16):
+        self._digests = array('Q', bytes(8 * capacity))
+        self._rows = array('I', bytes(4 * capacity))
+        self._mask = capacity - 1
+        self.size = 0
+
+    def add(self, digest: int, row: int) -> int:
+        """0 when the digest is new, else the row it was first seen on"""
+        if (self.size + 1) * 2 > len(self._digests):
+            self._grow()
+        digests, mask = self._digests, self._mask
+        slot = digest & mask
+        while digests[slot]:
+            if digests[slot] == digest:
+                return self._rows[slot]
+            slot = (slot + 1) & mask
+        digests[slot] = digest
+        self._rows[slot] = row
+        self.size += 1
+        return 0
+
+    def _grow(self):
+        digests, rows = self._digests, self._rows
+        self.__init__(len(digests) * 2)
+        for digest, row in zip(digests, rows):
+            if digest:
+                self.add(digest, row)
+
+    @property
+    def nbytes(self) -> int:
+        return self._digests.itemsize * len(self._digests) + self._rows.itemsize * len(self._rows)
+
+def _validate_chunk(task: tuple) -> Dict[str, Any]:
+    """Parse and validate one chunk of CSV rows (runs in worker processes)"""
+    columns, first_line, data = task
+    rejected = []
+    digests, rows, amounts = array('Q'), array('I'), array('q')
+    references = []
+    modes = Counter()
+    count = 0
+    reader = csv.reader(io.StringIO(data.decode('utf-8', errors='replace')))
+    start = 0
+    for values in reader:
+        # Rows are numbered by the file line they start on, like a spreadsheet
+        row, start = first_line + start, reader.line_num
+        if not any(value.strip() for value in values):
+            continue
+        count += 1
+        record = {column: values[index] for index, column in columns if index < len(values)}
+        errors = validate_payout(record)
+        reference = record.get('clientReferenceId', '').strip()
+        modes[record.get('mode', '').strip().upper()] += 1
+        if errors:
+            rejected.append({'row': row, 'clientReferenceId': reference,
+                             'errors': [{'field': field, 'error': error} for field, error in errors]})
+        if reference:
+            digests.append(reference_digest(reference))
+            rows.append(row)
+            amounts.append(-1 if errors else int(record['amountValue'].strip()))
+            references.append(reference)
+    return {'rows': count, 'rejected': rejected, 'digests': digests, 'row_numbers': rows,
+            'amounts': amounts, 'references': references, 'modes': dict(modes)}
+
+def _record_chunks(lines: Iterable[bytes], chunk_rows: int) -> Iterator[bytes]:
+    """Raw CSV chunks of about chunk_rows lines, never cut inside a quoted multi-line field"""
+    buffer = []
+    quotes = 0
+    for line in lines:
+        buffer.append(line)
+        quotes += line.count(b'"')
+        if len(buffer) >= chunk_rows and quotes % 2 == 0:
+            yield b''.join(buffer)
+            buffer = []
+            quotes = 0
+    if buffer:
+        yield b''.join(buffer)
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+def get_payout_pool(workers: int) -> ProcessPoolExecutor:
+    """Get the process-wide validation pool, shared by every upload so they queue for the same CPUs"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+def _discard_payout_pool(pool: ProcessPoolExecutor):
+    """Drop a pool whose worker died, so the next upload starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+
+class BulkPayoutValidator:
+    """Validates bulk payout CSV files as a stream
+
+    The header is checked first, then raw chunks of lines are parsed and
+    validated in the shared process pool (only once a file runs past one
+    chunk) with a bounded number in flight. Results come back in file order,
+    duplicate clientReferenceIds are caught in a compact digest set, and
+    rejected rows are yielded as each chunk finishes, so memory stays flat
+    for any file size. Reading stops once max_bytes of CSV (after gzip)
+    have been read.
+    """
+
+    def __init__(self, workers: int = None, chunk_rows: int = None, max_bytes: int = None):
+        self.workers = workers or int(os.getenv('PAYOUT_WORKERS', os.cpu_count() or 2))
+        self.chunk_rows = chunk_rows or int(os.getenv('PAYOUT_CHUNK_ROWS', 20000))
+        self.max_bytes = max_bytes
+        self.summary: Dict[str, Any] = {}
+
+    @staticmethod
+    def read_header(line: bytes) -> List[Tuple[int, str]]:
+        """(index, column) for each known column; raises ValueError when a required one is missing"""
+        header = next(csv.reader([line.decode('utf-8-sig', errors='replace')]), [])
+        columns = []
+        for index, name in enumerate(header):
+            column = _COLUMN_KEYS.get(_HEADER_KEY.sub('', name.lower()))
+            if column:
+                columns.append((index, column))
+        missing = [column for column in REQUIRED_COLUMNS if column not in {name for _, name in columns}]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+        return columns
+
+    def validate(self, lines: Iterable[bytes]) -> Iterator[Dict[str, Any]]:
+        """Rejected rows in file order; self.summary is filled in once the iterator is exhausted
+
+        The header is checked straight away, so a file without the required
+        columns raises ValueError before any row is read.
+        """
+        lines = iter(lines)
+        columns = self.read_header(next(lines, b''))
+        return self._validate(lines, columns)
+
+    def report(self, lines: Iterable[bytes]) -> Iterator[str]:
+        """NDJSON text chunks: one line per rejected row, then a {"summary": ...} line"""
+        rejected = self.validate(lines)
+
+        def chunks():
+            buffer = []
+            size = 0
+            for entry in rejected:
+                line = json.dumps(entry, ensure_ascii=False) + '\n'
+                buffer.append(line)
+                size += len(line)
+                if size >= CHUNK_BYTES:
+                    yield ''.join(buffer)
+                    buffer = []
+                    size = 0
+            buffer.append(json.dumps({'summary': self.summary}) + '\n')
+            yield ''.join(buffer)
+        return chunks()
+
+    def _validate(self, lines: Iterator[bytes], columns: List[Tuple[int, str]]) -> Iterator[Dict[str, Any]]:
+        references = _ReferenceSet()
+        counts = Counter({'rows': 0, 'rejected': 0, 'duplicates': 0})
+        fields = Counter()
+        modes = Counter()
+        started = time.perf_counter()
+        amount = 0
+
+        def collect(outcome):
+            nonlocal amount
+            counts['rows'] += outcome['rows']
+            modes.update(outcome['modes'])
+            rejected = {entry['row']: entry for entry in outcome['rejected']}
+            for digest, row, row_amount, reference in zip(outcome['digests'], outcome['row_numbers'],
+                                                          outcome['amounts'], outcome['references']):
+                first = references.add(digest, row)
+                if not first:
+                    amount += max(row_amount, 0)
+                    continue
+                counts['duplicates'] += 1
+                entry = rejected.setdefault(row, {'row': row, 'clientReferenceId': reference, 'errors': []})
+                entry['errors'].append({'field': 'clientReferenceId',
+                                        'error': f"Duplicate clientReferenceId, first used on row {first}"})
+            for row in sorted(rejected):
+                entry = rejected[row]
+                counts['rejected'] += 1
+                fields.update(error['field'] for error in entry['errors'])
+                yield entry
+
+        executor = None
+        held = None
+        pending = deque()
+        next_line = 2
+        read = 0
+        truncated = False
+        try:
+            for data in _record_chunks(lines, self.chunk_rows):
+                read += len(data)
+                if self.max_bytes and read > self.max_bytes:
+                    truncated = True
+                    break
+                task = (columns, next_line, data)
+                next_line += data.count(b'\n') + (not data.endswith(b'\n'))
+                if executor is None:
+                    if held is None or self.workers <= 1:
+                        if held is not None:
+                            yield from collect(_validate_chunk(held))
+                        held = task
+                        continue
+                    # A second chunk shows the file is worth a pool
+                    executor = get_payout_pool(self.workers)
+                    pending.append(executor.submit(_validate_chunk, held))
+                    held = None
+                pending.append(executor.submit(_validate_chunk, task))
+                # Bounded number of chunks in flight keeps memory flat
+                if len(pending) >= self.workers * 2:
+                    yield from collect(pending.popleft().result())
+            if held is not None:
+                yield from collect(_validate_chunk(held))
+            while pending:
+                yield from collect(pending.popleft().result())
+        except BrokenProcessPool:
+            _discard_payout_pool(executor)
+            raise
+        finally:
+            # The pool outlives this file; only its queued chunks are dropped
+            for future in pending:
+                future.cancel()
+
+        elapsed = time.perf_counter() - started
+        self.summary = {
+            'rows': counts['rows'],
+            'valid': counts['rows'] - counts['rejected'],
+            'rejected': counts['rejected'],
+            'duplicates': counts['duplicates'],
+            'errors_by_field': dict(fields.most_common()),
+            'modes': {mode: count for mode, count in modes.items() if mode},
+            'valid_amount': amount,
+            'elapsed_s': round(elapsed, 2),
+            'rows_per_s': round(counts['rows'] / elapsed) if elapsed else None,
+            'reference_set_bytes': references.nbytes
+        }
+        if truncated:
+            self.summary['error'] = (f"File is larger than {self.max_bytes} bytes; "
+                                     f"validation stopped before row {next_line}")
@@ -1,17 +1,27 @@
 import requests
 import json
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List
 import hashlib
 import hmac
 import base64
+from app.utils.singleflight import coalesce
+from app.services.error_catalog import get_error_catalog
+from app.services.payouts import validate_payout
 
 class PineLabsService:
     def __init__(self):
         self.base_url = os.getenv('PINE_LABS_BASE_URL', 'https://api-sandbox.pinelabs.com')
         self.merchant_id = os.getenv('PINE_LABS_MERCHANT_ID')
         self.secret_key = os.getenv('PINE_LABS_SECRET_KEY')
+        self.access_token = os.getenv('PINE_LABS_ACCESS_TOKEN')
+        self.fetch_order_path = os.getenv('PINE_LABS_FETCH_ORDER_PATH', '/api/pay/v1/orders/reference/{order_id}')
+        self.timeout = float(os.getenv('PINE_LABS_TIMEOUT', 10))
+        self.webhook_secret = os.getenv('PINE_LABS_WEBHOOK_SECRET', self.secret_key)
+        # Accept unsigned webhooks only when explicitly asked to (local sandbox without a secret)
+        self.webhook_insecure = os.getenv('PINE_LABS_WEBHOOK_INSECURE') == '1'
     
+    @coalesce('pine_labs_gateway')
     def validate_payload(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Validate API payload structure and required fields"""
         errors = []
@@ -38,6 +48,10 @@ class PineLabsService:
                 if field not in payload:
                     errors.append(f"Missing required field: {field}")
         
+        elif payload.get('type') == 'payout':
+            # Same rules as each row of a bulk payout file
+            errors.extend(error for _, error in validate_payout(payload))
+        
         return {
             'valid': len(errors) == 0,
             'errors': errors,
@@ -54,8 +68,23 @@ class PineLabsService:
             if any('merchant_order_id' in error for error in errors):
                 suggestions.append("Use a unique order ID for each transaction")
         
+        elif integration_type == 'payout':
+            if any('amountValue' in error for error in errors):
+                suggestions.append("Payout amounts are whole paisa (e.g., 10000 for ₹100.00)")
+            if any('IFSC' in error for error in errors):
+                suggestions.append("IFSC codes are 11 characters: bank code, 0, then the branch code (e.g., HDFC0001234)")
+            if any('payouts must be between' in error for error in errors):
+                suggestions.append("RTGS starts at ₹2 lakh; use IMPS or NEFT below that and UPI up to ₹1 lakh")
+        
+        catalog = get_error_catalog()
+        for error in errors:
+            known = catalog.explain(error)
+            if known and known.get('fix') and known['fix'] not in suggestions:
+                suggestions.append(known['fix'])
+        
         return suggestions
     
+    @coalesce('pine_labs_gateway')
     def test_integration(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Test integration with Pine Labs API"""
         try:
@@ -123,6 +152,32 @@ class PineLabsService:
             'timestamp': '2024-01-01T10:00:00Z'
         }
     
+    def fetch_orders(self, order_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch Order for several merchant order references over one keep-alive session"""
+        headers = {'Accept': 'application/json'}
+        if self.access_token:
+            headers['Authorization'] = f'Bearer {self.access_token}'
+        
+        results = {}
+        with requests.Session() as session:
+            session.headers.update(headers)
+            for order_id in order_ids:
+                url = self.base_url.rstrip('/') + self.fetch_order_path.format(order_id=order_id)
+                try:
+                    response = session.get(url, timeout=self.timeout)
+                    if response.status_code == 404:
+                        results[order_id] = {'success': False, 'error': 'Order not found', 'status': None}
+                        continue
+                    response.raise_for_status()
+                    data = response.json()
+                    # The order may be wrapped in a "data" envelope
+                    order = data.get('data', data) if isinstance(data, dict) else {}
+                    results[order_id] = {'success': True, 'status': order.get('status'), 'order': order}
+                except (requests.RequestException, ValueError) as e:
+                    results[order_id] = {'success': False, 'error': str(e), 'status': None}
+        
+        return results
+    
     def simulate_response(self, scenario: str) -> Dict[str, Any]:
         """Simulate different API response scenarios for testing"""
         scenarios = {
@@ -163,4 +218,18 @@ class PineLabsService:
             hashlib.sha256
         ).hexdigest()
         
-        return signature 
\ No newline at end of file
+        return signature
+    
+    def verify_webhook_signature(self, body: bytes, signature: str) -> bool:
+        """Check a webhook's X-verify header: HMAC-SHA256 of the Base64 body with the hex secret"""
+        if not self.webhook_secret:
+            # Fail closed: without a secret anyone could post a webhook
+            return self.webhook_insecure
+        if not signature:
+            return False
+        try:
+            key = bytes.fromhex(self.webhook_secret)
+        except ValueError:
+            key = self.webhook_secret.encode()
+        expected = hmac.new(key, base64.b64encode(body), hashlib.sha256).hexdigest().upper()
+        return hmac.compare_digest(expected, signature.strip().upper())
@@ -1,16 +1,33 @@
-import openai
-import os
 import json
-import re
-from typing import Dict, Any, List, Optional, Tuple
-from datetime import datetime
+import inspect
+from typing import Dict, Any, Callable, List, Optional, Tuple
 from app.services.pine_labs import PineLabsService
+from app.services.conversation_memory import ConversationMemory
+from app.services.llm_client import get_llm_client
+from app.services.answer_cache import get_answer_cache
+from app.services.error_catalog import get_error_catalog, describe
+from app.services.code_generator import get_code_generator
+from app.services.emi_calculator import get_emi_calculator
+from app.utils.json_repair import repair_json
+from app.services.llm_scheduler import slot_granted
+from app.utils.singleflight import coalesce
+from app.utils.code_context import minimize_code
 from app.models import Integration, db
 import colorama
 from colorama import Fore, Style
 
 colorama.init()
 
+# Python types accepted for each JSON schema type in Action.parameters
+SCHEMA_TYPES = {
+    "string": str,
+    "object": dict,
+    "array": list,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool
+}
+
 class Action:
     """Represents an action the ReAct agent can take"""
     
@@ -22,6 +39,60 @@ class Action:
     def execute(self, **kwargs) -> Dict[str, Any]:
         """Execute the action with given parameters"""
         raise NotImplementedError("Subclasses must implement execute method")
+    
+    def required_parameters(self) -> List[str]:
+        """Parameters execute() has no default for"""
+        signature = inspect.signature(self.execute)
+        return [
+            name for name, param in signature.parameters.items()
+            if name in self.parameters and param.default is inspect.Parameter.empty
+        ]
+    
+    def to_tool(self) -> Dict[str, Any]:
+        """Describe the action as an OpenAI function-calling tool"""
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": {
+                    "type": "object",
+                    "properties": self.parameters,
+                    "required": self.required_parameters()
+                }
+            }
+        }
+    
+    def validate_parameters(self, parameters: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        """Check parameters against the schema, returning (cleaned, errors)"""
+        cleaned = {}
+        errors = []
+        
+        for name, schema in self.parameters.items():
+            if name not in parameters or parameters[name] is None:
+                continue
+            value = parameters[name]
+            expected = schema.get("type")
+            
+            # Models sometimes send nested objects as JSON strings
+            if expected in ("object", "array") and isinstance(value, str):
+                try:
+                    value = repair_json(value)
+                except ValueError:
+                    pass
+            elif expected == "string" and isinstance(value, (int, float)) and not isinstance(value, bool):
+                value = str(value)
+            
+            if expected in SCHEMA_TYPES and not isinstance(value, SCHEMA_TYPES[expected]):
+                errors.append(f"Parameter '{name}' must be of type {expected}")
+                continue
+            cleaned[name] = value
+        
+        for name in self.required_parameters():
+            if name not in cleaned and not any(name in error for error in errors):
+                errors.append(f"Missing required parameter: {name}")
+        
+        return cleaned, errors
 
 class GenerateCodeAction(Action):
     """Action to generate integration code"""
@@ -36,8 +107,19 @@ class GenerateCodeAction(Action):
             }
         )
     
+    @coalesce('agent_actions', share=slot_granted)
     def execute(self, language: str, integration_type: str) -> Dict[str, Any]:
-        """Generate code using OpenAI"""
+        """Generate code from the API collection templates, or with OpenAI for custom requests"""
+        code = get_code_generator().render(language, integration_type)
+        if code is not None:
+            return {
+                "success": True,
+                "code": code,
+                "language": language,
+                "integration_type": integration_type,
+                "source": "template"
+            }
+        
         try:
             prompts = {
                 'python': {
@@ -89,20 +171,20 @@ class GenerateCodeAction(Action):
                 {"role": "user", "content": prompt}
             ]
             
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
+            response = get_llm_client().chat(
+                messages,
                 max_tokens=1000,
                 temperature=0.3
             )
             
-            code = response.choices[0].message.content.strip()
+            code = response.content.strip()
             
             return {
                 "success": True,
                 "code": code,
                 "language": language,
-                "integration_type": integration_type
+                "integration_type": integration_type,
+                "source": "llm"
             }
             
         except Exception as e:
@@ -123,6 +205,7 @@ class ValidatePayloadAction(Action):
             }
         )
     
+    @coalesce('agent_actions')
     def execute(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Validate payload using PineLabsService"""
         pine_service = PineLabsService()
@@ -148,9 +231,9 @@ class TestIntegrationAction(Action):
             # Create integration record
             integration = Integration(
                 merchant_id=merchant_id,
-                integration_type=payload.get('type', 'payment'),
-                request_payload=json.dumps(payload)
+                integration_type=payload.get('type', 'payment')
             )
+            integration.set_request_payload(payload)
             db.session.add(integration)
             db.session.commit()
             
@@ -160,7 +243,7 @@ class TestIntegrationAction(Action):
             
             # Update integration record
             integration.status = 'success' if result.get('success') else 'failed'
-            integration.response_data = json.dumps(result)
+            integration.set_response_data(result)
             if not result.get('success'):
                 integration.error_message = result.get('error', 'Unknown error')
             db.session.commit()
@@ -173,6 +256,24 @@ class TestIntegrationAction(Action):
                 "error": str(e)
             }
 
+class EmiPlansAction(Action):
+    """Action to calculate EMI plans for a cart amount"""
+    
+    def __init__(self):
+        super().__init__(
+            "emi_plans",
+            "Calculate EMI plans (monthly instalment, interest and discount) for a cart amount across card issuers and tenures",
+            {
+                "amount": {"type": "integer", "description": "Cart amount in paisa"},
+                "issuers": {"type": "array", "items": {"type": "string"}, "description": "Issuer names, e.g. HDFC; all when omitted"},
+                "card_type": {"type": "string", "enum": ["credit", "debit"], "description": "Only credit or debit card EMI"}
+            }
+        )
+    
+    def execute(self, amount: int, issuers: List[str] = None, card_type: str = None) -> Dict[str, Any]:
+        """Quote plans from the local EMI tables"""
+        return get_emi_calculator().plans(amount, issuers, card_type)
+
 class FixErrorAction(Action):
     """Action to fix integration errors"""
     
@@ -187,18 +288,33 @@ class FixErrorAction(Action):
             }
         )
     
+    @coalesce('agent_actions', share=slot_granted)
     def execute(self, error_message: str, code: str, language: str) -> Dict[str, Any]:
         """Fix errors using AI"""
+        known = get_error_catalog().explain(error_message)
+        if known and not known['fix_in_request']:
+            # Declines and outages are not fixed in code: answer from the docs without the LLM
+            return {
+                "success": True,
+                "fixed_code": code,
+                "language": language,
+                "known_error": known,
+                "explanation": describe(known)
+            }
+        
         try:
+            documented = f"\n            Pine Labs documents this error as: {describe(known)}\n" if known else ""
+            # Large inputs are cut down to the code around the error and spliced back afterwards
+            context = minimize_code(code, error_message, language)
             prompt = f"""
             I have this {language} code that's causing an error with Pine Labs API integration:
             
             Error: {error_message}
-            
+            {documented}
             Code:
-            {code}
+            {context.prompt_block()}
             
-            Please fix the error and provide the corrected code with explanations.
+            {context.instructions()}
             Focus on Pine Labs API best practices and common integration mistakes.
             """
             
@@ -207,19 +323,22 @@ class FixErrorAction(Action):
                 {"role": "user", "content": prompt}
             ]
             
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
+            response = get_llm_client().chat(
+                messages,
                 max_tokens=1000,
                 temperature=0.2
             )
             
-            fixed_code = response.choices[0].message.content.strip()
+            reply = response.content.strip()
+            fixed_code, explanation = context.splice(reply)
             
             return {
                 "success": True,
-                "fixed_code": fixed_code,
-                "language": language
+                "fixed_code": fixed_code if fixed_code is not None else reply,
+                "language": language,
+                "known_error": known,
+                "explanation": explanation if fixed_code is not None else None,
+                "context": context.stats()
             }
             
         except Exception as e:
@@ -232,94 +351,95 @@ class ReActAgent:
     """ReAct (Reasoning and Acting) Agent for Pine Labs Integration"""
     
     def __init__(self):
-        openai.api_key = os.getenv('OPENAI_API_KEY')
-        self.model = "gpt-3.5-turbo"
+        self.llm = get_llm_client()
+        self.model = self.llm.model
         
         # Define available actions
         self.actions = {
             "generate_code": GenerateCodeAction(),
             "validate_payload": ValidatePayloadAction(),
             "test_integration": TestIntegrationAction(),
-            "fix_error": FixErrorAction()
+            "fix_error": FixErrorAction(),
+            "emi_plans": EmiPlansAction()
         }
         
-        # Conversation history
-        self.conversation_history = []
+        # Bounded conversation memory
+        self.memory = ConversationMemory()
         
         # Current task state
         self.current_task = None
         self.task_progress = []
     
-    def reason_and_act(self, user_input: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+    def reason_and_act(self, user_input: str, context: Dict[str, Any] = None,
+                       on_step: Callable[[str], None] = None) -> Dict[str, Any]:
         """Main ReAct loop: Reason about user input and take appropriate action"""
+        step = on_step or (lambda name: None)
         
         # Add user input to conversation
-        self.conversation_history.append({
-            "role": "user",
-            "content": user_input,
-            "timestamp": datetime.now().isoformat()
-        })
+        self.memory.add("user", user_input)
         
-        # Step 1: REASON - Analyze the user input and decide what to do
-        reasoning_result = self._reason(user_input, context)
+        # Only a session's opening question, without context, may share answers across sessions:
+        # later replies build on this conversation's memory
+        first_turn = len(self.memory.turns) == 1 and not self.memory.summary_points
+        answer_cache = get_answer_cache() if first_turn and not context else None
+        cached_answer = answer_cache.lookup(user_input, 'react') if answer_cache else None
         
-        # Step 2: ACT - Execute the chosen action
-        if reasoning_result.get("action_needed"):
-            action_result = self._act(reasoning_result)
-            
-            # Step 3: OBSERVE - Analyze the action result
-            observation = self._observe(action_result, reasoning_result)
-            
-            # Step 4: RESPOND - Generate final response
-            response = self._respond(observation, reasoning_result)
-        else:
-            # No action needed, just respond
+        if cached_answer is not None:
             response = {
                 "success": True,
-                "response": reasoning_result.get("response", "I understand. How can I help you with Pine Labs integration?"),
-                "reasoning": reasoning_result.get("reasoning", ""),
-                "action_taken": None
+                "response": cached_answer,
+                "reasoning": "Answered from a previous reply to a similar question",
+                "action_taken": None,
+                "cached": True
             }
+        else:
+            # Step 1: REASON - Analyze the user input and decide what to do
+            step('reasoning')
+            reasoning_result = self._reason(user_input, context)
+            
+            # Step 2: ACT - Execute the chosen action
+            if reasoning_result.get("action_needed"):
+                step('acting')
+                action_result = self._act(reasoning_result, context)
+                
+                # Step 3: OBSERVE - Analyze the action result
+                step('observing')
+                observation = self._observe(action_result, reasoning_result)
+                
+                # Step 4: RESPOND - Generate final response
+                step('responding')
+                response = self._respond(observation, reasoning_result)
+            else:
+                # No action needed, just respond
+                response = {
+                    "success": True,
+                    "response": reasoning_result.get("response", "I understand. How can I help you with Pine Labs integration?"),
+                    "reasoning": reasoning_result.get("reasoning", ""),
+                    "action_taken": None
+                }
+                if answer_cache is not None and not response["reasoning"].startswith("Error in reasoning"):
+                    answer_cache.store(user_input, response["response"], 'react')
         
-        # Add agent response to conversation
-        self.conversation_history.append({
-            "role": "assistant",
-            "content": response.get("response", ""),
-            "timestamp": datetime.now().isoformat(),
-            "reasoning": response.get("reasoning", ""),
-            "action_taken": response.get("action_taken")
-        })
+        # Add agent response to conversation (large results are stored by reference)
+        self.memory.add(
+            "assistant",
+            response.get("response", ""),
+            reasoning=response.get("reasoning", ""),
+            action_taken=response.get("action_taken"),
+            result=response.get("result")
+        )
         
         return response
     
     def _reason(self, user_input: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Reason about what action to take based on user input"""
         
-        # Create reasoning prompt
+        # Create reasoning prompt; the actions themselves are sent as tools
         system_prompt = """
         You are a ReAct agent specialized in Pine Labs payment API integration.
-        Your task is to analyze user requests and decide what actions to take.
-        
-        Available actions:
-        1. generate_code: Generate integration code in Python, JavaScript, or Java
-        2. validate_payload: Validate API payload structure and required fields
-        3. test_integration: Test Pine Labs API integration with provided payload
-        4. fix_error: Fix integration errors and provide corrected code
-        
-        For each user request, you should:
-        1. Analyze what the user is asking for
-        2. Determine if an action is needed
-        3. If yes, specify which action and its parameters
-        4. Provide reasoning for your decision
-        
-        Respond in this exact JSON format:
-        {
-            "reasoning": "Your step-by-step reasoning",
-            "action_needed": true/false,
-            "action": "action_name",
-            "parameters": {"param1": "value1", "param2": "value2"},
-            "response": "What you would say to the user if no action is needed"
-        }
+        Analyze each user request. When one of the provided tools fits, call it
+        with parameters taken from the request or context. Otherwise answer the
+        user directly and concisely.
         """
         
         # Build context string
@@ -327,37 +447,53 @@ class ReActAgent:
         if context:
             context_str = f"\nCurrent context: {json.dumps(context)}"
         
-        if self.conversation_history:
-            recent_history = self.conversation_history[-3:]  # Last 3 messages
-            context_str += f"\nRecent conversation: {json.dumps(recent_history)}"
+        if self.memory.turns:
+            # Summary plus last 3 messages, kept within the memory token budget
+            context_str += f"\nRecent conversation: {json.dumps(self.memory.prompt_context(), default=str)}"
         
-        user_prompt = f"""
-        User request: {user_input}{context_str}
-        
-        Analyze this request and decide what action to take.
-        """
+        user_prompt = f"User request: {user_input}{context_str}"
         
         try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
+            response = self.llm.chat(
+                [
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
                 max_tokens=800,
-                temperature=0.3
+                temperature=0.3,
+                tools=[action.to_tool() for action in self.actions.values()],
+                tool_choice="auto"
             )
             
-            # Parse JSON response
-            result_text = response.choices[0].message.content.strip()
+            # Structured tool call: parameters arrive as a JSON arguments string
+            if response.tool_calls:
+                call = response.tool_calls[0]
+                try:
+                    parameters = repair_json(call.function.arguments or "{}")
+                except ValueError:
+                    parameters = {}
+                return {
+                    "reasoning": response.content or f"Selected {call.function.name} for this request",
+                    "action_needed": True,
+                    "action": call.function.name,
+                    "parameters": parameters if isinstance(parameters, dict) else {}
+                }
             
-            # Try to extract JSON from response
-            json_match = re.search(r'\{.*\}', result_text, re.DOTALL)
-            if json_match:
-                result_text = json_match.group()
+            result_text = response.content.strip()
             
-            result = json.loads(result_text)
-            return result
+            # Some models still answer in the legacy JSON decision format
+            try:
+                result = repair_json(result_text)
+                if isinstance(result, dict) and ("action_needed" in result or "response" in result):
+                    return result
+            except ValueError:
+                pass
+            
+            return {
+                "reasoning": "Answered directly without an action",
+                "action_needed": False,
+                "response": result_text
+            }
             
         except Exception as e:
             print(f"❌ Reasoning error: {str(e)}")
@@ -367,11 +503,11 @@ class ReActAgent:
                 "response": "I'm having trouble understanding your request. Could you please rephrase it?"
             }
     
-    def _act(self, reasoning_result: Dict[str, Any]) -> Dict[str, Any]:
+    def _act(self, reasoning_result: Dict[str, Any], context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Execute the chosen action"""
         
         action_name = reasoning_result.get("action")
-        parameters = reasoning_result.get("parameters", {})
+        parameters = dict(reasoning_result.get("parameters") or {})
         
         if action_name not in self.actions:
             return {
@@ -382,6 +518,19 @@ class ReActAgent:
         
         action = self.actions[action_name]
         
+        # Fill parameters the model left out from the request context
+        for name in action.parameters:
+            if name not in parameters and context and name in context:
+                parameters[name] = context[name]
+        
+        parameters, errors = action.validate_parameters(parameters)
+        if errors:
+            return {
+                "success": False,
+                "action": action_name,
+                "error": f"Invalid parameters: {'; '.join(errors)}"
+            }
+        
         try:
             print(f"🔧 Executing action: {action_name}")
             result = action.execute(**parameters)
@@ -404,8 +553,9 @@ class ReActAgent:
         """Observe and analyze the action result"""
         
         if not action_result.get("success"):
+            error = action_result.get('error', 'Unknown error')
             return {
-                "observation": f"Action failed: {action_result.get('error', 'Unknown error')}",
+                "observation": f"Action failed: {error}{self._explain_error(action_result)}",
                 "success": False,
                 "needs_followup": True
             }
@@ -427,10 +577,23 @@ class ReActAgent:
             if result.get("success"):
                 observation = f"Integration test successful - {result.get('transaction_id', 'N/A')}"
             else:
-                observation = f"Integration test failed: {result.get('error', 'Unknown error')}"
+                observation = f"Integration test failed: {result.get('error', 'Unknown error')}{self._explain_error(result)}"
                 
         elif action_name == "fix_error":
-            observation = "Error fixed and corrected code generated"
+            if result.get("known_error") and not result["known_error"]["fix_in_request"]:
+                observation = f"Documented Pine Labs error, no code change needed: {result['explanation']}"
+            else:
+                observation = "Error fixed and corrected code generated"
+            
+        elif action_name == "emi_plans":
+            lowest = result.get("lowest_monthly_installment")
+            if lowest:
+                observation = (f"{result['plans']} EMI plans for ₹{result['amount'] / 100:,.2f} "
+                               f"({result['no_cost_plans']} no cost), lowest instalment "
+                               f"₹{lowest['monthly_installment'] / 100:,.2f} with {lowest['issuer_name']} "
+                               f"over {lowest['tenure_in_month']} months")
+            else:
+                observation = "No EMI plans available for this amount and issuers"
             
         else:
             observation = f"Action {action_name} completed successfully"
@@ -442,6 +605,11 @@ class ReActAgent:
             "needs_followup": False
         }
     
+    def _explain_error(self, result: Dict[str, Any]) -> str:
+        """Documented meaning and next steps of a known gateway error, for observations"""
+        known = get_error_catalog().explain(result)
+        return f" ({describe(known)})" if known else ""
+    
     def _respond(self, observation: Dict[str, Any], reasoning_result: Dict[str, Any]) -> Dict[str, Any]:
         """Generate final response to user"""
         
@@ -466,7 +634,14 @@ class ReActAgent:
                     response_text = "❌ Integration test failed. Let me help you troubleshoot this."
                     
             elif action_name == "fix_error":
-                response_text = "🔧 I've fixed the error in your code. Here's the corrected version:"
+                known = observation.get("result", {}).get("known_error")
+                if known and not known["fix_in_request"]:
+                    response_text = f"🔎 This is a documented Pine Labs error, not a bug in your code. {describe(known)}"
+                else:
+                    response_text = "🔧 I've fixed the error in your code. Here's the corrected version:"
+                
+            elif action_name == "emi_plans":
+                response_text = f"💳 {observation.get('observation')}. Here are the plans by issuer:"
                 
             else:
                 response_text = "✅ Task completed successfully!"
@@ -483,12 +658,21 @@ class ReActAgent:
             "result": observation.get("result", {})
         }
     
+    @property
+    def conversation_history(self) -> List[Dict[str, Any]]:
+        """Retained conversation turns"""
+        return self.memory.history()
+    
     def get_conversation_history(self) -> List[Dict[str, Any]]:
         """Get the conversation history"""
-        return self.conversation_history
+        return self.memory.history()
+    
+    def get_artifact(self, ref: str) -> Optional[str]:
+        """Get the full content behind an artifact reference in the history"""
+        return self.memory.get_artifact(ref)
     
     def clear_conversation(self):
         """Clear conversation history"""
-        self.conversation_history = []
+        self.memory.clear()
         self.current_task = None
         self.task_progress = [] 
\ No newline at end of file
@@ -0,0 +1,251 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import zlib
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Any, Iterator, List, Optional
+from app.models import Integration, db
+from app.utils.payload_storage import decode_payload
+
+RESULT_CLASSES = ('matched', 'amount_mismatch', 'status_mismatch', 'missing')
+REPORT_FIELDS = ['merchant_order_id', 'result', 'file_amount', 'recorded_amount',
+                 'file_status', 'recorded_status', 'integration_id']
+
+# Merchant and gateway status vocabularies mapped onto Integration.status
+STATUS_ALIASES = {
+    'success': 'success', 'successful': 'success', 'succeeded': 'success', 'paid': 'success',
+    'captured': 'success', 'processed': 'success', 'completed': 'success', 'settled': 'success',
+    'failed': 'failed', 'failure': 'failed', 'declined': 'failed', 'rejected': 'failed',
+    'cancelled': 'failed', 'canceled': 'failed',
+    'pending': 'pending', 'created': 'pending', 'initiated': 'pending', 'authorized': 'pending',
+    'processing': 'pending'
+}
+ORDER_KEYS = ('merchant_order_id', 'merchant_order_reference', 'order_id')
+AMOUNT_KEYS = ('amount', 'order_amount')
+
+def normalize_status(value: Any) -> Optional[str]:
+    """Map a status string onto success/failed/pending"""
+    if value is None or value == '':
+        return None
+    text = str(value).strip().lower()
+    return STATUS_ALIASES.get(text, text)
+
+def normalize_amount(value: Any, scale: int = 1) -> Optional[int]:
+    """Amount in paisa; scale is 100 when the value is in rupees"""
+    if isinstance(value, dict):
+        # Pine Labs style {"value": 10000, "currency": "INR"}
+        value = value.get('value')
+    if value is None or value == '':
+        return None
+    try:
+        return int((Decimal(str(value).replace(',', '').strip()) * scale).to_integral_value())
+    except (InvalidOperation, ValueError):
+        return None
+
+def _first(data: Dict[str, Any], keys: tuple) -> Any:
+    for key in keys:
+        if data.get(key) not in (None, ''):
+            return data[key]
+    return None
+
+def _partition_of(order_id: str, partitions: int) -> int:
+    """Stable partition number, the same in every process"""
+    return zlib.crc32(order_id.encode('utf-8')) % partitions
+
+def _base_name(path: str) -> str:
+    """File name without a trailing .gz"""
+    return path[:-3] if path.endswith('.gz') else path
+
+def open_text(path: str, mode: str = 'r'):
+    """Open a text file, transparently gzipped when the name ends in .gz"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8', newline='')
+    return open(path, mode, encoding='utf-8', newline='')
+
+def read_order_file(path: str, order_column: str = None, amount_column: str = None,
+                    status_column: str = None) -> Iterator[Dict[str, Any]]:
+    """Stream rows of a merchant CSV or NDJSON order export"""
+    order_keys = (order_column,) if order_column else ORDER_KEYS
+    amount_keys = (amount_column,) if amount_column else AMOUNT_KEYS
+    status_keys = (status_column,) if status_column else ('status', 'order_status', 'payment_status')
+    is_csv = _base_name(path).endswith('.csv')
+
+    with open_text(path) as f:
+        rows = csv.DictReader(f) if is_csv else (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            yield {
+                'merchant_order_id': _first(row, order_keys),
+                'amount': _first(row, amount_keys),
+                'status': _first(row, status_keys)
+            }
+
+def _decode_records(rows: List[tuple]) -> List[list]:
+    """Extract [order id, amount, status, id] from raw Integration rows (runs in worker processes)"""
+    records = []
+    for row_id, status, stored, codec in rows:
+        try:
+            payload = decode_payload(stored, codec)
+        except Exception:
+            continue
+        if not isinstance(payload, dict):
+            continue
+        order_id = _first(payload, ORDER_KEYS)
+        if order_id is None:
+            continue
+        records.append([str(order_id), normalize_amount(_first(payload, AMOUNT_KEYS)), status, row_id])
+    return records
+
+def _join_partition(task: tuple) -> Dict[str, Any]:
+    """Hash-join one partition pair and write its slice of the report (runs in worker processes)"""
+    orders_path, records_path, result_path = task
+
+    # Build side: the recorded integrations of this partition, latest attempt per order
+    recorded = {}
+    if os.path.exists(records_path):
+        with open(records_path, encoding='utf-8') as f:
+            for line in f:
+                order_id, amount, status, row_id = json.loads(line)
+                recorded[order_id] = (amount, status, row_id)
+
+    counts = Counter()
+    seen = set()
+    with open(result_path, 'w', encoding='utf-8') as out:
+        if os.path.exists(orders_path):
+            with open(orders_path, encoding='utf-8') as f:
+                for line in f:
+                    order_id, amount, status = json.loads(line)
+                    match = recorded.get(order_id)
+                    if match is None:
+                        result, match = 'missing', (None, None, None)
+                    elif amount is not None and match[0] is not None and amount != match[0]:
+                        result = 'amount_mismatch'
+                    elif status is not None and match[1] is not None and status != match[1]:
+                        result = 'status_mismatch'
+                    else:
+                        result = 'matched'
+                    seen.add(order_id)
+                    counts[result] += 1
+                    out.write(json.dumps([order_id, result, amount, match[0], status, match[1], match[2]]) + '\n')
+
+    return {'counts': dict(counts), 'unreported': len(recorded.keys() - seen), 'result_path': result_path}
+
+class Reconciler:
+    """Grace hash join of a merchant order export against recorded integrations
+
+    Both inputs are streamed into hash partitions on disk keyed by
+    merchant_order_id, then each partition pair is joined in a worker
+    process, so memory is bounded by one partition regardless of file size.
+    """
+
+    def __init__(self, partitions: int = None, workers: int = None, batch_size: int = None,
+                 amount_unit: str = 'paisa', merchant_id: str = None, order_column: str = None,
+                 amount_column: str = None, status_column: str = None):
+        self.partitions = partitions or int(os.getenv('RECONCILE_PARTITIONS', 64))
+        self.workers = workers or int(os.getenv('RECONCILE_WORKERS', os.cpu_count() or 2))
+        self.batch_size = batch_size or int(os.getenv('RECONCILE_BATCH_SIZE', 5000))
+        if amount_unit not in ('paisa', 'rupees'):
+            raise ValueError("amount_unit must be 'paisa' or 'rupees'")
+        self.amount_scale = 100 if amount_unit == 'rupees' else 1
+        self.merchant_id = merchant_id
+        self.order_column = order_column
+        self.amount_column = amount_column
+        self.status_column = status_column
+
+    def run(self, order_file: str, report_path: str) -> Dict[str, Any]:
+        """Reconcile order_file and stream the per-order report to report_path (.csv or .ndjson, optionally .gz)"""
+        work_dir = tempfile.mkdtemp(prefix='reconcile-')
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                file_rows, skipped = self._partition_orders(order_file, work_dir)
+                recorded_rows = self._partition_records(work_dir, executor)
+
+                tasks = [(self._path(work_dir, 'orders', p), self._path(work_dir, 'records', p),
+                          self._path(work_dir, 'results', p)) for p in range(self.partitions)]
+                counts = Counter({name: 0 for name in RESULT_CLASSES})
+                unreported = 0
+                with open_text(report_path, 'w') as report:
+                    writer = self._report_writer(report, report_path)
+                    # Partitions are written to the report as they finish, in order
+                    for outcome in executor.map(_join_partition, tasks):
+                        counts.update(outcome['counts'])
+                        unreported += outcome['unreported']
+                        with open(outcome['result_path'], encoding='utf-8') as f:
+                            for line in f:
+                                writer(json.loads(line))
+                        os.remove(outcome['result_path'])
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        return {
+            'file_rows': file_rows,
+            'skipped_rows': skipped,
+            'recorded_rows': recorded_rows,
+            'results': dict(counts),
+            'recorded_not_in_file': unreported,
+            'report': report_path
+        }
+
+    def _path(self, work_dir: str, side: str, partition: int) -> str:
+        return os.path.join(work_dir, f"{side}-{partition:04d}.ndjson")
+
+    def _partition_orders(self, order_file: str, work_dir: str) -> tuple:
+        """Spill the merchant export into hash partitions"""
+        files = [open(self._path(work_dir, 'orders', p), 'w', encoding='utf-8') for p in range(self.partitions)]
+        rows = skipped = 0
+        try:
+            for row in read_order_file(order_file, self.order_column, self.amount_column, self.status_column):
+                if row['merchant_order_id'] in (None, ''):
+                    skipped += 1
+                    continue
+                order_id = str(row['merchant_order_id']).strip()
+                entry = [order_id, normalize_amount(row['amount'], self.amount_scale), normalize_status(row['status'])]
+                files[_partition_of(order_id, self.partitions)].write(json.dumps(entry) + '\n')
+                rows += 1
+        finally:
+            for f in files:
+                f.close()
+        return rows, skipped
+
+    def _partition_records(self, work_dir: str, executor: ProcessPoolExecutor) -> int:
+        """Stream Integration rows with a server-side cursor, decode payloads in workers, and spill them"""
+        table = Integration.__table__
+        query = db.select(table.c.id, table.c.status, table.c.request_payload, table.c.request_codec) \
+            .order_by(table.c.id).execution_options(yield_per=self.batch_size)
+        if self.merchant_id:
+            query = query.where(table.c.merchant_id == self.merchant_id)
+
+        files = [open(self._path(work_dir, 'records', p), 'w', encoding='utf-8') for p in range(self.partitions)]
+        rows = 0
+
+        def spill(records):
+            for record in records:
+                files[_partition_of(record[0], self.partitions)].write(json.dumps(record) + '\n')
+
+        try:
+            # Bounded number of batches in flight keeps memory flat; batches are
+            # spilled in id order so the latest attempt per order wins the join
+            pending = deque()
+            for batch in db.session.execute(query).partitions():
+                pending.append(executor.submit(_decode_records, [tuple(row) for row in batch]))
+                rows += len(batch)
+                if len(pending) >= self.workers * 2:
+                    spill(pending.popleft().result())
+            while pending:
+                spill(pending.popleft().result())
+        finally:
+            for f in files:
+                f.close()
+        return rows
+
+    def _report_writer(self, report, report_path: str):
+        """Row writer for the report format implied by the file name"""
+        if _base_name(report_path).endswith('.csv'):
+            writer = csv.writer(report)
+            writer.writerow(REPORT_FIELDS)
+            return writer.writerow
+        return lambda values: report.write(json.dumps(dict(zip(REPORT_FIELDS, values))) + '\n')
@@ -0,0 +1,243 @@
+import json
+import os
+import time
+import requests
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional
+from app.models import Integration, db
+from app.services.pine_labs import PineLabsService
+from app.services.reconciliation import open_text
+from app.utils.database import read_session
+from app.utils.payload_storage import decode_payload
+from app.utils.redaction import is_masked, redact
+from app.utils import singleflight
+
+REPLAY_TARGETS = ('simulator', 'validator', 'gateway')
+OUTCOMES = ('matched', 'mismatched', 'errors', 'skipped')
+# Response keys that differ on every run (generated ids, clocks) and never count as a regression
+VOLATILE_KEYS = ('transaction_id', 'refund_id', 'timestamp', 'created_at', 'updated_at', 'request_id', 'trace_id')
+# Differences kept per mismatched row in the report
+MAX_DIFFS = 20
+
+def diff_responses(recorded: Any, replayed: Any, ignore: Iterable[str] = VOLATILE_KEYS,
+                   path: str = '$', diffs: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Paths where the replayed response differs from the recorded one"""
+    ignore = ignore if isinstance(ignore, frozenset) else frozenset(ignore)
+    diffs = [] if diffs is None else diffs
+    if len(diffs) >= MAX_DIFFS:
+        return diffs
+    if isinstance(recorded, dict) and isinstance(replayed, dict):
+        for key in recorded.keys() | replayed.keys():
+            if key in ignore:
+                continue
+            if key not in replayed:
+                diffs.append({'path': f"{path}.{key}", 'change': 'removed', 'recorded': recorded[key]})
+            elif key not in recorded:
+                diffs.append({'path': f"{path}.{key}", 'change': 'added', 'replayed': replayed[key]})
+            else:
+                diff_responses(recorded[key], replayed[key], ignore, f"{path}.{key}", diffs)
+    elif isinstance(recorded, list) and isinstance(replayed, list) and len(recorded) == len(replayed):
+        for index, (old, new) in enumerate(zip(recorded, replayed)):
+            diff_responses(old, new, ignore, f"{path}[{index}]", diffs)
+    elif recorded != replayed:
+        diffs.append({'path': path, 'change': 'changed', 'recorded': recorded, 'replayed': replayed})
+    return diffs
+
+def _collapse_indexes(path: str) -> str:
+    """$.payments[3].status -> $.payments[*].status"""
+    out = []
+    inside = False
+    for char in path:
+        if char == '[':
+            inside = True
+            out.append('[*]')
+        elif char == ']':
+            inside = False
+        elif not inside:
+            out.append(char)
+    return ''.join(out)
+
+def _recorded_validation(recorded: Dict[str, Any]) -> Dict[str, Any]:
+    """The validation outcome implied by a recorded test_integration response"""
+    if 'validation_errors' in recorded:
+        return {'valid': False, 'errors': recorded['validation_errors'], 'suggestions': recorded.get('suggestions', [])}
+    return {'valid': True, 'errors': [], 'suggestions': []}
+
+def _replay_batch(task: tuple) -> Dict[str, Any]:
+    """Re-run one batch of recorded integrations and diff the results (runs in worker processes)"""
+    target, gateway_url, timeout, ignore, rows = task
+    service = PineLabsService()
+    session = None
+    if target == 'gateway':
+        session = requests.Session()
+
+    counts = Counter()
+    by_type = Counter()
+    paths = Counter()
+    mismatches = []
+    ignore = frozenset(ignore)
+    try:
+        for row_id, integration_type, status, request, request_codec, response, response_codec in rows:
+            try:
+                payload = decode_payload(request, request_codec)
+                recorded = decode_payload(response, response_codec)
+            except Exception as e:
+                counts['errors'] += 1
+                mismatches.append({'id': row_id, 'integration_type': integration_type, 'outcome': 'error',
+                                   'error': f"Undecodable payload: {e}"})
+                continue
+            if not isinstance(payload, dict) or recorded is None:
+                # Nothing to replay, or the request never got a response
+                counts['skipped'] += 1
+                continue
+            if is_masked(payload):
+                # Stored requests are redacted: XXXXXXXX9012 or al***@okhdfc fail validation
+                # where the original number or VPA passed, so the row cannot be replayed faithfully
+                counts['skipped'] += 1
+                counts['masked'] += 1
+                continue
+
+            try:
+                if target == 'validator':
+                    if not isinstance(recorded, dict):
+                        counts['skipped'] += 1
+                        continue
+                    recorded = _recorded_validation(recorded)
+                    replayed = service.validate_payload(payload)
+                elif target == 'gateway':
+                    reply = session.post(gateway_url, json=payload, timeout=timeout)
+                    replayed = reply.json()
+                else:
+                    replayed = service.test_integration(payload)
+                # Stored responses are redacted, so the replay is compared in the same form
+                diffs = diff_responses(recorded, redact(replayed), ignore)
+            except Exception as e:
+                counts['errors'] += 1
+                mismatches.append({'id': row_id, 'integration_type': integration_type, 'outcome': 'error',
+                                   'error': str(e)})
+                continue
+
+            by_type[integration_type] += 1
+            if diffs:
+                counts['mismatched'] += 1
+                paths.update({_collapse_indexes(diff['path']) for diff in diffs})
+                mismatches.append({'id': row_id, 'integration_type': integration_type, 'status': status,
+                                   'outcome': 'mismatch', 'diffs': diffs})
+            else:
+                counts['matched'] += 1
+    finally:
+        if session is not None:
+            session.close()
+
+    return {'rows': len(rows), 'counts': dict(counts), 'by_type': dict(by_type), 'paths': dict(paths),
+            'mismatches': mismatches}
+
+class ReplayEngine:
+    """Replays recorded Integration traffic against the current code and diffs the responses
+
+    Rows are streamed from a server-side cursor in id order and re-run in
+    a process pool, a batch per task, with a bounded number of batches in
+    flight. Mismatches are streamed to an NDJSON report as batches finish,
+    so memory stays flat however many rows are replayed.
+    """
+
+    def __init__(self, target: str = 'simulator', gateway_url: str = None, workers: int = None,
+                 batch_size: int = None, merchant_id: str = None, integration_type: str = None,
+                 status: str = None, since: datetime = None, until: datetime = None, limit: int = None,
+                 ignore_keys: Iterable[str] = (), timeout: float = None):
+        if target not in REPLAY_TARGETS:
+            raise ValueError(f"target must be one of {', '.join(REPLAY_TARGETS)}")
+        gateway_url = gateway_url or os.getenv('REPLAY_GATEWAY_URL')
+        if target == 'gateway' and not gateway_url:
+            raise ValueError("The gateway target needs a gateway URL (REPLAY_GATEWAY_URL)")
+        self.target = target
+        self.gateway_url = gateway_url
+        self.workers = workers or int(os.getenv('REPLAY_WORKERS', os.cpu_count() or 2))
+        self.batch_size = batch_size or int(os.getenv('REPLAY_BATCH_SIZE', 2000))
+        self.timeout = timeout or float(os.getenv('REPLAY_TIMEOUT', 10))
+        self.merchant_id = merchant_id
+        self.integration_type = integration_type
+        self.status = status
+        self.since = since
+        self.until = until
+        self.limit = limit
+        extra = [key.strip() for key in os.getenv('REPLAY_IGNORE_KEYS', '').split(',') if key.strip()]
+        self.ignore_keys = tuple(VOLATILE_KEYS) + tuple(extra) + tuple(ignore_keys)
+
+    def query(self):
+        """Filtered select of recorded requests and responses in id order"""
+        table = Integration.__table__
+        query = db.select(
+            table.c.id, table.c.integration_type, table.c.status,
+            table.c.request_payload, table.c.request_codec,
+            table.c.response_data, table.c.response_codec
+        ).order_by(table.c.id)
+        if self.merchant_id:
+            query = query.where(table.c.merchant_id == self.merchant_id)
+        if self.integration_type:
+            query = query.where(table.c.integration_type == self.integration_type)
+        if self.status:
+            query = query.where(table.c.status == self.status)
+        if self.since:
+            query = query.where(table.c.created_at >= self.since)
+        if self.until:
+            query = query.where(table.c.created_at < self.until)
+        if self.limit:
+            query = query.limit(self.limit)
+        return query.execution_options(yield_per=self.batch_size)
+
+    def run(self, report_path: Optional[str] = None, progress=None) -> Dict[str, Any]:
+        """Replay every matching row; mismatches go to report_path (.ndjson, optionally .gz)"""
+        counts = Counter({name: 0 for name in OUTCOMES})
+        by_type = Counter()
+        paths = Counter()
+        rows = 0
+        started = time.perf_counter()
+        report = open_text(report_path, 'w') if report_path else None
+
+        def collect(outcome):
+            nonlocal rows
+            rows += outcome['rows']
+            counts.update(outcome['counts'])
+            by_type.update(outcome['by_type'])
+            paths.update(outcome['paths'])
+            if report is not None:
+                for mismatch in outcome['mismatches']:
+                    report.write(json.dumps(mismatch, default=str) + '\n')
+            if progress is not None:
+                progress(rows, time.perf_counter() - started)
+
+        try:
+            # Each worker replays its batch serially, so there is nothing to coalesce
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=singleflight.disable) as executor:
+                # Bounded number of batches in flight keeps memory flat
+                pending = deque()
+                for batch in read_session().execute(self.query()).partitions():
+                    task = (self.target, self.gateway_url, self.timeout, self.ignore_keys,
+                            [tuple(row) for row in batch])
+                    pending.append(executor.submit(_replay_batch, task))
+                    if len(pending) >= self.workers * 2:
+                        collect(pending.popleft().result())
+                while pending:
+                    collect(pending.popleft().result())
+        finally:
+            if report is not None:
+                report.close()
+
+        elapsed = time.perf_counter() - started
+        replayed = counts['matched'] + counts['mismatched']
+        masked = counts.pop('masked', 0)
+        return {
+            'target': self.target,
+            'rows': rows,
+            'results': dict(counts),
+            'masked': masked,
+            'by_type': dict(by_type),
+            'match_rate': round(counts['matched'] / replayed, 4) if replayed else None,
+            'top_diff_paths': paths.most_common(10),
+            'elapsed_s': round(elapsed, 2),
+            'rows_per_s': round(rows / elapsed) if elapsed else None,
+            'report': report_path
+        }
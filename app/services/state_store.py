@@ -0,0 +1,176 @@
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+try:
+    import redis
+except ImportError:  # Only needed for STATE_BACKEND=redis
+    redis = None
+
+class StateStore:
+    """Key/value store for state that must survive across worker processes"""
+
+    # Whether other processes see the same data
+    shared = True
+
+    def __init__(self, namespace: str, sweep_every: int = None):
+        self.namespace = namespace
+        self.sweep_every = sweep_every or int(os.getenv('STATE_SWEEP_EVERY', 1000))
+        self._writes = itertools.count(1)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a value, or None if it is missing or expired"""
+        raise NotImplementedError("Subclasses must implement get method")
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        """Store a JSON-serializable value with an optional TTL in seconds"""
+        raise NotImplementedError("Subclasses must implement set method")
+
+    def delete(self, key: str):
+        """Remove a value"""
+        raise NotImplementedError("Subclasses must implement delete method")
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _sweep_due(self) -> bool:
+        """True on every sweep_every-th write, when backends purge expired entries nobody reads"""
+        return next(self._writes) % self.sweep_every == 0
+
+class MemoryStateStore(StateStore):
+    """Process-local store; the stand-in for shared backends in tests and single-worker runs"""
+
+    shared = False
+
+    def __init__(self, namespace: str, max_entries: int = None):
+        super().__init__(namespace)
+        self.max_entries = max_entries or int(os.getenv('STATE_MAX_ENTRIES', 10000))
+        # Oldest write first
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(self._key(key))
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[self._key(key)]
+                return None
+            # Round-trip through JSON so callers never share mutable state
+            return json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            full_key = self._key(key)
+            # Re-inserting moves the key to the end, so the least recently written go first
+            self._data.pop(full_key, None)
+            self._data[full_key] = (json.dumps(value, default=str), expires_at)
+            if self._sweep_due():
+                self._sweep()
+            while len(self._data) > self.max_entries:
+                del self._data[next(iter(self._data))]
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(self._key(key), None)
+
+    def _sweep(self):
+        now = time.time()
+        expired = [key for key, (_, expires_at) in self._data.items()
+                   if expires_at is not None and expires_at < now]
+        for key in expired:
+            del self._data[key]
+
+class SQLiteStateStore(StateStore):
+    """File-backed store shared by all worker processes on one host"""
+
+    def __init__(self, namespace: str, path: str):
+        super().__init__(namespace)
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread, opened lazily so nothing is shared across a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS state '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)'
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._connection().execute(
+            'SELECT value, expires_at FROM state WHERE key = ?', (self._key(key),)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] is not None and row[1] < time.time():
+            self.delete(key)
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        expires_at = time.time() + ttl if ttl else None
+        self._connection().execute(
+            'INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)',
+            (self._key(key), json.dumps(value, default=str), expires_at)
+        )
+        if self._sweep_due():
+            self._connection().execute('DELETE FROM state WHERE expires_at < ?', (time.time(),))
+
+    def delete(self, key: str):
+        self._connection().execute('DELETE FROM state WHERE key = ?', (self._key(key),))
+
+class RedisStateStore(StateStore):
+    """Store backed by any Redis-protocol server, shared across hosts"""
+
+    def __init__(self, namespace: str, url: str):
+        super().__init__(namespace)
+        if redis is None:
+            raise RuntimeError("The redis package is required for STATE_BACKEND=redis")
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._client.get(self._key(key))
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        self._client.set(self._key(key), json.dumps(value, default=str), ex=ttl)
+
+    def delete(self, key: str):
+        self._client.delete(self._key(key))
+
+_stores: Dict[str, StateStore] = {}
+_stores_lock = threading.Lock()
+
+def get_state_store(namespace: str = 'state') -> StateStore:
+    """Get the process-wide store for a namespace, using STATE_BACKEND"""
+    with _stores_lock:
+        if namespace not in _stores:
+            backend = os.getenv('STATE_BACKEND', 'memory').lower()
+            if backend == 'sqlite':
+                store = SQLiteStateStore(namespace, os.getenv('STATE_SQLITE_PATH', 'pine_state.db'))
+            elif backend == 'redis':
+                store = RedisStateStore(namespace, os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+            elif backend == 'memory':
+                store = MemoryStateStore(namespace)
+            else:
+                raise ValueError(f"Unknown STATE_BACKEND: {backend}")
+            _stores[namespace] = store
+        return _stores[namespace]
+
+def get_cache() -> StateStore:
+    """Shared cache namespace on the configured state backend"""
+    return get_state_store('cache')
@@ -0,0 +1,246 @@
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Dict, Any, Callable, List, Optional
+from app.models import Integration, db
+from app.services.pine_labs import PineLabsService
+from app.utils.payload_storage import decode_payload
+
+# Gateway order statuses that end polling, mapped to Integration.status
+TERMINAL_STATUSES = {
+    'PROCESSED': 'success',
+    'FULLY_REFUNDED': 'success',
+    'PARTIALLY_REFUNDED': 'success',
+    'FAILED': 'failed',
+    'CANCELLED': 'failed'
+}
+ORDER_KEYS = ('merchant_order_id', 'merchant_order_reference', 'order_id')
+
+class _Tracked:
+    """Polling state of one pending order"""
+
+    __slots__ = ('integration_id', 'order_id', 'delay', 'attempts', 'last_status', 'tracked_at', 'created_at')
+
+    def __init__(self, integration_id: int, order_id: str, delay: float, age: float = 0.0):
+        self.integration_id = integration_id
+        self.order_id = order_id
+        self.delay = delay
+        self.attempts = 0
+        self.last_status = None
+        self.tracked_at = time.monotonic()
+        # Monotonic time the order was created; max_age counts from here, not from when tracking began
+        self.created_at = self.tracked_at - age
+
+class StatusPoller:
+    """Polls pending orders from a timer heap with per-order exponential backoff
+
+    Due orders are fetched in batches on a bounded thread pool, an order is
+    never scheduled or in flight twice, and settled orders are written back
+    to their Integration rows in batches.
+    """
+
+    def __init__(self, fetch_orders: Callable[[List[str]], Dict[str, Dict[str, Any]]] = None,
+                 initial_delay: float = None, max_delay: float = None, backoff: float = None,
+                 batch_size: int = None, workers: int = None, max_age: float = None,
+                 write_batch_size: int = None, write_interval: float = None):
+        self.fetch_orders = fetch_orders or (lambda order_ids: PineLabsService().fetch_orders(order_ids))
+        self.initial_delay = initial_delay or float(os.getenv('POLL_INITIAL_DELAY', 2))
+        self.max_delay = max_delay or float(os.getenv('POLL_MAX_DELAY', 60))
+        self.backoff = backoff or float(os.getenv('POLL_BACKOFF', 1.5))
+        self.batch_size = batch_size or int(os.getenv('POLL_BATCH_SIZE', 20))
+        self.workers = workers or int(os.getenv('POLL_WORKERS', 4))
+        self.max_age = max_age or float(os.getenv('POLL_MAX_AGE', 86400))
+        self.write_batch_size = write_batch_size or int(os.getenv('POLL_WRITE_BATCH_SIZE', 100))
+        self.write_interval = write_interval or float(os.getenv('POLL_WRITE_INTERVAL', 5))
+
+        self._lock = threading.Lock()
+        self._heap = []
+        self._sequence = itertools.count()
+        self._tracked: Dict[str, _Tracked] = {}
+        self._in_flight = set()
+        self._settled = []
+        self._random = random.Random()
+        self.stats = {'tracked': 0, 'fetches': 0, 'batches': 0, 'errors': 0,
+                      'settled': 0, 'expired': 0, 'settle_seconds': 0.0}
+
+    def track(self, integration_id: int, order_id: str, first_poll_in: float = None,
+              created_at: datetime = None) -> bool:
+        """Start polling an order; False when it is already scheduled or in flight"""
+        age = max(0.0, (datetime.utcnow() - created_at).total_seconds()) if created_at else 0.0
+        with self._lock:
+            if order_id in self._tracked:
+                return False
+            entry = _Tracked(integration_id, order_id, self.initial_delay, age)
+            self._tracked[order_id] = entry
+            self._schedule(entry, self.initial_delay if first_poll_in is None else first_poll_in)
+            self.stats['tracked'] += 1
+            return True
+
+    def _schedule(self, entry: _Tracked, delay: float):
+        # +/-10% jitter keeps orders created together from being polled in lockstep
+        due = time.monotonic() + delay * self._random.uniform(0.9, 1.1)
+        heapq.heappush(self._heap, (due, next(self._sequence), entry.order_id))
+
+    def load_pending(self, batch_size: int = 1000) -> int:
+        """Track every pending Integration younger than max_age that carries an order reference"""
+        added = 0
+        table = Integration.__table__
+        # Orders past max_age are not picked up again by every rescan (the status/created_at index serves this)
+        oldest = datetime.utcnow() - timedelta(seconds=self.max_age)
+        query = db.select(table.c.id, table.c.request_payload, table.c.request_codec, table.c.created_at) \
+            .where(table.c.status == 'pending', table.c.created_at >= oldest) \
+            .order_by(table.c.id).execution_options(yield_per=batch_size)
+        for row in db.session.execute(query):
+            payload = decode_payload(row.request_payload, row.request_codec)
+            if not isinstance(payload, dict):
+                continue
+            order_id = next((payload[key] for key in ORDER_KEYS if payload.get(key)), None)
+            if order_id is not None and self.track(row.id, str(order_id), first_poll_in=0,
+                                                   created_at=row.created_at):
+                added += 1
+        return added
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._tracked)
+
+    def next_due_in(self) -> Optional[float]:
+        """Seconds until the earliest scheduled poll"""
+        with self._lock:
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - time.monotonic())
+
+    def _pop_due(self) -> List[_Tracked]:
+        """Remove due orders from the heap and mark them in flight"""
+        now = time.monotonic()
+        due = []
+        limit = self.batch_size * self.workers
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now and len(due) < limit:
+                _, _, order_id = heapq.heappop(self._heap)
+                entry = self._tracked.get(order_id)
+                if entry is None or order_id in self._in_flight:
+                    continue
+                self._in_flight.add(order_id)
+                due.append(entry)
+        return due
+
+    def _fetch_batch(self, batch: List[_Tracked]) -> Dict[str, Dict[str, Any]]:
+        try:
+            return self.fetch_orders([entry.order_id for entry in batch])
+        except Exception as e:
+            return {entry.order_id: {'success': False, 'error': str(e), 'status': None} for entry in batch}
+
+    def run_once(self, executor: ThreadPoolExecutor) -> int:
+        """Poll everything due now; returns the number of orders fetched"""
+        due = self._pop_due()
+        if not due:
+            return 0
+
+        batches = [due[i:i + self.batch_size] for i in range(0, len(due), self.batch_size)]
+        futures = {executor.submit(self._fetch_batch, batch): batch for batch in batches}
+        wait(futures)
+
+        for future, batch in futures.items():
+            self._handle(batch, future.result())
+
+        with self._lock:
+            self.stats['fetches'] += len(due)
+            self.stats['batches'] += len(batches)
+        return len(due)
+
+    def _handle(self, batch: List[_Tracked], results: Dict[str, Dict[str, Any]]):
+        """Settle, reschedule or expire each polled order"""
+        now = time.monotonic()
+        with self._lock:
+            for entry in batch:
+                self._in_flight.discard(entry.order_id)
+                entry.attempts += 1
+                result = results.get(entry.order_id) or {'success': False, 'status': None}
+                status = (result.get('status') or '').upper() or None
+
+                if status in TERMINAL_STATUSES:
+                    del self._tracked[entry.order_id]
+                    self._settled.append((entry, TERMINAL_STATUSES[status], result))
+                    self.stats['settled'] += 1
+                    self.stats['settle_seconds'] += now - entry.tracked_at
+                    continue
+
+                if now - entry.created_at > self.max_age:
+                    del self._tracked[entry.order_id]
+                    self.stats['expired'] += 1
+                    continue
+
+                if not result.get('success'):
+                    self.stats['errors'] += 1
+                    entry.delay = min(entry.delay * self.backoff, self.max_delay)
+                elif status != entry.last_status:
+                    # Progress (e.g. CREATED -> ATTEMPTED) means settlement is near: poll soon again
+                    entry.delay = self.initial_delay
+                else:
+                    entry.delay = min(entry.delay * self.backoff, self.max_delay)
+                entry.last_status = status or entry.last_status
+                self._schedule(entry, entry.delay)
+
+    def flush(self) -> int:
+        """Write settled orders back to their Integration rows in one transaction"""
+        with self._lock:
+            settled, self._settled = self._settled, []
+        if not settled:
+            return 0
+
+        by_id = {entry.integration_id: (status, result) for entry, status, result in settled}
+        for integration in db.session.scalars(db.select(Integration).where(Integration.id.in_(by_id))):
+            status, result = by_id[integration.id]
+            integration.status = status
+            integration.set_response_data(result.get('order') or result)
+            if status == 'failed':
+                integration.error_message = f"Order {(result.get('status') or '').upper()}"
+            integration.updated_at = datetime.utcnow()
+        db.session.commit()
+        return len(settled)
+
+    def run(self, stop: threading.Event = None, until_idle: bool = True, rescan_interval: float = None,
+            max_idle_sleep: float = 1.0):
+        """Poll until nothing is tracked (or until stopped), sleeping until the next due order
+
+        With rescan_interval, newly pending integrations are picked up periodically.
+        Needs an app context for loading and writing back.
+        """
+        stop = stop or threading.Event()
+        last_flush = last_scan = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='status-poll') as executor:
+            while not stop.is_set():
+                self.run_once(executor)
+
+                now = time.monotonic()
+                if len(self._settled) >= self.write_batch_size or \
+                        (self._settled and now - last_flush >= self.write_interval):
+                    self.flush()
+                    last_flush = now
+                if rescan_interval and now - last_scan >= rescan_interval:
+                    self.load_pending()
+                    last_scan = now
+                if until_idle and not self.pending():
+                    break
+
+                next_due = self.next_due_in()
+                stop.wait(max_idle_sleep if next_due is None else min(next_due, max_idle_sleep))
+        self.flush()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            settled = self.stats['settled']
+            return dict(
+                self.stats,
+                pending=len(self._tracked),
+                in_flight=len(self._in_flight),
+                fetches_per_settled=round(self.stats['fetches'] / settled, 2) if settled else None,
+                mean_settle_seconds=round(self.stats['settle_seconds'] / settled, 2) if settled else None
+            )
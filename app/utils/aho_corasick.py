@@ -0,0 +1,60 @@
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+class AhoCorasick:
+    """Multi-pattern matcher: finds every pattern in a text in one pass
+
+    Patterns and text are matched exactly as given; callers normalize both
+    (case, spacing, word padding) beforehand.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, Any]]):
+        # Node 0 is the root; each node has transitions, a failure link and outputs
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+        for pattern, value in patterns:
+            self._add(pattern, value)
+        self._link()
+
+    def _add(self, pattern: str, value: Any):
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = next_node
+        self._out[node].append((len(pattern), value))
+
+    def _link(self):
+        """Breadth-first failure links, merging outputs of suffix patterns"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def iter(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """Yield (start, end, value) for every pattern occurrence"""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                for length, value in out[node]:
+                    yield index - length + 1, index + 1, value
@@ -0,0 +1,298 @@
+import ast
+import os
+import re
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+# Code shorter than this is sent whole: slicing it saves little and loses context
+MIN_CODE_CHARS = int(os.getenv('FIX_CONTEXT_MIN_CHARS', 3000))
+# Above this share of the file the slice is not worth the splice
+MAX_SLICE_RATIO = float(os.getenv('FIX_CONTEXT_MAX_RATIO', 0.6))
+# Entries in the outline of code left out of the prompt
+OUTLINE_LIMIT = int(os.getenv('FIX_CONTEXT_OUTLINE_LIMIT', 40))
+# Lines around an error line kept when the code cannot be parsed into functions
+WINDOW_LINES = 15
+
+# Line numbers in Python tracebacks, JS stacks (file.js:12:5), Java stacks (File.java:12) and compiler output
+_LINE_NUMBERS = re.compile(r'\bline (\d+)|:(\d+):\d+\b|\.(?:java|js|ts|py):(\d+)\b|\((\d+),\d+\)', re.IGNORECASE)
+_TRACEBACK_FUNCTION = re.compile(r'\bin (\w+)|\bat (?:[\w$]+\.)*([\w$]+) \(')
+_IDENTIFIER = re.compile(r'[A-Za-z_$][\w$]*')
+# Lines that talk to the gateway or build what it checks
+_CALL_SITE = re.compile(
+    r'requests\.|\bfetch\(|axios|HttpClient|HttpRequest|HttpURLConnection|OkHttp|urlopen|\.post\(|\.get\(|'
+    r'signature|hmac|Authorization|Bearer|access_token|pluralonline|pinelabs|merchant[-_]?id',
+    re.IGNORECASE
+)
+_JS_IMPORT = re.compile(r'^\s*(import\s|export\s.*\sfrom\s|(const|let|var)\s.*=\s*require\()')
+_JAVA_IMPORT = re.compile(r'^\s*(package|import)\s')
+# Block headers that open a function or method; classes and control flow are descended into
+_BLOCK_NAME = re.compile(
+    r'function\s*\*?\s*([\w$]+)?\s*\(|([\w$]+)\s*[:=]\s*(?:async\s+)?(?:function\b|\([^()]*\)\s*=>|[\w$]+\s*=>)|'
+    r'([\w$]+)\s*\([^()]*\)\s*(?:throws\s+[\w$.,\s]+)?$'
+)
+_DECLARATION = re.compile(r'\b(?:class|interface|enum)\s+([\w$]+)')
+_COMMENTS = re.compile(r'//[^\n]*|/\*.*?\*/', re.DOTALL)
+_CALL = re.compile(r'([\w$]+)\s*\(')
+_CONTROL = frozenset(('if', 'for', 'while', 'switch', 'catch', 'with', 'return', 'else', 'try', 'do', 'synchronized'))
+_SEGMENT = re.compile(r'<<<SEGMENT (\d+)[^>]*>>>\n?(.*?)\n?<<<END SEGMENT \1>>>', re.DOTALL)
+_FENCE = re.compile(r'^\s*```[\w+-]*\s*\n|\n\s*```\s*$')
+
+class _Unit:
+    """A function, method or class spanning lines start..end (1-based, inclusive)"""
+
+    __slots__ = ('name', 'kind', 'start', 'end', 'header', 'calls')
+
+    def __init__(self, name: str, kind: str, start: int, end: int, header: str, calls: Set[str] = None):
+        self.name = name
+        self.kind = kind
+        self.start = start
+        self.end = end
+        self.header = header
+        self.calls = calls or set()
+
+def _python_units(code: str, lines: List[str]) -> Tuple[List[_Unit], List[Tuple[int, int]], Dict[str, Tuple[int, int]]]:
+    """Functions and classes, import statements and module-level assignments from the Python AST"""
+    tree = ast.parse(code)
+    units = []
+    imports = []
+    assignments = {}
+
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+            calls = {
+                call.func.id if isinstance(call.func, ast.Name) else call.func.attr
+                for call in ast.walk(node)
+                if isinstance(call, ast.Call) and isinstance(call.func, (ast.Name, ast.Attribute))
+            }
+            kind = 'class' if isinstance(node, ast.ClassDef) else 'function'
+            units.append(_Unit(node.name, kind, start, node.end_lineno, lines[node.lineno - 1].strip(), calls))
+
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            imports.append((node.lineno, node.end_lineno))
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                if isinstance(target, ast.Name):
+                    assignments[target.id] = (node.lineno, node.end_lineno)
+    return units, imports, assignments
+
+def _brace_units(code: str, lines: List[str], language: str) -> Tuple[List[_Unit], List[Tuple[int, int]]]:
+    """Functions and methods of brace languages found by a tokenizer that skips strings and comments"""
+    units = []
+    stack = []
+    header_start = 0
+    line = 1
+    index = 0
+    length = len(code)
+
+    while index < length:
+        char = code[index]
+        pair = code[index:index + 2]
+        if pair == '//':
+            end = code.find('\n', index)
+            index = length if end == -1 else end
+            continue
+        if pair == '/*':
+            end = code.find('*/', index + 2)
+            end = length if end == -1 else end + 2
+            line += code.count('\n', index, end)
+            index = end
+            continue
+        if char in '"\'`':
+            end = index + 1
+            while end < length and code[end] != char and not (char != '`' and code[end] == '\n'):
+                end += 2 if code[end] == '\\' else 1
+            line += code.count('\n', index, end)
+            # An unterminated quote stops at the newline, which is still counted below
+            index = end if end < length and code[end] == '\n' else end + 1
+            continue
+
+        if char == '\n':
+            line += 1
+        elif char == '{':
+            raw = code[header_start:index].lstrip()
+            header = ' '.join(_COMMENTS.sub(' ', raw).split())
+            # The block starts where its header does, which may be lines before the brace
+            stack.append((line - raw.count('\n'), header, _block_name(header)))
+            header_start = index + 1
+        elif char == '}':
+            if stack:
+                start, header, name = stack.pop()
+                if name:
+                    kind = 'class' if _DECLARATION.search(header) else 'function'
+                    body = '\n'.join(lines[start - 1:line])
+                    units.append(_Unit(name, kind, start, line, header, set(_CALL.findall(body))))
+            header_start = index + 1
+        elif char == ';':
+            header_start = index + 1
+        index += 1
+
+    pattern = _JAVA_IMPORT if language == 'java' else _JS_IMPORT
+    imports = [(number, number) for number, text in enumerate(lines, 1) if pattern.match(text)]
+    return units, imports
+
+def _block_name(header: str) -> Optional[str]:
+    """Name of the function, method or class a block header opens, None for other blocks"""
+    declaration = _DECLARATION.search(header)
+    if declaration:
+        return declaration.group(1)
+    match = _BLOCK_NAME.search(header)
+    if not match:
+        return None
+    name = next((group for group in match.groups() if group), 'anonymous')
+    return None if name in _CONTROL else name
+
+def _merge(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Sorted ranges with overlapping and adjacent ones joined"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+class CodeContext:
+    """The part of a code blob relevant to an error, and how to put a fixed version back
+
+    When the code is large the prompt gets numbered segments (imports, the
+    functions around the error lines, HTTP call sites and signing code, and
+    the functions they call) plus an outline of everything else. The fixed
+    segments from the reply are spliced back into the original locally.
+    Small or unparseable inputs pass through whole.
+    """
+
+    def __init__(self, code: str, segments: List[Tuple[int, int]] = None, outline: List[str] = None):
+        self.code = code
+        self.lines = code.split('\n')
+        self.segments = segments or []
+        self.outline = outline or []
+
+    @property
+    def minimized(self) -> bool:
+        return bool(self.segments)
+
+    def prompt_block(self) -> str:
+        """The code as it goes into the prompt"""
+        if not self.minimized:
+            return self.code
+        parts = [f"Outline of the full file ({len(self.lines)} lines):"]
+        parts.extend(f"  {entry}" for entry in self.outline)
+        parts.append("")
+        parts.append("Relevant code, as numbered segments of the file:")
+        for number, (start, end) in enumerate(self.segments, 1):
+            parts.append(f"<<<SEGMENT {number} lines {start}-{end}>>>")
+            parts.extend(self.lines[start - 1:end])
+            parts.append(f"<<<END SEGMENT {number}>>>")
+        return '\n'.join(parts)
+
+    def instructions(self) -> str:
+        """Reply format the prompt asks for"""
+        if not self.minimized:
+            return "Please fix the error and provide the corrected code with explanations."
+        return ("Please fix the error. Reply with every segment you change between the same markers, "
+                "complete and with its original indentation, and leave out segments that need no change. "
+                "Then explain the fix after a line starting with \"Explanation:\".")
+
+    def splice(self, reply: str) -> Tuple[Optional[str], str]:
+        """The full fixed code and the explanation; code is None when the reply has no segments"""
+        if not self.minimized:
+            return None, reply
+        fixed = {}
+        for match in _SEGMENT.finditer(reply):
+            number = int(match.group(1))
+            if 1 <= number <= len(self.segments):
+                fixed[number] = _FENCE.sub('', match.group(2))
+        if not fixed:
+            return None, reply
+
+        lines = list(self.lines)
+        # Back to front, so earlier line numbers stay valid
+        for number in sorted(fixed, reverse=True):
+            start, end = self.segments[number - 1]
+            lines[start - 1:end] = fixed[number].split('\n')
+        explanation = reply.split('Explanation:', 1)[1].strip() if 'Explanation:' in reply else ''
+        return '\n'.join(lines), explanation
+
+    def stats(self) -> Dict[str, Any]:
+        sent = sum(end - start + 1 for start, end in self.segments) if self.minimized else len(self.lines)
+        return {'minimized': self.minimized, 'lines': len(self.lines), 'lines_sent': sent,
+                'segments': len(self.segments)}
+
+def error_lines(error_message: str) -> Set[int]:
+    """Line numbers mentioned in a traceback, stack trace or compiler message"""
+    return {int(number) for match in _LINE_NUMBERS.finditer(error_message or '')
+            for number in match.groups() if number}
+
+def _slice(lines: List[str], functions: List[_Unit], imports: List[Tuple[int, int]],
+           assignments: Dict[str, Tuple[int, int]], anchors: Set[int], windows: Set[int],
+           named: Set[str]) -> List[Tuple[int, int]]:
+    """Line ranges covering the anchor lines' functions, the named functions and what they need"""
+    ranges = list(imports)
+    selected = {}
+    for number in anchors:
+        containing = [unit for unit in functions if unit.start <= number <= unit.end]
+        if containing:
+            unit = min(containing, key=lambda unit: unit.end - unit.start)
+            selected[id(unit)] = unit
+        elif number in windows:
+            ranges.append((max(1, number - WINDOW_LINES), min(len(lines), number + WINDOW_LINES)))
+        else:
+            ranges.append((number, number))
+    for unit in functions:
+        if unit.name in named:
+            selected[id(unit)] = unit
+
+    # One hop along the call graph: helpers the selected functions call
+    called = set().union(*(unit.calls for unit in selected.values())) if selected else set()
+    for unit in functions:
+        if unit.name in called:
+            selected[id(unit)] = unit
+    ranges.extend((unit.start, unit.end) for unit in selected.values())
+
+    # Module-level constants the selected code uses
+    used = set(_IDENTIFIER.findall('\n'.join('\n'.join(lines[unit.start - 1:unit.end]) for unit in selected.values())))
+    ranges.extend(span for name, span in assignments.items() if name in used)
+    return _merge(ranges)
+
+def _outline(units: List[_Unit], segments: List[Tuple[int, int]]) -> List[str]:
+    """Headers of the classes and functions left out of the segments"""
+    outside = [unit for unit in sorted(units, key=lambda unit: unit.start)
+               if unit.kind == 'class' or not any(start <= unit.start and unit.end <= end for start, end in segments)]
+    outline = [f"{unit.header} [{unit.start}-{unit.end}]" for unit in outside[:OUTLINE_LIMIT]]
+    if len(outside) > OUTLINE_LIMIT:
+        outline.append(f"... {len(outside) - OUTLINE_LIMIT} more")
+    return outline
+
+def minimize_code(code: str, error_message: str, language: str) -> CodeContext:
+    """Cut code down to the parts related to the error, with an outline of the rest"""
+    if not code or len(code) < MIN_CODE_CHARS:
+        return CodeContext(code or '')
+
+    lines = code.split('\n')
+    language = (language or '').lower()
+    assignments = {}
+    try:
+        if language in ('python', 'py'):
+            units, imports, assignments = _python_units(code, lines)
+        else:
+            units, imports = _brace_units(code, lines, 'java' if language == 'java' else 'javascript')
+    except (SyntaxError, ValueError, RecursionError):
+        units, imports = [], []
+    functions = [unit for unit in units if unit.kind == 'function']
+
+    error_at = {number for number in error_lines(error_message) if 1 <= number <= len(lines)}
+    named = {name for match in _TRACEBACK_FUNCTION.finditer(error_message or '') for name in match.groups() if name}
+    named |= set(_IDENTIFIER.findall(error_message or '')) & {unit.name for unit in functions}
+    if not error_at and not named & {unit.name for unit in functions}:
+        # Nothing ties the error to a place in the code: send it whole
+        return CodeContext(code)
+    call_sites = {number for number, text in enumerate(lines, 1) if _CALL_SITE.search(text)}
+
+    # HTTP call sites and signing code go in when they fit, the error's own location always does
+    for anchors in (error_at | call_sites, error_at):
+        segments = _slice(lines, functions, imports, assignments, anchors, error_at, named)
+        if sum(end - start + 1 for start, end in segments) <= len(lines) * MAX_SLICE_RATIO:
+            return CodeContext(code, segments, _outline(units, segments))
+    return CodeContext(code)
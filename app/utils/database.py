@@ -0,0 +1,79 @@
+import os
+from typing import Dict, Any
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import scoped_session, sessionmaker
+from app import db
+
+REPLICA_BIND = 'replica'
+
+# Sessions for the read replica; thread-scoped and removed on app context teardown
+replica_session = scoped_session(sessionmaker())
+
+def engine_options(uri: str) -> Dict[str, Any]:
+    """SQLAlchemy engine options tuned for the database behind a URI"""
+    if uri.startswith('sqlite'):
+        # Wait on locks instead of failing with "database is locked"
+        return {
+            'connect_args': {
+                'timeout': int(os.getenv('DB_BUSY_TIMEOUT_MS', 5000)) / 1000,
+                'check_same_thread': False
+            }
+        }
+
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    }
+
+def install_sqlite_pragmas(engine):
+    """Enable WAL, relaxed fsync and a busy timeout on every new SQLite connection"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    busy_timeout_ms = int(os.getenv('DB_BUSY_TIMEOUT_MS', 5000))
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout={busy_timeout_ms}')
+        cursor.close()
+
+def configure_database(app):
+    """Apply engine options and the optional read replica bind to the app config"""
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(uri)
+
+    replica_uri = os.getenv('DATABASE_REPLICA_URL')
+    if replica_uri:
+        app.config['SQLALCHEMY_BINDS'] = {
+            REPLICA_BIND: dict(engine_options(replica_uri), url=replica_uri)
+        }
+
+def init_engines(app):
+    """Install connection hooks and bind the replica session; call after db.init_app"""
+    with app.app_context():
+        for engine in db.engines.values():
+            install_sqlite_pragmas(engine)
+
+        if REPLICA_BIND in db.engines:
+            replica_session.configure(bind=db.engines[REPLICA_BIND])
+
+    @app.teardown_appcontext
+    def remove_replica_session(exception=None):
+        replica_session.remove()
+
+def read_session():
+    """Session for read-only listings, routed to the replica when one is configured"""
+    if REPLICA_BIND in current_app.config.get('SQLALCHEMY_BINDS', {}):
+        return replica_session
+    return db.session
+
+def read_query(*entities):
+    """Build a read-only query on the replica-aware session"""
+    return read_session().query(*entities)
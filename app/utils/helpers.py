@@ -1,6 +1,8 @@
 import json
 import re
 from typing import Dict, Any
+from app.utils.redaction import redact
+from app.services.error_catalog import get_error_catalog
 
 def format_json(data: Any) -> str:
     """Format data as pretty JSON string"""
@@ -38,18 +40,7 @@ def generate_unique_id(prefix: str = "id") -> str:
 
 def mask_sensitive_data(data: Dict[str, Any]) -> Dict[str, Any]:
     """Mask sensitive data in dictionary"""
-    sensitive_keys = ['secret', 'key', 'token', 'password', 'api_key']
-    masked_data = {}
-    
-    for key, value in data.items():
-        if any(sensitive in key.lower() for sensitive in sensitive_keys):
-            masked_data[key] = "***MASKED***"
-        elif isinstance(value, dict):
-            masked_data[key] = mask_sensitive_data(value)
-        else:
-            masked_data[key] = value
-    
-    return masked_data
+    return redact(data)
 
 def extract_error_details(error_response: Dict[str, Any]) -> Dict[str, Any]:
     """Extract meaningful error details from API response"""
@@ -60,8 +51,21 @@ def extract_error_details(error_response: Dict[str, Any]) -> Dict[str, Any]:
         'suggestions': []
     }
     
+    # Documented gateway errors carry their own meaning and fix
+    known = get_error_catalog().explain(error_response)
+    if known:
+        error_details['description'] = known.get('description') or known.get('message') or known.get('name')
+        error_details['retryable'] = known['retryable']
+        error_details['source'] = known.get('source')
+        error_details['doc'] = known.get('doc')
+        if known.get('fix'):
+            error_details['suggestions'].append(known['fix'])
+        if known['retryable']:
+            error_details['suggestions'].append("Retry with backoff; this error is transient")
+        return error_details
+    
     # Add common suggestions based on error codes
-    error_code = error_details['code'].lower()
+    error_code = str(error_details['code']).lower()
     
     if 'auth' in error_code or 'credential' in error_code:
         error_details['suggestions'].append("Check your API credentials")
@@ -0,0 +1,144 @@
+import json
+import re
+from typing import Any
+
+FENCE_PATTERN = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+BARE_WORDS = {'true': 'true', 'True': 'true', 'false': 'false', 'False': 'false',
+              'null': 'null', 'None': 'null'}
+SMART_QUOTES = str.maketrans({'“': '"', '”': '"', '‘': "'", '’': "'"})
+
+def extract_json_block(text: str) -> str:
+    """Cut the first JSON object or array out of surrounding prose or code fences"""
+    fenced = FENCE_PATTERN.search(text)
+    if fenced:
+        text = fenced.group(1)
+
+    starts = [index for index in (text.find('{'), text.find('[')) if index != -1]
+    if not starts:
+        return text.strip()
+    start = min(starts)
+
+    # Bracket matching that ignores brackets inside strings
+    depth = 0
+    quote = None
+    escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if quote:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '{[':
+            depth += 1
+        elif char in '}]':
+            depth -= 1
+            if depth == 0:
+                return text[start:index + 1]
+
+    # Unterminated: hand the rest to the repair pass
+    return text[start:]
+
+def _repair(text: str) -> str:
+    """Rewrite near-JSON (single quotes, bare keys, Python literals, trailing commas) as JSON"""
+    out = []
+    stack = []
+    index = 0
+    length = len(text)
+
+    while index < length:
+        char = text[index]
+
+        if char in '"\'':
+            # Re-emit every string double-quoted with valid escapes
+            quote = char
+            index += 1
+            chunk = []
+            while index < length and text[index] != quote:
+                if text[index] == '\\' and index + 1 < length:
+                    escaped = text[index + 1]
+                    chunk.append(escaped if escaped == "'" else '\\' + escaped)
+                    index += 2
+                    continue
+                if text[index] == '"':
+                    chunk.append('\\"')
+                elif text[index] == '\n':
+                    chunk.append('\\n')
+                elif text[index] == '\t':
+                    chunk.append('\\t')
+                else:
+                    chunk.append(text[index])
+                index += 1
+            out.append('"' + ''.join(chunk) + '"')
+            index += 1
+            continue
+
+        if char == '/' and text.startswith('//', index):
+            newline = text.find('\n', index)
+            index = length if newline == -1 else newline
+            continue
+
+        if char in '{[':
+            stack.append('}' if char == '{' else ']')
+            out.append(char)
+        elif char in '}]':
+            _drop_trailing_comma(out)
+            if stack:
+                stack.pop()
+            out.append(char)
+        elif char.isalpha() or char == '_':
+            end = index
+            while end < length and (text[end].isalnum() or text[end] in '_-'):
+                end += 1
+            word = text[index:end]
+            if out and out[-1][-1:].isdigit():
+                # Exponent or suffix of a number literal such as 1e5
+                out.append(word)
+            elif word in BARE_WORDS:
+                out.append(BARE_WORDS[word])
+            else:
+                out.append(json.dumps(word))
+            index = end
+            continue
+        else:
+            out.append(char)
+        index += 1
+
+    # Close anything the model left open
+    _drop_trailing_comma(out)
+    while stack:
+        out.append(stack.pop())
+    return ''.join(out)
+
+def _drop_trailing_comma(out: list):
+    """Remove a comma left right before a closing bracket"""
+    position = len(out) - 1
+    while position >= 0 and out[position].isspace():
+        position -= 1
+    if position >= 0 and out[position] == ',':
+        del out[position]
+
+def repair_json(text: str) -> Any:
+    """Parse JSON from model output, repairing common defects locally"""
+    if not isinstance(text, str):
+        raise ValueError("Expected a JSON string")
+
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    candidate = extract_json_block(text.translate(SMART_QUOTES))
+    try:
+        return json.loads(candidate)
+    except ValueError:
+        pass
+
+    try:
+        return json.loads(_repair(candidate))
+    except ValueError as e:
+        raise ValueError(f"Could not repair JSON: {e}")
@@ -0,0 +1,85 @@
+import base64
+import json
+import os
+import zlib
+from typing import Any, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, zlib is always available
+    zstandard = None
+
+# Codec tags stored next to each payload column
+CODEC_JSON = 'json'
+CODEC_ZLIB = 'zlib'
+CODEC_ZSTD = 'zstd'
+
+COMPACT_SEPARATORS = (',', ':')
+
+def _compression_threshold() -> int:
+    """Payloads at or above this many bytes get compressed"""
+    return int(os.getenv('PAYLOAD_COMPRESSION_THRESHOLD', 1024))
+
+def _preferred_codec() -> Optional[str]:
+    """Pick the compression codec from PAYLOAD_COMPRESSION (auto, zstd, zlib, none)"""
+    setting = os.getenv('PAYLOAD_COMPRESSION', 'auto').lower()
+    if setting == 'none':
+        return None
+    if setting == CODEC_ZLIB:
+        return CODEC_ZLIB
+    if zstandard is not None and setting in ('auto', CODEC_ZSTD):
+        return CODEC_ZSTD
+    return CODEC_ZLIB
+
+def compact_json(data: Any) -> str:
+    """Serialize data as JSON without any insignificant whitespace"""
+    return json.dumps(data, separators=COMPACT_SEPARATORS, ensure_ascii=False, default=str)
+
+def encode_payload(data: Any) -> Tuple[Optional[str], Optional[str]]:
+    """Encode a payload for storage, returning (stored_text, codec)"""
+    if data is None:
+        return None, None
+
+    text = compact_json(data)
+    raw = text.encode('utf-8')
+    codec = _preferred_codec()
+
+    if codec is None or len(raw) < _compression_threshold():
+        return text, CODEC_JSON
+
+    if codec == CODEC_ZSTD:
+        compressed = zstandard.ZstdCompressor(level=3).compress(raw)
+    else:
+        compressed = zlib.compress(raw, 6)
+
+    # Only keep the compressed form when it actually saves space
+    encoded = base64.b64encode(compressed).decode('ascii')
+    if len(encoded) >= len(text):
+        return text, CODEC_JSON
+    return encoded, codec
+
+def decode_payload(stored: Optional[str], codec: Optional[str]) -> Any:
+    """Decode a stored payload back into Python data"""
+    if stored is None:
+        return None
+
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to decode zstd payloads")
+        text = zstandard.ZstdDecompressor().decompress(base64.b64decode(stored)).decode('utf-8')
+    elif codec == CODEC_ZLIB:
+        text = zlib.decompress(base64.b64decode(stored)).decode('utf-8')
+    else:
+        text = stored
+
+    # Rows written before codecs existed may hold arbitrary text
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+def reencode_payload(stored: Optional[str], codec: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Rewrite a stored payload with the current compact encoding"""
+    if stored is None:
+        return None, None
+    return encode_payload(decode_payload(stored, codec))
@@ -0,0 +1,222 @@
+import json
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Union
+from app.utils.payload_storage import compact_json
+
+MASK = "***MASKED***"
+
+# Key fragments whose values are always masked; matched against snake_cased keys
+SENSITIVE_KEYS = (
+    'secret', 'password', 'passwd', 'token', 'key', 'access_code', 'authorization',
+    'cvv', 'cvc', 'cvv2', 'pin', 'otp', 'card_hash', 'expiry', 'exp_month', 'exp_year'
+)
+# Keys whose values keep only their last four digits
+CARD_KEYS = ('card_number', 'masked_card_number', 'pan', 'account_number')
+# Short fragments only count as whole words, so "otp" does not hit "footprint"
+WHOLE_WORD = {'otp', 'pan', 'cvv', 'cvc', 'cvv2'}
+# Fragments that name a secret only as the key's last word: access_token, api_key and card_pin,
+# but not prompt_tokens, token_type, key_id or pin_code
+LAST_WORD = {'token', 'key', 'pin'}
+# Identifier keys are kept verbatim: a long order id can pass the Luhn check. A bare "code"
+# holds source code (fix-error jobs), so only prefixed codes like response_code count
+ID_KEY_PATTERN = re.compile(r'(?:^|_)(?:id|ids|ref|reference|rrn|utr)$|_code$')
+
+_LUHN_DOUBLED = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+_UNSEEN = object()
+_CAMEL = re.compile(r'(?<=[a-z0-9])(?=[A-Z])')
+_DIGITS = re.compile(r'\D')
+
+# Value rules; each only runs on strings that contain its cheap marker
+BEARER_PATTERN = re.compile(r'(Bearer\s+)[A-Za-z0-9\-._~+/]+=*', re.IGNORECASE)
+JWT_PATTERN = re.compile(r'eyJ[\w-]{8,}\.[\w-]{8,}\.[\w-]{8,}')
+API_KEY_PATTERN = re.compile(r'\b(?:sk|pk|rk)_(?:live|test)_[A-Za-z0-9]{8,}')
+CVV_PATTERN = re.compile(r'(\b(?:cvv2?|cvc)\b["\']?\s*[:=]?\s*["\']?)\d{3,4}\b', re.IGNORECASE)
+MASKED_CARD_PATTERN = re.compile(r'(?<![\w*])(?:\d{4,6})?[Xx*]{4,}\d{4}(?!\w)')
+PAN_PATTERN = re.compile(r'(?<![\w.])[2-68](?:[ -]?\d){12,18}(?![\w.])')
+VPA_PATTERN = re.compile(r'\b[\w.\-]{2,64}@[A-Za-z][A-Za-z0-9]{1,63}\b(?![.\-@])')
+_NON_DIGITS = str.maketrans('', '', '0123456789')
+# What the rules above and gateways leave behind: ***MASKED***, cvv ***, al***@okhdfc, XXXXXXXX9012
+# and 411111XXXXXX1111
+MASKED_VALUE_PATTERN = re.compile(r'\*\*\*|' + MASKED_CARD_PATTERN.pattern)
+
+def luhn_valid(digits: str) -> bool:
+    """Luhn checksum, so order ids and phone numbers are not taken for card numbers"""
+    total = sum(map(int, digits[-1::-2])) + sum(_LUHN_DOUBLED[int(digit)] for digit in digits[-2::-2])
+    return total % 10 == 0
+
+def mask_card(value: Any) -> str:
+    """Keep only the last four digits of a card or account number; already masked values are kept as they are"""
+    text = str(value)
+    if text == MASK or MASKED_CARD_PATTERN.fullmatch(text.strip()):
+        # Re-masking would shorten XXXXXXXXXXXX1111 and drop a gateway's BIN, so redaction stays idempotent
+        return text
+    digits = _DIGITS.sub('', text)
+    if len(digits) < 4:
+        return MASK
+    return 'X' * max(len(digits) - 4, 8) + digits[-4:]
+
+def _mask_vpa(match: re.Match) -> str:
+    handle, provider = match.group().split('@', 1)
+    return f"{handle[:2]}***@{provider}"
+
+class Redactor:
+    """Masks secrets and card data in payloads, conversation turns and log text
+
+    Key rules are compiled into one regex and memoized per key. Value rules
+    are gated by substring checks, so a string is only scanned by the
+    patterns it could match. Dicts, lists and tuples are
+    traversed to any depth and a redacted copy is returned.
+    """
+
+    def __init__(self, extra_keys: Iterable[str] = (), cache_size: int = 4096):
+        keys = tuple(SENSITIVE_KEYS) + tuple(key.strip().lower() for key in extra_keys if key.strip())
+        self.key_pattern = re.compile('|'.join(
+            rf'(?:^|_){re.escape(key)}$' if key in LAST_WORD else
+            rf'(?:^|_){re.escape(key)}(?:_|$)' if key in WHOLE_WORD else re.escape(key)
+            for key in sorted(set(keys), key=len, reverse=True)))
+        self.card_pattern = re.compile('|'.join(rf'(?:^|_){re.escape(key)}$' for key in CARD_KEYS))
+        self.cache_size = cache_size
+        self._key_actions: Dict[str, Optional[Callable[[Any], Any]]] = {}
+
+    def _key_action(self, key: str) -> Optional[Callable[[Any], Any]]:
+        """How a key's value is masked, or None when the key is not sensitive"""
+        try:
+            return self._key_actions[key]
+        except KeyError:
+            pass
+        normalized = _CAMEL.sub('_', key).lower().replace('-', '_')
+        if self.card_pattern.search(normalized):
+            action = mask_card
+        elif self.key_pattern.search(normalized):
+            action = _mask_value
+        elif ID_KEY_PATTERN.search(normalized):
+            action = _keep_value
+        else:
+            action = None
+        if len(self._key_actions) >= self.cache_size:
+            self._key_actions.clear()
+        self._key_actions[key] = action
+        return action
+
+    def redact(self, data: Any) -> Any:
+        """Redacted copy of a payload"""
+        kind = type(data)
+        if kind is dict:
+            return self._redact_dict(data)
+        if kind is list or kind is tuple:
+            return [self.redact(item) for item in data]
+        if kind is str:
+            return self.redact_text(data)
+        if isinstance(data, dict):
+            return self._redact_dict(data)
+        if isinstance(data, (list, tuple)):
+            return [self.redact(item) for item in data]
+        return data
+
+    def _redact_dict(self, data: Dict[Any, Any]) -> Dict[Any, Any]:
+        # Scalars are handled inline: this loop runs for every key of every payload
+        actions = self._key_actions
+        redacted = {}
+        for key, value in data.items():
+            action = actions.get(key, _UNSEEN)
+            if action is _UNSEEN:
+                action = self._key_action(key) if isinstance(key, str) else None
+            kind = type(value)
+            if kind is str:
+                if action is not None:
+                    redacted[key] = action(value)
+                else:
+                    redacted[key] = self.redact_text(value)
+            elif value is None or kind is bool:
+                redacted[key] = value
+            elif kind is int or kind is float:
+                redacted[key] = value if action is None else action(value)
+            else:
+                redacted[key] = self.redact(value)
+        return redacted
+
+    def redact_text(self, text: str) -> str:
+        """Mask card numbers, CVVs, VPAs and tokens inside free text"""
+        if len(text) < 8:
+            return text
+        # Substring checks are far cheaper than a regex scan and rule out most strings
+        if 'earer' in text or 'EARER' in text:
+            text = BEARER_PATTERN.sub(_mask_bearer, text)
+        if 'eyJ' in text:
+            text = JWT_PATTERN.sub(MASK, text)
+        if '_live_' in text or '_test_' in text:
+            text = API_KEY_PATTERN.sub(MASK, text)
+        if 'cv' in text or 'CV' in text:
+            text = CVV_PATTERN.sub(_mask_cvv, text)
+        if len(text) - len(text.translate(_NON_DIGITS)) >= 13:
+            text = PAN_PATTERN.sub(_mask_pan, text)
+        if '@' in text:
+            text = VPA_PATTERN.sub(_mask_vpa, text)
+        return text
+
+    def redact_ndjson(self, lines: Iterable[Union[str, bytes]]) -> Iterator[str]:
+        """Redact an NDJSON stream line by line; lines that are not JSON are redacted as text"""
+        for line in lines:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            stripped = line.strip()
+            if not stripped:
+                continue
+            try:
+                record = json.loads(stripped)
+            except ValueError:
+                yield self.redact_text(stripped) + '\n'
+                continue
+            yield compact_json(self.redact(record)) + '\n'
+
+def _mask_value(value: Any) -> str:
+    return MASK
+
+def _keep_value(value: Any) -> Any:
+    return value
+
+def _mask_bearer(match: re.Match) -> str:
+    return match.group(1) + MASK
+
+def _mask_cvv(match: re.Match) -> str:
+    return match.group(1) + '***'
+
+def _mask_pan(match: re.Match) -> str:
+    digits = _DIGITS.sub('', match.group())
+    return mask_card(digits) if luhn_valid(digits) else match.group()
+
+_redactor = None
+_redactor_lock = threading.Lock()
+
+def get_redactor() -> Redactor:
+    """Get the process-wide redactor (REDACTION_EXTRA_KEYS adds comma-separated key fragments)"""
+    global _redactor
+    if _redactor is None:
+        with _redactor_lock:
+            if _redactor is None:
+                _redactor = Redactor(extra_keys=os.getenv('REDACTION_EXTRA_KEYS', '').split(','))
+    return _redactor
+
+def redact(data: Any) -> Any:
+    """Redacted copy of a payload"""
+    return get_redactor().redact(data)
+
+def redact_text(text: str) -> str:
+    """Mask sensitive values inside free text"""
+    return get_redactor().redact_text(text)
+
+def redact_ndjson(lines: Iterable[Union[str, bytes]]) -> Iterator[str]:
+    """Redact an NDJSON stream line by line"""
+    return get_redactor().redact_ndjson(lines)
+
+def is_masked(data: Any) -> bool:
+    """Whether a payload holds values the redactor masked, so it is no longer what was sent"""
+    if isinstance(data, str):
+        return MASKED_VALUE_PATTERN.search(data) is not None
+    if isinstance(data, dict):
+        return any(is_masked(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(is_masked(value) for value in data)
+    return False
@@ -0,0 +1,148 @@
+import copy
+import hashlib
+import inspect
+import json
+import threading
+from functools import partial, wraps
+from typing import Any, Callable, Dict
+
+class _Call:
+    """An in-flight call that followers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+        self.shared = True
+
+class SingleFlight:
+    """Runs one upstream call per key at a time and shares its outcome with concurrent callers"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+
+    def do(self, key: str, func: Callable, *args, share: Callable[[], bool] = None, **kwargs) -> Any:
+        """Call func, or wait for the identical call already in flight
+
+        share runs in the leader's thread after func returns; when it says
+        no, followers call func themselves instead of taking the result.
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+            else:
+                call.followers += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            if not call.shared:
+                return func(*args, **kwargs)
+            # call.result is a snapshot nobody returns, so each follower copies it safely
+            return copy.deepcopy(call.result)
+
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        else:
+            call.shared = share is None or share()
+            with self._lock:
+                self._forget(key, call)
+                followers = call.followers
+            # The snapshot is taken before the leader returns, so its caller cannot mutate it under the followers
+            if followers and call.shared:
+                call.result = copy.deepcopy(result)
+            return result
+        finally:
+            with self._lock:
+                self._forget(key, call)
+            call.done.set()
+
+    def _forget(self, key: str, call: _Call):
+        # Once the key is released a new leader may own it; only remove our own entry
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def metrics(self) -> Dict[str, Any]:
+        """Calls seen, upstream executions and the coalescing ratio"""
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executions': self.executions,
+                'coalesced': self.calls - self.executions,
+                'in_flight': len(self._calls),
+                'coalescing_ratio': round(self.calls / self.executions, 3) if self.executions else 1.0
+            }
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+_enabled = True
+
+def disable():
+    """Call decorated functions directly in this process, e.g. single-threaded batch workers"""
+    global _enabled
+    _enabled = False
+
+def get_group(name: str) -> SingleFlight:
+    """Get or create a named coalescing group"""
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name)
+        return _groups[name]
+
+def all_metrics() -> Dict[str, Dict[str, Any]]:
+    """Metrics for every coalescing group"""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {group.name: group.metrics() for group in groups}
+
+def canonical_key(*parts: Any) -> str:
+    """Stable hash of JSON-serializable request parts, independent of dict key order"""
+    encoded = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def coalesce(group: str, share: Callable[[], bool] = None):
+    """Decorator sharing one execution among concurrent identical calls
+
+    share, when given, decides in the leader's thread whether its result may
+    go to the followers (see SingleFlight.do). Arguments are bound to the signature with defaults applied, so f(1),
+    f(x=1) and f(1, y=<default>) share a key. On methods the instance is
+    left out of the key, so calls from different service instances with the
+    same arguments are coalesced too.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        parameters = list(signature.parameters)
+        is_method = bool(parameters) and parameters[0] == 'self'
+        flight = get_group(group)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            try:
+                bound = signature.bind(*args, **kwargs)
+            except TypeError:
+                # Let the call itself raise the usual error for bad arguments
+                return func(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            if is_method:
+                arguments.pop('self')
+            key = canonical_key(func.__qualname__, arguments)
+            return flight.do(key, partial(func, *args, **kwargs), share=share)
+        return wrapper
+    return decorator
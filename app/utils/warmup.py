@@ -0,0 +1,18 @@
+from typing import Callable, List
+
+# Hooks that load templates, indexes and catalogs before worker processes fork
+_warmup_hooks: List[Callable] = []
+
+def register_warmup(func: Callable) -> Callable:
+    """Register a function(app) to run once before the server forks workers"""
+    _warmup_hooks.append(func)
+    return func
+
+def warm_up(app):
+    """Compile every template and run the registered warm-up hooks"""
+    with app.app_context():
+        for template_name in app.jinja_env.list_templates():
+            app.jinja_env.get_template(template_name)
+
+        for hook in _warmup_hooks:
+            hook(app)
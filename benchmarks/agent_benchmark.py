@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Routing and latency benchmark for the ReAct agent.
+
+Runs the scenarios in benchmarks/agent_scenarios.json (the react_demo cases
+plus variants) and support-ticket subjects from the Support Data CSV through
+ReActAgent.reason_and_act against the offline LLM stand-in, and reports
+routing accuracy, LLM calls and tokens per request, and end-to-end p50/p99.
+
+    python benchmarks/agent_benchmark.py --latency-ms 200 --save-baseline baseline.json
+    python benchmarks/agent_benchmark.py --latency-ms 200 --baseline baseline.json
+
+With --baseline the exit status is 1 when accuracy drops or p99 latency,
+LLM calls or tokens per request grow by more than --max-regression percent.
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCENARIOS_PATH = os.path.join(ROOT, 'benchmarks', 'agent_scenarios.json')
+SUPPORT_CSV_PATH = os.path.join(ROOT, 'AirTribe', 'Support Data(Sheet1).csv')
+# Ticket prefixes and ids that carry no meaning for routing
+SUBJECT_NOISE = re.compile(r"^((re|fw|fwd)\s*:\s*)+|\[#+[^\]]*#+\]|\(\s*newticket\s*$", re.IGNORECASE)
+
+def load_scenarios(support_limit: int) -> list:
+    """Hand-written scenarios plus de-duplicated support ticket subjects"""
+    with open(SCENARIOS_PATH) as f:
+        scenarios = json.load(f)
+
+    if support_limit and os.path.exists(SUPPORT_CSV_PATH):
+        seen = set()
+        with open(SUPPORT_CSV_PATH, newline='', encoding='utf-8', errors='replace') as f:
+            for row in csv.DictReader(f):
+                subject = ' '.join(SUBJECT_NOISE.sub(' ', row.get('Subject') or '').split())
+                if len(subject) < 15 or subject.lower() in seen:
+                    continue
+                seen.add(subject.lower())
+                # Support questions should be answered, not turned into actions
+                scenarios.append({
+                    'id': f"support-{row.get('Case Number')}",
+                    'category': 'support',
+                    'message': subject,
+                    'expected_action': None
+                })
+                if len(seen) >= support_limit:
+                    break
+    return scenarios
+
+def percentile(ordered: list, percentile: float) -> float:
+    """Nearest-rank percentile of sorted samples"""
+    if not ordered:
+        return 0.0
+    rank = max(0, math.ceil(percentile / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+def summarize(samples: list) -> dict:
+    """Aggregate per-request samples"""
+    latencies = sorted(sample['latency_ms'] for sample in samples)
+    count = len(samples)
+    return {
+        'requests': count,
+        'routing_accuracy': round(sum(sample['routed_correctly'] for sample in samples) / count, 4),
+        'llm_calls_per_request': round(sum(sample['llm_calls'] for sample in samples) / count, 3),
+        'tokens_per_request': round(sum(sample['tokens'] for sample in samples) / count, 1),
+        'cache_hits': sum(sample['cached'] for sample in samples),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p99_ms': round(percentile(latencies, 99), 2)
+    }
+
+def run(scenarios: list, repeat: int) -> dict:
+    """Send every scenario through a fresh agent and collect samples"""
+    from app.services.llm_client import get_llm_client
+    from app.services.react_agent import ReActAgent
+
+    llm = get_llm_client()
+    samples = []
+    misrouted = []
+
+    for _ in range(repeat):
+        for scenario in scenarios:
+            agent = ReActAgent()
+            requests_before = llm.usage_totals['requests']
+            tokens_before = llm.usage_totals['total_tokens']
+
+            started = time.perf_counter()
+            # The agent logs each step to stdout; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                response = agent.reason_and_act(scenario['message'], scenario.get('context', {}))
+            latency_ms = (time.perf_counter() - started) * 1000
+
+            routed_correctly = response.get('action_taken') == scenario['expected_action']
+            if not routed_correctly:
+                misrouted.append((scenario['id'], scenario['expected_action'], response.get('action_taken')))
+            samples.append({
+                'category': scenario['category'],
+                'latency_ms': latency_ms,
+                'routed_correctly': routed_correctly,
+                'llm_calls': llm.usage_totals['requests'] - requests_before,
+                'tokens': llm.usage_totals['total_tokens'] - tokens_before,
+                'cached': response.get('reasoning', '').startswith('Answered from a previous reply')
+            })
+
+    by_category = defaultdict(list)
+    for sample in samples:
+        by_category[sample['category']].append(sample)
+
+    return {
+        'overall': summarize(samples),
+        'categories': {category: summarize(items) for category, items in sorted(by_category.items())},
+        'misrouted': sorted(set(misrouted))
+    }
+
+def print_report(results: dict):
+    columns = ('requests', 'routing_accuracy', 'llm_calls_per_request', 'tokens_per_request', 'p50_ms', 'p99_ms')
+    headers = ('requests', 'accuracy', 'llm calls', 'tokens', 'p50 ms', 'p99 ms')
+    print(f"{'category':<18}" + ''.join(f"{header:>12}" for header in headers))
+    rows = list(results['categories'].items()) + [('overall', results['overall'])]
+    for name, summary in rows:
+        print(f"{name:<18}" + ''.join(f"{summary[column]:>12}" for column in columns))
+
+    if results['misrouted']:
+        print("\nMisrouted:")
+        for scenario_id, expected, actual in results['misrouted']:
+            print(f"  {scenario_id}: expected {expected}, got {actual}")
+
+def compare(results: dict, baseline: dict, max_regression: float) -> bool:
+    """Print deltas against a saved baseline; False when something regressed"""
+    print(f"\n{'vs baseline':<24}{'baseline':>12}{'current':>12}{'change':>10}")
+    ok = True
+    current, previous = results['overall'], baseline['overall']
+
+    for metric in ('routing_accuracy', 'llm_calls_per_request', 'tokens_per_request', 'p50_ms', 'p99_ms'):
+        before, after = previous[metric], current[metric]
+        change = (after - before) / before * 100 if before else 0.0
+        if metric == 'routing_accuracy':
+            regressed = after < before
+        else:
+            regressed = metric != 'p50_ms' and change > max_regression
+        ok = ok and not regressed
+        flag = '  ❌' if regressed else ''
+        print(f"{metric:<24}{before:>12}{after:>12}{change:>+9.1f}%{flag}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency-ms', type=float, default=50, help='Simulated latency per LLM call')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Uniform random extra latency per call')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--support-limit', type=int, default=40, help='Support CSV subjects to include')
+    parser.add_argument('--save-baseline', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against a saved baseline JSON file')
+    parser.add_argument('--max-regression', type=float, default=10, help='Allowed growth in percent')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['LLM_BACKEND'] = 'offline'
+    os.environ['LLM_OFFLINE_LATENCY_MS'] = str(args.latency_ms)
+    os.environ['LLM_OFFLINE_JITTER_MS'] = str(args.jitter_ms)
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'agent_benchmark.db')}"
+    os.environ.setdefault('STATE_BACKEND', 'memory')
+
+    from app import create_app
+
+    scenarios = load_scenarios(args.support_limit)
+    app = create_app()
+    with app.app_context():
+        results = run(scenarios, args.repeat)
+
+    results['config'] = {
+        'latency_ms': args.latency_ms,
+        'jitter_ms': args.jitter_ms,
+        'repeat': args.repeat,
+        'scenarios': len(scenarios)
+    }
+    print_report(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('config', {}).get('latency_ms') != args.latency_ms:
+            print("⚠️ Baseline was recorded with a different --latency-ms")
+        if not compare(results, baseline, args.max_regression):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
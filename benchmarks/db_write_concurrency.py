@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Concurrent write benchmark for the integration table on SQLite.
+
+Compares the default engine setup against the tuned one from
+app.utils.database (WAL, synchronous=NORMAL, busy_timeout) with several
+threads inserting integration rows while others run dashboard-style reads.
+
+    python benchmarks/db_write_concurrency.py --writers 8 --readers 4 --seconds 10
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.exc import OperationalError
+from app.models import Integration
+from app.utils.database import engine_options, install_sqlite_pragmas
+
+table = Integration.__table__
+
+def run(engine, writers: int, readers: int, seconds: float) -> dict:
+    """Hammer the engine with writer and reader threads for a fixed duration"""
+    table.create(engine, checkfirst=True)
+    stop = threading.Event()
+    lock = threading.Lock()
+    totals = {'writes': 0, 'reads': 0, 'locked_errors': 0}
+
+    def writer(worker_id: int):
+        writes = errors = 0
+        while not stop.is_set():
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(table).values(
+                        merchant_id=f"bench_{worker_id}",
+                        integration_type='payment',
+                        status='success',
+                        request_payload='{"amount":100}',
+                        request_codec='json',
+                        created_at=datetime.utcnow(),
+                        updated_at=datetime.utcnow()
+                    ))
+                writes += 1
+            except OperationalError:
+                errors += 1
+        with lock:
+            totals['writes'] += writes
+            totals['locked_errors'] += errors
+
+    def reader():
+        reads = 0
+        while not stop.is_set():
+            try:
+                with engine.connect() as conn:
+                    conn.execute(select(table.c.status, func.count()).group_by(table.c.status)).all()
+                reads += 1
+            except OperationalError:
+                pass
+        with lock:
+            totals['reads'] += reads
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    totals['writes_per_sec'] = totals['writes'] / seconds
+    totals['reads_per_sec'] = totals['reads'] / seconds
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'default.db')}"
+        results['default'] = run(create_engine(url), args.writers, args.readers, args.seconds)
+
+        url = f"sqlite:///{os.path.join(tmp, 'tuned.db')}"
+        engine = create_engine(url, **engine_options(url))
+        install_sqlite_pragmas(engine)
+        results['tuned'] = run(engine, args.writers, args.readers, args.seconds)
+
+    print(f"{'engine':<10}{'writes/s':>12}{'reads/s':>12}{'locked':>10}")
+    for name, totals in results.items():
+        print(f"{name:<10}{totals['writes_per_sec']:>12.1f}{totals['reads_per_sec']:>12.1f}{totals['locked_errors']:>10}")
+
+    if results['default']['writes_per_sec']:
+        speedup = results['tuned']['writes_per_sec'] / results['default']['writes_per_sec']
+        print(f"\nWrite throughput: {speedup:.2f}x")
+
+if __name__ == '__main__':
+    main()
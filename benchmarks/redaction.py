@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Redaction throughput and leak benchmark.
+
+Generates gateway-shaped payloads (Fetch Order responses with payments[] card
+details, webhook bodies, UPI collect requests, agent turns with card numbers
+in free text) and runs them through the previous key-substring masker and the
+compiled Redactor. Reports payloads per second, MB per second and how many
+planted secrets survive each one, and checks that redacting twice changes
+nothing.
+
+    python benchmarks/redaction.py --payloads 20000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.redaction import Redactor, luhn_valid  # noqa: E402
+
+def legacy_mask(data):
+    """helpers.mask_sensitive_data before the redaction engine"""
+    sensitive_keys = ['secret', 'key', 'token', 'password', 'api_key']
+    masked_data = {}
+    for key, value in data.items():
+        if any(sensitive in key.lower() for sensitive in sensitive_keys):
+            masked_data[key] = "***MASKED***"
+        elif isinstance(value, dict):
+            masked_data[key] = legacy_mask(value)
+        else:
+            masked_data[key] = value
+    return masked_data
+
+def card_number(rng: random.Random) -> str:
+    """A Luhn-valid 16 digit card number"""
+    while True:
+        digits = str(rng.choice([4, 5, 6])) + ''.join(str(rng.randint(0, 9)) for _ in range(15))
+        if luhn_valid(digits):
+            return digits
+
+def make_payloads(count: int, seed: int) -> list:
+    """Payloads with the secrets planted in each, for leak counting"""
+    rng = random.Random(seed)
+    payloads = []
+    for index in range(count):
+        pan, cvv, vpa = card_number(rng), f"{rng.randint(100, 999)}", f"user{index}@okhdfcbank"
+        token = f"sk_live_{rng.getrandbits(64):016x}"
+        kind = index % 4
+        if kind == 0:
+            payload = {
+                'data': {
+                    'order_id': f"v1-{rng.getrandbits(40)}",
+                    'merchant_order_reference': f"ORD{index:08d}",
+                    'status': 'PROCESSED',
+                    'amount': {'value': rng.randint(100, 500000), 'currency': 'INR'},
+                    'payments': [{
+                        'id': f"pay-{index}",
+                        'payment_method': 'CARD',
+                        'payment_option': {'card_details': {
+                            'card_number': pan, 'cvv': cvv, 'expiry_month': '12', 'expiry_year': '2030',
+                            'name': 'Card Holder'
+                        }},
+                        'acquirer_data': {'rrn': f"{rng.randint(10 ** 11, 10 ** 12 - 1)}"}
+                    }]
+                }
+            }
+        elif kind == 1:
+            payload = {
+                'event_name': 'payment.captured',
+                'merchant_response': {
+                    'merchant_id': '113484',
+                    'merchant_access_code': token,
+                    'unique_merchant_txn_id': f"{rng.getrandbits(56)}",
+                    'payment_mode': 'CREDIT_DEBIT_CARD',
+                    'masked_card_number': f"{pan[:6]}******{pan[-4:]}",
+                    'salted_card_hash': f"{rng.getrandbits(128):032X}",
+                    'txn_response_msg': 'SUCCESS',
+                    'notes': f"card {pan} charged"
+                }
+            }
+        elif kind == 2:
+            payload = {
+                'merchant_order_id': f"ORD{index:08d}",
+                'amount': rng.randint(100, 500000),
+                'currency': 'INR',
+                'payment_method': 'UPI',
+                'upi_details': {'txn_mode': 'COLLECT', 'payer': {'vpa': vpa, 'phone': f"9{rng.randint(10 ** 8, 10 ** 9 - 1)}"}},
+                'headers': {'Authorization': f"Bearer {token}"}
+            }
+        else:
+            payload = {
+                'role': 'user',
+                'content': f"Payment with card {pan[:4]} {pan[4:8]} {pan[8:12]} {pan[12:]} and cvv: {cvv} failed, "
+                           f"refund to {vpa} please. My key is {token}",
+                'context': {'api_key': token, 'history': [{'message': f"tried {pan}"}]}
+            }
+        payloads.append((payload, [pan, vpa, token]))
+    return payloads
+
+def leaks(redacted, secrets) -> int:
+    text = json.dumps(redacted)
+    return sum(1 for secret in secrets if secret in text)
+
+def run(name: str, func, payloads: list, size_mb: float) -> dict:
+    start = time.perf_counter()
+    outputs = [func(payload) for payload, _ in payloads]
+    elapsed = time.perf_counter() - start
+    leaked = sum(leaks(output, secrets) for output, (_, secrets) in zip(outputs, payloads))
+    return {
+        'name': name,
+        'payloads_per_s': round(len(payloads) / elapsed),
+        'mb_per_s': round(size_mb / elapsed, 1),
+        'us_per_payload': round(elapsed / len(payloads) * 1e6, 1),
+        'leaked': leaked
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--payloads', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.payloads, args.seed)
+    planted = sum(len(secrets) for _, secrets in payloads)
+    size_mb = sum(len(json.dumps(payload)) for payload, _ in payloads) / 1e6
+    redactor = Redactor()
+
+    results = [
+        run('legacy', legacy_mask, payloads, size_mb),
+        run('redactor', redactor.redact, payloads, size_mb)
+    ]
+    lines = [json.dumps(payload) + '\n' for payload, _ in payloads]
+    start = time.perf_counter()
+    for _ in redactor.redact_ndjson(lines):
+        pass
+    ndjson_elapsed = time.perf_counter() - start
+
+    print(f"{args.payloads} payloads, {size_mb:.1f} MB, {planted} planted secrets")
+    print(f"{'masker':<10}{'payloads/s':>12}{'MB/s':>8}{'us/payload':>12}{'leaked':>8}")
+    for result in results:
+        print(f"{result['name']:<10}{result['payloads_per_s']:>12}{result['mb_per_s']:>8}"
+              f"{result['us_per_payload']:>12}{result['leaked']:>8}")
+    print(f"NDJSON stream: {len(lines) / ndjson_elapsed:.0f} lines/s, {size_mb / ndjson_elapsed:.1f} MB/s")
+
+    # Stored rows are redacted again on export, import and replay, which must not change them
+    redacted = [redactor.redact(payload) for payload, _ in payloads]
+    changed = sum(1 for once in redacted if redactor.redact(once) != once)
+    print(f"Re-redacted payloads changed: {changed}")
+    assert changed == 0, "redaction is not idempotent"
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Stub Fetch Order gateway and status polling comparison.
+
+Orders on the stub move CREATED -> PENDING -> PROCESSED (or FAILED) after a
+random settle time. The benchmark compares naive fixed-interval polling of
+every order with StatusPoller (adaptive backoff, batched fetches) and reports
+upstream requests and how long after settling each order was noticed.
+
+    python benchmarks/status_polling.py --orders 200 --settle-mean 2 --slow-mean 20
+    python benchmarks/status_polling.py --serve --port 8099   # stub only
+
+With the stub running, `PINE_LABS_BASE_URL=http://127.0.0.1:8099 flask integrations poll`
+polls pending integrations against it.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ORDER_PATH = re.compile(r"^/api/pay/v1/orders/reference/([^/?]+)")
+
+class StubGateway:
+    """Local Fetch Order endpoint with a realistic pending lifecycle"""
+
+    def __init__(self, settle_mean: float, slow_fraction: float = 0.2, slow_mean: float = None,
+                 failure_rate: float = 0.1, port: int = 0):
+        self.settle_mean = settle_mean
+        # A slow minority (customer still on the bank page, UPI collect) gives the long tail
+        self.slow_fraction = slow_fraction
+        self.slow_mean = slow_mean or settle_mean * 10
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self.first_seen = {}
+        self._lock = threading.Lock()
+
+        gateway = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                match = ORDER_PATH.match(self.path)
+                if not match:
+                    self.send_error(404)
+                    return
+                body = json.dumps({'data': gateway.order(match.group(1))}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def settle_time(self, order_id: str) -> float:
+        """Deterministic per-order settle time"""
+        rng = random.Random(zlib.crc32(order_id.encode()))
+        mean = self.slow_mean if rng.random() < self.slow_fraction else self.settle_mean
+        return rng.expovariate(1 / mean)
+
+    def create(self, order_ids: list):
+        """Start the settle clock of new orders"""
+        now = time.monotonic()
+        with self._lock:
+            for order_id in order_ids:
+                self.first_seen.setdefault(order_id, now)
+
+    def order(self, order_id: str) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            self.requests += 1
+            started = self.first_seen.setdefault(order_id, now)
+        elapsed = now - started
+        settle = self.settle_time(order_id)
+
+        if elapsed < settle * 0.3:
+            status = 'CREATED'
+        elif elapsed < settle:
+            status = 'PENDING'
+        else:
+            failed = random.Random(zlib.crc32(order_id.encode()) + 1).random() < self.failure_rate
+            status = 'FAILED' if failed else 'PROCESSED'
+        return {'merchant_order_reference': order_id, 'status': status}
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+def naive_polling(gateway: StubGateway, order_ids: list, interval: float, workers: int) -> dict:
+    """Fetch every unsettled order one request at a time on a fixed interval"""
+    from app.services.pine_labs import PineLabsService
+
+    service = PineLabsService()
+    pending = set(order_ids)
+    noticed = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending:
+            results = executor.map(lambda order_id: service.fetch_orders([order_id]), list(pending))
+            now = time.monotonic()
+            for result in results:
+                for order_id, data in result.items():
+                    if data.get('status') in ('PROCESSED', 'FAILED'):
+                        pending.discard(order_id)
+                        noticed[order_id] = now
+            if pending:
+                time.sleep(interval)
+    return noticed
+
+def adaptive_polling(gateway: StubGateway, order_ids: list, workers: int, batch_size: int,
+                     initial_delay: float, max_delay: float, backoff: float) -> dict:
+    """Poll with StatusPoller, recording when each order was seen settled"""
+    from app.services.pine_labs import PineLabsService
+    from app.services.status_poller import StatusPoller
+
+    noticed = {}
+
+    class BenchmarkPoller(StatusPoller):
+        # No database here: record settle times instead of writing back
+        def flush(self):
+            with self._lock:
+                settled, self._settled = self._settled, []
+            now = time.monotonic()
+            for entry, _, _ in settled:
+                noticed.setdefault(entry.order_id, now)
+            return len(settled)
+
+    poller = BenchmarkPoller(
+        fetch_orders=PineLabsService().fetch_orders,
+        initial_delay=initial_delay,
+        max_delay=max_delay,
+        backoff=backoff,
+        batch_size=batch_size,
+        workers=workers,
+        write_batch_size=1
+    )
+    for index, order_id in enumerate(order_ids):
+        poller.track(index, order_id)
+    poller.run()
+    return noticed
+
+def summarize(gateway: StubGateway, noticed: dict, requests: int) -> dict:
+    """Upstream requests and notice lag after each order actually settled"""
+    lags = sorted(noticed[order_id] - (gateway.first_seen[order_id] + gateway.settle_time(order_id))
+                  for order_id in noticed)
+    return {
+        'requests': requests,
+        'requests_per_order': round(requests / len(noticed), 2),
+        'p50_lag_s': round(lags[len(lags) // 2], 2),
+        'p99_lag_s': round(lags[min(len(lags) - 1, int(len(lags) * 0.99))], 2)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=200)
+    parser.add_argument('--settle-mean', type=float, default=2, help='Mean seconds until a typical order settles')
+    parser.add_argument('--slow-fraction', type=float, default=0.2, help='Share of orders in the slow tail')
+    parser.add_argument('--slow-mean', type=float, default=20, help='Mean settle seconds of slow orders')
+    parser.add_argument('--naive-interval', type=float, default=1, help='Naive polling interval in seconds')
+    parser.add_argument('--initial-delay', type=float, default=1)
+    # The notice lag of a slow order approaches the backoff cap, so the cap sets the p99
+    parser.add_argument('--max-delay', type=float, default=2)
+    parser.add_argument('--backoff', type=float, default=1.5)
+    parser.add_argument('--batch-size', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--serve', action='store_true', help='Only run the stub gateway')
+    parser.add_argument('--port', type=int, default=8099)
+    args = parser.parse_args()
+
+    if args.serve:
+        gateway = StubGateway(args.settle_mean, args.slow_fraction, args.slow_mean, port=args.port)
+        print(f"🧪 Stub gateway on {gateway.url} (settle mean {args.settle_mean}s)")
+        gateway.server.serve_forever()
+        return
+
+    results = {}
+    for name in ('naive', 'adaptive'):
+        gateway = StubGateway(args.settle_mean, args.slow_fraction, args.slow_mean).start()
+        os.environ['PINE_LABS_BASE_URL'] = gateway.url
+        order_ids = [f"{name}-{index}" for index in range(args.orders)]
+        gateway.create(order_ids)
+        if name == 'naive':
+            noticed = naive_polling(gateway, order_ids, args.naive_interval, args.workers)
+        else:
+            noticed = adaptive_polling(gateway, order_ids, args.workers, args.batch_size,
+                                       args.initial_delay, args.max_delay, args.backoff)
+        results[name] = summarize(gateway, noticed, gateway.requests)
+        gateway.stop()
+
+    print(f"{'strategy':<10}{'requests':>10}{'req/order':>12}{'p50 lag s':>12}{'p99 lag s':>12}")
+    for name, summary in results.items():
+        print(f"{name:<10}{summary['requests']:>10}{summary['requests_per_order']:>12}"
+              f"{summary['p50_lag_s']:>12}{summary['p99_lag_s']:>12}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""Add payload codec columns
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Existing rows keep a NULL codec and are read as plain JSON until
+    # `flask integrations compact-payloads` rewrites them
+    with op.batch_alter_table('integration') as batch_op:
+        batch_op.add_column(sa.Column('request_codec', sa.String(length=10), nullable=True))
+        batch_op.add_column(sa.Column('response_codec', sa.String(length=10), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table('integration') as batch_op:
+        batch_op.drop_column('response_codec')
+        batch_op.drop_column('request_codec')
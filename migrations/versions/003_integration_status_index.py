@@ -0,0 +1,20 @@
+"""Index integration status and creation time
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index('ix_integration_status_created_at', 'integration', ['status', 'created_at'])
+
+def downgrade():
+    op.drop_index('ix_integration_status_created_at', table_name='integration')
@@ -0,0 +1,44 @@
+"""Add the background job table
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('job',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('priority', sa.Integer(), nullable=True),
+        sa.Column('merchant_id', sa.String(length=100), nullable=True),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('result', sa.Text(), nullable=True),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('progress', sa.Integer(), nullable=True),
+        sa.Column('stage', sa.String(length=50), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('max_attempts', sa.Integer(), nullable=True),
+        sa.Column('locked_by', sa.String(length=100), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+        sa.Column('run_after', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_job_status_priority_created_at', 'job', ['status', 'priority', 'created_at'])
+
+def downgrade():
+    op.drop_index('ix_job_status_priority_created_at', table_name='job')
+    op.drop_table('job')
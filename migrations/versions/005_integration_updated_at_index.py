@@ -0,0 +1,20 @@
+"""Index integration update time
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index('ix_integration_updated_at', 'integration', ['updated_at'])
+
+def downgrade():
+    op.drop_index('ix_integration_updated_at', table_name='integration')
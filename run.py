@@ -3,12 +3,29 @@
 Pine Labs Integration Assistant - Startup Script
 """
 
+import argparse
 import os
 import sys
 from app import create_app
+from app.server import serve, default_workers, default_threads
+from app.services.job_queue import start_job_workers
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Pine Labs Integration Assistant")
+    parser.add_argument('--production', action='store_true',
+                        help='Serve with multiple workers instead of the Flask dev server')
+    parser.add_argument('--workers', type=int, default=default_workers(),
+                        help='Worker processes in production mode (WEB_CONCURRENCY)')
+    parser.add_argument('--threads', type=int, default=default_threads(),
+                        help='Threads per worker in production mode (WEB_THREADS)')
+    parser.add_argument('--graceful-timeout', type=int, default=int(os.environ.get('GRACEFUL_TIMEOUT', 30)),
+                        help='Seconds to let in-flight requests finish on shutdown')
+    return parser.parse_args()
 
 def main():
     """Main entry point for the application"""
+    args = parse_args()
     app = create_app()
     
     # Get port from environment or use default
@@ -18,12 +35,23 @@ def main():
     print(f"📡 Server will run on http://localhost:{port}")
     print("🎯 Open your browser and navigate to the URL above")
     
+    if args.production:
+        print(f"⚙️  Production mode: {args.workers} workers x {args.threads} threads")
+        serve(app, '0.0.0.0', port, args.workers, args.threads, args.graceful_timeout)
+        return
+    
+    debug = os.environ.get('FLASK_ENV') == 'development'
+    
+    # With the reloader only the serving child runs jobs, not the watching parent
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_job_workers(app)
+    
     # Run the application
     app.run(
         host='0.0.0.0',
         port=port,
-        debug=os.environ.get('FLASK_ENV') == 'development'
+        debug=debug
     )
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,65 @@
+import threading
+import time
+from app.utils.singleflight import SingleFlight
+
+def _wait_for_follower(flight: SingleFlight, key: str, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not (flight._calls.get(key) and flight._calls[key].followers):
+        if time.monotonic() > deadline:
+            return
+        time.sleep(0.001)
+
+def test_finished_leader_keeps_next_leaders_entry():
+    """Leader A snapshots its result while leader B takes over the key; B and its follower still succeed"""
+    flight = SingleFlight('test')
+    a_follower_joined = threading.Event()
+    a_snapshotting = threading.Event()
+    b_running = threading.Event()
+    release_b = threading.Event()
+    outcomes = {}
+
+    class Result(dict):
+        def __deepcopy__(self, memo):
+            # A has released the key and is copying for its follower: B leads the next call meanwhile
+            a_snapshotting.set()
+            b_running.wait(5)
+            return Result(self)
+
+    def call_a():
+        a_follower_joined.wait(5)
+        return Result(value='a')
+
+    def call_b():
+        b_running.set()
+        release_b.wait(5)
+        return Result(value='b')
+
+    def run(name, func):
+        try:
+            outcomes[name] = flight.do('k', func)
+        except Exception as e:
+            outcomes[name] = repr(e)
+
+    a = threading.Thread(target=run, args=('A', call_a))
+    a.start()
+    a_follower = threading.Thread(target=run, args=('A-follower', call_a))
+    a_follower.start()
+    _wait_for_follower(flight, 'k')
+    a_follower_joined.set()
+
+    a_snapshotting.wait(5)
+    b = threading.Thread(target=run, args=('B', call_b))
+    b.start()
+    a.join(5)
+    a_follower.join(5)
+
+    b_follower = threading.Thread(target=run, args=('B-follower', call_b))
+    b_follower.start()
+    _wait_for_follower(flight, 'k')
+    release_b.set()
+    b.join(5)
+    b_follower.join(5)
+
+    assert outcomes == {'A': {'value': 'a'}, 'A-follower': {'value': 'a'},
+                        'B': {'value': 'b'}, 'B-follower': {'value': 'b'}}
+    assert flight.metrics()['in_flight'] == 0